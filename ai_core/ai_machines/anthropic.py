@@ -0,0 +1,64 @@
+from anthropic import Anthropic, AsyncAnthropic
+import os
+from ..state_machine.config import Config
+from ..single_flight import get_async_single_flight
+from .llm_cache import get_llm_cache
+from .retry import retry_async
+
+class AnthropicMachine:
+    MODEL = "claude-3-5-sonnet-20241022"
+
+    def __init__(self, max_tokens: int = 2048):
+        self.max_tokens = max_tokens
+        self._client = None
+        self._async_client = None
+
+    # Клієнти створюються при першому виклику: ключ може бути не заданий, якщо використовується Gemini
+    @property
+    def client(self) -> Anthropic:
+        if self._client is None:
+            self._client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncAnthropic:
+        # Повтори робить retry_async у межах спільного бюджету, тож власні повтори SDK вимкнено
+        if self._async_client is None:
+            self._async_client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), max_retries=0)
+        return self._async_client
+
+    def generate_text(self, prompt: str) -> str:
+        message = self.client.messages.create(
+            model=self.MODEL,
+            max_tokens=self.max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        return message.content[0].text
+
+    async def agenerate_text(self, prompt: str, retry: dict | None = None) -> str:
+        """retry — політика повторів retry_async (None — Config.llm_retry)"""
+        async def call() -> str:
+            message = await self.async_client.messages.create(
+                model=self.MODEL,
+                max_tokens=self.max_tokens,
+                messages=[{"role": "user", "content": prompt}],
+            )
+            return message.content[0].text
+
+        # Ключ лише для об'єднання однакових одночасних запитів (відповіді тут не кешуються)
+        key = get_llm_cache().make_key(self.MODEL, None, prompt, max_tokens=self.max_tokens)
+        # Політика повторів теж у ключі: запит з однією спробою не чекає на чужі повні повтори й навпаки
+        policy = retry or Config.llm_retry
+        text, _ = await get_async_single_flight("llm").do(
+            (key, frozenset(policy.items())), lambda: retry_async(call, name="Anthropic", **policy))
+        return text
+
+    async def astream_text(self, prompt: str):
+        """Потокова генерація (без повторів — після першого токена запит не перезапустити)"""
+        async with self.async_client.messages.stream(
+            model=self.MODEL,
+            max_tokens=self.max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
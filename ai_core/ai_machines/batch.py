@@ -0,0 +1,158 @@
+"""
+Пакетний аналіз: кілька незалежних наборів доказів в одному запиті до LLM.
+
+    python -m ai_core.ai_machines.batch reports.jsonl -o verdicts.jsonl
+    python -m ai_core.requests_methods.scan domains.txt | python -m ai_core.ai_machines.batch - -n 25
+
+Вхід — JSONL: звіти DomainReport (вихід scan) або довільні об'єкти метаданих
+(text / game_name / urls_metadata) з необов'язковим полем id.
+Інструкція передається один раз на пакет, об'єкти позначаються короткими номерами,
+а відповідь — JSON масив вердиктів, який розбирається назад по кожному id.
+"""
+import argparse
+import json
+import re
+import sys
+from typing import Iterable, Iterator, TextIO
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+BATCH_INSTRUCTION = (
+    "Нижче {count} незалежних об'єктів для перевірки, кожен позначено номером у дужках [n]. "
+    "Оціни кожен окремо, не переносячи висновки між ними. Замість одного json об'єкта поверни лише "
+    "JSON масив без додаткового тексту, по одному елементу на кожен об'єкт: "
+    "{{\"id\": n, \"is_russian_content\": true/false, \"text\": \"пояснення\"}}."
+)
+
+
+def build_batch_prompt(instruction: str, bundles: list[str]) -> str:
+    """Інструкція один раз, далі об'єкти з номерами 1..N"""
+    parts = [f"Інструкція: {instruction}", BATCH_INSTRUCTION.format(count=len(bundles))]
+    parts += [f"[{i}]\n{bundle}" for i, bundle in enumerate(bundles, 1)]
+    return "\n\n".join(parts)
+
+
+def _as_bool(value) -> bool | None:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    return None
+
+
+def _verdict(item: dict) -> dict | None:
+    is_russian = _as_bool(item.get("is_russian_content"))
+    if is_russian is None:
+        return None
+    return {"is_russian_content": is_russian, "text": str(item.get("text", ""))}
+
+
+def _load_json(text: str, open_char: str, close_char: str):
+    text = _FENCE_RE.sub("", text.strip())
+    start, end = text.find(open_char), text.rfind(close_char)
+    if start < 0 or end <= start:
+        return None
+    try:
+        return json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+
+
+def parse_verdict(text: str) -> dict | None:
+    """Вердикт з відповіді на одиночний запит (json об'єкт, можливо в ```json блоці)"""
+    data = _load_json(text or "", "{", "}")
+    return _verdict(data) if isinstance(data, dict) else None
+
+
+def parse_batch_response(text: str, count: int) -> dict[int, dict]:
+    """Вердикти за номером об'єкта (1..count); відсутні чи зіпсовані елементи пропускаються"""
+    items = _load_json(text or "", "[", "]")
+    verdicts = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(str(item.get("id")).strip("[] "))
+        except ValueError:
+            continue
+        verdict = _verdict(item)
+        if verdict is not None and 1 <= index <= count:
+            verdicts[index] = verdict
+    return verdicts
+
+
+def chunks(items: list, size: int) -> Iterator[list]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def read_items(lines: Iterable[str]) -> Iterator[tuple[str, dict]]:
+    """(id, метадані) з JSONL; звіт DomainReport загортається в urls_metadata"""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        obj = json.loads(line)
+        if "input_url" in obj:
+            yield obj.get("domain") or obj["input_url"], {"urls_metadata": [obj]}
+        else:
+            yield str(obj.get("id") or number), obj
+
+
+def run(items: Iterable[tuple[str, dict]], out: TextIO, size: int, use_cache: bool = True) -> dict[str, int]:
+    from .main import AIMachinesMain
+
+    ai = AIMachinesMain()
+    pending: dict[str, dict] = {}
+    seen: set[str] = set()
+    duplicates = 0
+
+    def flush():
+        for item_id, verdict in ai.gemeni_generate_batch(pending, use_cache=use_cache, size=size).items():
+            out.write(json.dumps({"id": item_id, **verdict}, ensure_ascii=False) + "\n")
+        out.flush()
+        pending.clear()
+        print(f"📦 {ai.batch_stats['items']} оцінено, запитів {ai.batch_stats['requests']}, "
+              f"окремо {ai.batch_stats['fallbacks']}", file=sys.stderr)
+
+    for item_id, metadata in items:
+        # Вердикти пишуться за id, тож повтор (той самий домен у кількох звітах scan,
+        # однакове поле id) не повинен мовчки підміняти попередній об'єкт
+        if item_id in seen:
+            duplicates += 1
+            print(f"⚠️  Повторний id {item_id!r} пропущено (оцінюється лише перший)", file=sys.stderr)
+            continue
+        seen.add(item_id)
+        pending[item_id] = metadata
+        if len(pending) >= size:
+            flush()
+    if pending:
+        flush()
+    return {**ai.batch_stats, "duplicates": duplicates}
+
+
+def main(argv: list[str] | None = None):
+    from ..state_machine.config import Config
+
+    parser = argparse.ArgumentParser(prog="python -m ai_core.ai_machines.batch",
+                                     description="Пакетна оцінка звітів/метаданих через LLM (JSONL на виході)")
+    parser.add_argument("input", help="JSONL зі звітами scan або метаданими, '-' — stdin")
+    parser.add_argument("-o", "--output", help="файл JSONL для вердиктів (за замовчуванням stdout)")
+    parser.add_argument("-n", "--batch-size", type=int, default=Config.llm_batch["size"],
+                        help=f"об'єктів в одному запиті ({Config.llm_batch['size']})")
+    parser.add_argument("--no-cache", action="store_true", help="не брати відповіді з кешу LLM")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        run(read_items(source), out, max(args.batch_size, 1), use_cache=not args.no_cache)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
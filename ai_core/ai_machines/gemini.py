@@ -1,64 +1,69 @@
 from google import genai
 from google.genai import types
-import time, random
+import asyncio, time, random
+from ..state_machine.config import Config
 from ..state_machine.state import State
+from ..single_flight import get_async_single_flight
+from .llm_cache import LLMCache, get_llm_cache
+from .router import note_cache_hit
+from .retry import EmptyResponseError, RetryBudgetExceeded, retry_async
 
 class GeminiAI:
-    def __init__(self):
+    def __init__(self, cache: LLMCache | None = None):
         self.client = genai.Client()
+        self.model = "gemini-2.5-flash"
+        self.cache = cache or get_llm_cache()
         self.grounding = types.Tool(
             google_search=types.GoogleSearch()
         )
         self.state_machine = State()
 
-    def generate_text(self, prompt: str) -> str:
-        key_db = self.state_machine.metadata.get("game_name")
-        urls_metadata = self.state_machine.metadata.get("urls_metadata") or []
-        
-        if urls_metadata and len(urls_metadata) > 0:
-            if key_db is not None:
-                key_db = "domain_check_" + urls_metadata[0]['domain'] + "_" + key_db
-            else:
-                key_db = "domain_check_" + urls_metadata[0]['domain']
-        elif self.state_machine.metadata.get("text_detected") is not None:
-            key_db = "general_check"
-        else:
-            # Якщо немає ні URLs, ні text_detected
-            key_db = "empty_check"
-
-        key = self.state_machine.make_key(key_db)
-        
-        # if key in self.state_machine.cache:
-        #     return self.state_machine.cache[key]
-        config = types.GenerateContentConfig(
+    SYSTEM_INSTRUCTION = "Відповідай звичайним текстом. Не використовуй Markdown, списки, заголовки чи кодові блоки."
+
+    def _config(self, max_output_tokens: int = 512) -> types.GenerateContentConfig:
+        return types.GenerateContentConfig(
             tools=[self.grounding],
-            system_instruction="Відповідай звичайним текстом. Не використовуй Markdown, списки, заголовки чи кодові блоки.",
+            system_instruction=self.SYSTEM_INSTRUCTION,
             response_mime_type="text/plain",
-            max_output_tokens=512
+            max_output_tokens=max_output_tokens
         )
+
+    def _cache_key(self, prompt: str, max_output_tokens: int = 512) -> str:
+        return self.cache.make_key(self.model, self.SYSTEM_INSTRUCTION, prompt,
+                                   tools=["google_search"], response_mime_type="text/plain", max_output_tokens=max_output_tokens)
+
+    @staticmethod
+    def _extract_text(response) -> str | None:
+        """Багатоканальний витяг тексту"""
+        if response is None:
+            return None
+        if getattr(response, "text", None):
+            return response.text
+        for c in getattr(response, "candidates", None) or []:
+            if hasattr(c, "content") and getattr(c.content, "parts", None):
+                for p in c.content.parts:
+                    if hasattr(p, "text") and p.text:
+                        return p.text
+        return None
+
+    def generate_text(self, prompt: str, use_cache: bool = True, max_output_tokens: int = 512) -> str:
+        """use_cache=False — не брати відповідь з кешу (свіжу все одно буде збережено)"""
+        config = self._config(max_output_tokens)
+        key = self._cache_key(prompt, max_output_tokens)
+        cached = self.cache.get(key, bypass=not use_cache)
+        if cached is not None:
+            print(f"[Gemini] Cache hit {key[4:16]}")
+            return cached
+
         range_try = 8
         for attempt in range(range_try):
             try:
                 response = self.client.models.generate_content(
-                    model="gemini-2.5-flash",
+                    model=self.model,
                     contents=prompt,
                     config=config
                 )
-                # Багатоканальний витяг тексту
-                raw_text = None
-
-                if response is not None:
-                    if getattr(response, "text", None):
-                        raw_text = response.text
-                    elif getattr(response, "candidates", None):
-                        for c in response.candidates:
-                            if hasattr(c, "content") and getattr(c.content, "parts", None):
-                                for p in c.content.parts:
-                                    if hasattr(p, "text") and p.text:
-                                        raw_text = p.text
-                                        break
-                            if raw_text:
-                                break
+                raw_text = self._extract_text(response)
 
                 if not raw_text or not raw_text.strip():
                     print(f"[Gemini] Порожня відповідь (attempt {attempt+1}) → retry")
@@ -68,7 +73,7 @@ class GeminiAI:
                     return "Error: empty response from Gemini."
 
                 print(f"Gemini response (truncated): {raw_text[:200]}")
-                self.state_machine.cache[key] = raw_text
+                self.cache.set(key, raw_text)
                 return raw_text
 
             except Exception as e:
@@ -81,4 +86,82 @@ class GeminiAI:
                         continue
                     return f"Error: Gemini unavailable after {range_try} attempts. {msg}"
                 raise
-        return "Failed to generate text after retries."
\ No newline at end of file
+        return "Failed to generate text after retries."
+
+    async def agenerate_text(self, prompt: str, use_cache: bool = True,
+                             retry: dict | None = None, raise_errors: bool = False,
+                             max_output_tokens: int = 512) -> str:
+        """
+        Асинхронний варіант generate_text для обробників FastAPI: очікування між спробами
+        не блокує event loop, запит скасовується разом із задачею, повтори обмежені Config.llm_retry
+        (або retry). raise_errors — піднімати RetryBudgetExceeded замість тексту "Error: ..."
+        (роутеру провайдерів потрібна помилка, щоб перейти до іншого).
+        """
+        key = self._cache_key(prompt, max_output_tokens)
+        cached = await asyncio.to_thread(self.cache.get, key, not use_cache)
+        if cached is not None:
+            print(f"[Gemini] Cache hit {key[4:16]}")
+            note_cache_hit()
+            return cached
+
+        config = self._config(max_output_tokens)
+
+        async def call() -> str:
+            response = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=prompt,
+                config=config
+            )
+            raw_text = self._extract_text(response)
+            if not raw_text or not raw_text.strip():
+                raise EmptyResponseError("empty response from Gemini")
+            return raw_text
+
+        policy = retry or Config.llm_retry
+
+        async def fetch() -> str:
+            try:
+                raw_text = await retry_async(call, name="Gemini", **policy)
+            except RetryBudgetExceeded as e:
+                if raise_errors:
+                    raise
+                if isinstance(e.last_error, EmptyResponseError):
+                    return "Error: empty response from Gemini."
+                return f"Error: Gemini unavailable after {e.attempts} attempts. {e.last_error}"
+            print(f"Gemini response (truncated): {raw_text[:200]}")
+            await asyncio.to_thread(self.cache.set, key, raw_text)
+            return raw_text
+
+        # Такий самий промпт з тією ж політикою повторів уже генерується для іншого запиту — чекаємо його відповідь
+        raw_text, joined = await get_async_single_flight("llm").do((key, raise_errors, frozenset(policy.items())), fetch)
+        if joined:
+            print(f"[Gemini] Joined in-flight request {key[4:16]}")
+        return raw_text
+
+    async def astream_text(self, prompt: str, use_cache: bool = True, max_output_tokens: int = 512):
+        """
+        Потокова генерація: віддає частини тексту в міру надходження (закешована відповідь — одним шматком).
+        Без повторів: після першого токена запит уже не перезапустити; повна відповідь кешується.
+        """
+        key = self._cache_key(prompt, max_output_tokens)
+        cached = await asyncio.to_thread(self.cache.get, key, not use_cache)
+        if cached is not None:
+            note_cache_hit()
+            yield cached
+            return
+
+        parts = []
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+            config=self._config(max_output_tokens)
+        )
+        async for chunk in stream:
+            text = self._extract_text(chunk)
+            if text:
+                parts.append(text)
+                yield text
+        raw_text = "".join(parts)
+        if not raw_text.strip():
+            raise EmptyResponseError("empty response from Gemini")
+        await asyncio.to_thread(self.cache.set, key, raw_text)
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import threading
+import unicodedata
+
+import diskcache as dc
+
+from ..state_machine.config import Config
+from ..state_machine.state import get_state_cache
+
+
+class LLMCache:
+    """
+    Кеш відповідей LLM. Ключ — хеш канонічного JSON з моделі, системної інструкції,
+    нормалізованого промпту та параметрів генерації, тож однакові перевірки
+    (з тими самими доказами) не викликають модель повторно.
+    """
+
+    def __init__(self, cache: dc.Cache, ttl: float | None = 24 * 3600):
+        self.cache = cache
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {"hit": 0, "miss": 0, "bypass": 0, "store": 0}
+
+    @staticmethod
+    def normalize_prompt(prompt) -> str:
+        """Unicode NFC і згорнуті пробіли — форматування промпту не впливає на ключ"""
+        if not isinstance(prompt, str):
+            prompt = json.dumps(prompt, ensure_ascii=False, sort_keys=True, default=str)
+        return " ".join(unicodedata.normalize("NFC", prompt).split())
+
+    def make_key(self, model: str, system_instruction: str | None, prompt, **params) -> str:
+        canonical = json.dumps({
+            "model": model,
+            "system": self.normalize_prompt(system_instruction or ""),
+            "prompt": self.normalize_prompt(prompt),
+            "params": params,
+        }, ensure_ascii=False, sort_keys=True, default=str)
+        return "llm:" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def get(self, key: str, bypass: bool = False) -> str | None:
+        if bypass:
+            self._count("bypass")
+            return None
+        value = self.cache.get(key)
+        self._count("hit" if value is not None else "miss")
+        return value
+
+    def set(self, key: str, value: str):
+        self.cache.set(key, value, expire=self.ttl)
+        self._count("store")
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
+_default_llm_cache: LLMCache | None = None
+_default_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Спільний для процесу кеш відповідей LLM на diskcache стану (LRU з обмеженням розміру)"""
+    global _default_llm_cache
+    with _default_llm_cache_lock:
+        if _default_llm_cache is None:
+            _default_llm_cache = LLMCache(get_state_cache(), ttl=Config.llm_cache["ttl"])
+        return _default_llm_cache
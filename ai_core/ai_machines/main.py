@@ -1,12 +1,18 @@
 from .gemini import GeminiAI
 from .openai import OpenAIMachine
-import json, pathlib
+from .anthropic import AnthropicMachine
+from .batch import build_batch_prompt, chunks, parse_batch_response, parse_verdict
+from .prompt_builder import get_prompt_builder
+from ..state_machine.config import Config
+import asyncio, json, pathlib
 
 class AIMachinesMain:
     def __init__(self):
         self.gemini_ai = GeminiAI()  # Initialize GeminiAI instance later
         self.openai_ai = OpenAIMachine()  # Initialize OpenAI instance here
+        self.anthropic_ai = AnthropicMachine()  # клієнт створюється при першому виклику
         self.prompt_data = self._load_prompts()
+        self.batch_stats = {"items": 0, "requests": 0, "fallbacks": 0}  # пакетний режим
     def _load_prompts(self) -> dict:
         """Безпечне завантаження validation.json з кількох можливих місць."""
         base_dir = pathlib.Path(__file__).resolve().parent  # ai_machines/
@@ -26,49 +32,95 @@ class AIMachinesMain:
         return {
             "instruction_validation": "Аналізуй дані без Markdown. Поверни короткий текст."
         }
-    def _format_metadata(self, metadata: dict) -> str:
-        """Format metadata dictionary into readable text"""
-        lines = []
-        if "text" in metadata:
-            lines.append(f"Text: {metadata['text']}")
-        if "game_name" in metadata:
-            lines.append(f"Game: {metadata['game_name']}")
-        
-        if "steam_game_info" in metadata:
-            game_info = metadata['steam_game_info']
-            lines.append(f"\nSteam Info:")
-            lines.append(f"  Developers: {game_info.get('developers', 'N/A')}")
-            lines.append(f"  Publishers: {game_info.get('publishers', 'N/A')}")
-        
-        if "urls_metadata" in metadata:
-            lines.append(f"\nURL Analysis ({len(metadata['urls_metadata'])} URLs):")
-            for idx, url_data in enumerate(metadata['urls_metadata'], 1):
-                lines.append(f"\n  URL {idx}: {url_data.get('input_url')}")
-                lines.append(f"    Domain: {url_data.get('domain')}")
-                lines.append(f"    Country: {url_data.get('registrant_country') or url_data.get('country', 'Unknown')}")
-                lines.append(f"    Registrar: {url_data.get('registrar', 'Unknown')}")
-                lines.append(f"    Russian traces: {', '.join(url_data.get('russian_traces', []))}")
-        
-        return "\n".join(lines)
-    def gemeni_generate_text(self, prompt: str) -> str:
+    def _format_metadata(self, metadata: dict, budget: int | None = None) -> str:
+        """Докази з метаданих у межах бюджету токенів (найважливіші поля першими, див. PromptBuilder)"""
+        return get_prompt_builder().render(metadata, budget)
+    def _formatted(self, prompt, budget: int | None = None) -> str:
         # Convert metadata dict to a formatted string
         if isinstance(prompt, dict):
-            formatted_text = self._format_metadata(prompt)
-        else:
-            formatted_text = str(prompt) 
-        
-        text = f"""Інструкція: {self.prompt_data["instruction_validation"]} Текст: {formatted_text}"""
-        return self.gemini_ai.generate_text(text)
-    def openai_generate_text(self, prompt: str) -> str:   
-        # Convert metadata dict to a formatted string
-        if isinstance(prompt, dict):
-            formatted_text = self._format_metadata(prompt)
-        else:
-            formatted_text = str(prompt) 
-        text = [
+            return self._format_metadata(prompt, budget)
+        return str(prompt)
+    def _gemini_prompt(self, prompt) -> str:
+        return f"""Інструкція: {self.prompt_data["instruction_validation"]} Текст: {self._formatted(prompt)}"""
+    def _openai_messages(self, prompt) -> list:
+        formatted_text = self._formatted(prompt)
+        return [
             {"role": "system", "content":  self.prompt_data["instruction_validation"]},
             {"role": "user", "content": formatted_text}
         ]
-        return self.openai_ai.generate_text(text)
+    def gemeni_generate_text(self, prompt: str, use_cache: bool = True) -> str:
+        return self.gemini_ai.generate_text(self._gemini_prompt(prompt), use_cache=use_cache)
+    async def agemeni_generate_text(self, prompt: str, use_cache: bool = True,
+                                    retry: dict | None = None, raise_errors: bool = False) -> str:
+        """Асинхронний варіант для обробників FastAPI"""
+        return await self.gemini_ai.agenerate_text(self._gemini_prompt(prompt), use_cache=use_cache,
+                                                   retry=retry, raise_errors=raise_errors)
+    def openai_generate_text(self, prompt: str) -> str:   
+        return self.openai_ai.generate_text(self._openai_messages(prompt))
+    async def aopenai_generate_text(self, prompt: str, retry: dict | None = None) -> str:
+        return await self.openai_ai.agenerate_text(self._openai_messages(prompt), retry=retry)
+    def anthropic_generate_text(self, prompt: str) -> str:
+        return self.anthropic_ai.generate_text(prompt)
+    async def aanthropic_generate_text(self, prompt: str, retry: dict | None = None) -> str:
+        return await self.anthropic_ai.agenerate_text(prompt, retry=retry)
+    def agemeni_stream_text(self, prompt, use_cache: bool = True):
+        """Потокова відповідь Gemini (async генератор частин тексту)"""
+        return self.gemini_ai.astream_text(self._gemini_prompt(prompt), use_cache=use_cache)
+    def aopenai_stream_text(self, prompt):
+        return self.openai_ai.astream_text(self._openai_messages(prompt))
+    def aanthropic_stream_text(self, prompt: str):
+        return self.anthropic_ai.astream_text(prompt)
+    def _batch_requests(self, items: dict, size: int | None) -> list[tuple[list, str, int]]:
+        """Пакети (id, промпт, max_output_tokens): інструкція один раз на пакет"""
+        size = size or Config.llm_batch["size"]
+        requests = []
+        for chunk in chunks(list(items), size):
+            prompt = build_batch_prompt(self.prompt_data["instruction_validation"],
+                                        [self._formatted(items[item_id], Config.llm_batch["item_budget"])
+                                         for item_id in chunk])
+            tokens = min(Config.llm_batch["tokens_per_item"] * len(chunk) + 128, 8192)
+            requests.append((chunk, prompt, tokens))
+        return requests
+    def _split_batch(self, chunk: list, text: str) -> tuple[dict, list]:
+        """Вердикти пакета по id і список id, для яких вердикту у відповіді немає"""
+        self.batch_stats["requests"] += 1
+        self.batch_stats["items"] += len(chunk)
+        if text.startswith("Error:"):  # провайдер недоступний — окремі запити теж не пройдуть
+            return {item_id: {"error": text} for item_id in chunk}, []
+        verdicts = parse_batch_response(text, len(chunk))
+        results = {item_id: verdicts[n] for n, item_id in enumerate(chunk, 1) if n in verdicts}
+        missing = [item_id for item_id in chunk if item_id not in results]
+        self.batch_stats["fallbacks"] += len(missing)
+        return results, missing
+    def gemeni_generate_batch(self, items: dict, use_cache: bool = True, size: int | None = None) -> dict:
+        """
+        Пакетний режим для масових перевірок: items — id -> метадані (або текст).
+        Повертає id -> {"is_russian_content", "text"}; об'єкти, яких немає у відповіді
+        пакета, оцінюються окремим запитом, а нерозібрані отримують {"error": ...}.
+        """
+        results = {}
+        for chunk, prompt, tokens in self._batch_requests(items, size):
+            text = self.gemini_ai.generate_text(prompt, use_cache=use_cache, max_output_tokens=tokens)
+            verdicts, missing = self._split_batch(chunk, text)
+            results.update(verdicts)
+            for item_id in missing:
+                response = self.gemeni_generate_text(items[item_id], use_cache=use_cache)
+                results[item_id] = parse_verdict(response) or {"error": f"unparsed response: {response[:200]}"}
+        return {item_id: results[item_id] for item_id in items}
+    async def agemeni_generate_batch(self, items: dict, use_cache: bool = True, size: int | None = None) -> dict:
+        """Асинхронний варіант gemeni_generate_batch: пакети надсилаються паралельно"""
+        async def run(chunk, prompt, tokens):
+            text = await self.gemini_ai.agenerate_text(prompt, use_cache=use_cache, max_output_tokens=tokens)
+            verdicts, missing = self._split_batch(chunk, text)
+            responses = await asyncio.gather(*(self.agemeni_generate_text(items[item_id], use_cache=use_cache)
+                                               for item_id in missing))
+            for item_id, response in zip(missing, responses):
+                verdicts[item_id] = parse_verdict(response) or {"error": f"unparsed response: {response[:200]}"}
+            return verdicts
+
+        results = {}
+        for verdicts in await asyncio.gather(*(run(*request) for request in self._batch_requests(items, size))):
+            results.update(verdicts)
+        return {item_id: results[item_id] for item_id in items}
     def run(self):
         print("AI Machine Main is running.")
\ No newline at end of file
@@ -1,16 +1,70 @@
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 import os
+from ..state_machine.config import Config
+from ..single_flight import get_async_single_flight
+from .llm_cache import get_llm_cache
+from .retry import EmptyResponseError, retry_async
+
 class OpenAIMachine:
+    BASE_URL = "https://openrouter.ai/api/v1"
+    MODEL = "mistralai/mistral-7b-instruct:free"
+
     def __init__(self):
         self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
+            base_url=self.BASE_URL,
             api_key=os.getenv("OPENROUTER_API_KEY"),
         )
+        self._async_client = None
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        # Повтори робить retry_async у межах спільного бюджету, тож власні повтори SDK вимкнено
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                base_url=self.BASE_URL,
+                api_key=os.getenv("OPENROUTER_API_KEY"),
+                max_retries=0,
+            )
+        return self._async_client
 
     def generate_text(self, prompt: list) -> str:
         completion = self.client.chat.completions.create(
-            model="mistralai/mistral-7b-instruct:free",
+            model=self.MODEL,
+            messages=prompt,
+            max_tokens=512,
+        )
+        return completion.choices[0].message.content
+
+    async def agenerate_text(self, prompt: list, retry: dict | None = None) -> str:
+        """retry — політика повторів retry_async (None — Config.llm_retry)"""
+        async def call() -> str:
+            completion = await self.async_client.chat.completions.create(
+                model=self.MODEL,
+                messages=prompt,
+                max_tokens=512,
+            )
+            content = completion.choices[0].message.content if completion.choices else None
+            if not content:
+                raise EmptyResponseError("empty response from OpenRouter")
+            return content
+
+        # Ключ лише для об'єднання однакових одночасних запитів (відповіді тут не кешуються)
+        key = get_llm_cache().make_key(self.MODEL, None, prompt, max_tokens=512)
+        # Політика повторів теж у ключі: запит з однією спробою не чекає на чужі повні повтори й навпаки
+        policy = retry or Config.llm_retry
+        text, _ = await get_async_single_flight("llm").do(
+            (key, frozenset(policy.items())), lambda: retry_async(call, name="OpenAI", **policy))
+        return text
+
+    async def astream_text(self, prompt: list):
+        """Потокова генерація (без повторів — після першого токена запит не перезапустити)"""
+        stream = await self.async_client.chat.completions.create(
+            model=self.MODEL,
             messages=prompt,
             max_tokens=512,
+            stream=True,
         )
-        return completion.choices[0].message.content
\ No newline at end of file
+        async for chunk in stream:
+            content = chunk.choices[0].delta.content if chunk.choices else None
+            if content:
+                yield content
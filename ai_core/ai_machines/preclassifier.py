@@ -0,0 +1,263 @@
+"""
+Локальна попередня класифікація: очевидні випадки вирішуються без виклику AI.
+
+Оцінка для URL — логістична сума ваг правил слідів РФ (rules/russian_traces.json, поле weight)
+плюс ознаки з секції classifier. Для тексту — необов'язкова модель naive Bayes на символьних
+n-грамах, яку можна натренувати на вже отриманих вердиктах:
+
+    python -m ai_core.ai_machines.preclassifier train labelled.jsonl -o text_model.json
+
+Вхід — JSONL з полями text та is_russian_content. Шлях до моделі — TEXT_MODEL_PATH.
+"""
+import argparse
+import json
+import math
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from ..requests_methods.report import DomainReport
+from ..requests_methods.rules.engine import RuleSet, get_rule_engine
+from ..state_machine.config import Config
+
+DECISIONS = ("russian", "not_russian", "uncertain")
+
+
+def _sigmoid(x: float) -> float:
+    return 1 / (1 + math.exp(-max(min(x, 50.0), -50.0)))
+
+
+@dataclass(slots=True)
+class Preclassification:
+    decision: str  # russian / not_russian / uncertain (потрібен AI)
+    probability: float | None  # оцінена ймовірність російського контенту; None — оцінити нічим
+    reasons: list[str] = field(default_factory=list)
+
+    @property
+    def confident(self) -> bool:
+        return self.decision != "uncertain"
+
+    def verdict(self) -> str:
+        """Вердикт у форматі відповіді AI (json з is_russian_content і text)"""
+        share = f"{self.probability:.0%}" if self.probability is not None else "?"
+        if self.decision == "russian":
+            text = f"Локальна оцінка без AI (імовірність {share}): " + "; ".join(self.reasons)
+        else:
+            text = f"Локальна оцінка без AI (імовірність {share}): ознак РФ не виявлено"
+            if self.reasons:
+                text += " — " + "; ".join(self.reasons)
+        return json.dumps({"is_russian_content": self.decision == "russian", "text": text}, ensure_ascii=False)
+
+
+class TextModel:
+    """Naive Bayes на множині символьних n-грам тексту (кожна n-грама враховується один раз)"""
+
+    def __init__(self, data: dict):
+        self.n = int(data.get("n", 3))
+        self.min_chars = int(data.get("min_chars", 40))
+        self.scale = float(data.get("scale", 1.0))  # <1 пом'якшує надмірну впевненість naive Bayes
+        self.prior = float(data["prior"])  # log-odds російського контенту серед навчальних текстів
+        self.llr: dict[str, float] = data["llr"]  # n-грама -> log P(g|ru) - log P(g|інше)
+        self.default_llr = float(data.get("default_llr", 0.0))
+
+    @classmethod
+    def load(cls, path: str) -> "TextModel":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def grams(text: str, n: int) -> set[str]:
+        text = " ".join(text.lower().split())
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def probability(self, text: str) -> float | None:
+        """None — текст закороткий для оцінки"""
+        if len(text.strip()) < self.min_chars:
+            return None
+        score = sum(self.llr.get(gram, self.default_llr) for gram in self.grams(text, self.n))
+        return _sigmoid(self.prior + self.scale * score)
+
+    @classmethod
+    def train(cls, samples: Iterable[tuple[str, bool]], n: int = 3, min_count: int = 2) -> dict:
+        """Дані моделі з пар (текст, is_russian_content)"""
+        counts = {True: Counter(), False: Counter()}
+        docs = {True: 0, False: 0}
+        for text, label in samples:
+            docs[label] += 1
+            counts[label].update(cls.grams(text, n))
+        if not docs[True] or not docs[False]:
+            raise ValueError("Потрібні приклади обох класів")
+        vocab = {g for g in counts[True] | counts[False] if counts[True][g] + counts[False][g] >= min_count}
+
+        def llr(ru: int, other: int) -> float:
+            # Частка документів класу з n-грамою, згладжування Лапласа
+            return math.log((ru + 1) / (docs[True] + 2)) - math.log((other + 1) / (docs[False] + 2))
+
+        return {
+            "n": n,
+            "min_chars": 40,
+            "scale": 1.0,
+            "prior": math.log(docs[True] / docs[False]),
+            "llr": {g: round(llr(counts[True][g], counts[False][g]), 4) for g in sorted(vocab)},
+            "default_llr": 0.0,
+            "docs": {"russian": docs[True], "other": docs[False]},
+        }
+
+
+class PreClassifier:
+    """
+    Повертає впевнений вердикт лише за межами [lower, upper]; все між ними — до AI.
+    Негативний вердикт для URL потребує заповнених ключових полів звіту (min_coverage),
+    щоб недозібраний через дедлайн звіт не виглядав «чистим». Для ігор — лише позитивний шлях:
+    чистий сайт ще не означає, що розробник не з РФ.
+    """
+
+    def __init__(self, enabled: bool = True, upper: float = 0.9, lower: float = 0.1,
+                 min_coverage: float = 0.75, text_model: str | None = None):
+        if not 0 <= lower < upper <= 1:
+            raise ValueError(f"Preclassifier thresholds must satisfy 0 <= lower < upper <= 1 (got {lower}, {upper})")
+        self.enabled = enabled
+        self.upper = upper
+        self.lower = lower
+        self.min_coverage = min_coverage
+        self.text_model = None
+        if text_model:
+            try:
+                self.text_model = TextModel.load(text_model)
+                print(f"✅ Текстова модель попередньої класифікації: {text_model} ({len(self.text_model.llr)} n-грам)")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️  Не вдалося завантажити текстову модель {text_model}: {e}")
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(DECISIONS, 0)
+
+    def score_report(self, report: DomainReport, ruleset: RuleSet) -> tuple[float, list[str], float]:
+        """(ймовірність, сліди РФ, частка заповнених ключових полів) для одного звіту"""
+        classifier = ruleset.classifier
+        matches = ruleset.matches(report)
+        score = float(classifier.get("bias", 0.0)) + sum(ruleset.weights[rule_id] for rule_id, _ in matches)
+        reasons = [message for _, message in matches]
+        western = classifier.get("no_traces_western_hosting") or {}
+        if not matches and report.hosting_provider in western.get("providers", []):
+            score += float(western.get("weight", 0.0))
+            reasons.append(f"хостинг {report.hosting_provider}")
+        fields = classifier.get("coverage_fields") or []
+        coverage = sum(1 for name in fields if getattr(report, name, None)) / len(fields) if fields else 1.0
+        return _sigmoid(score), reasons, coverage
+
+    def classify(self, check_type: str | None, text: str | None = None,
+                 reports: Iterable[DomainReport | dict] = (), game: bool = False) -> Preclassification:
+        """
+        Лише докази поточного запиту: текст для check_type "text", звіти його URL для "url"
+        (game=True — URL є сайтом гри). Гра без сайту оцінюється лише AI.
+        """
+        if not self.enabled:
+            return Preclassification("uncertain", None)
+        if check_type == "text":
+            result = self._classify_text(text or "")
+        elif check_type == "url":
+            reports = [r if isinstance(r, DomainReport) else DomainReport.from_dict(r) for r in reports]
+            result = (self._classify_reports(reports, positive_only=game) if reports
+                      else Preclassification("uncertain", None))
+        else:
+            result = Preclassification("uncertain", None)
+        with self._lock:
+            self._stats[result.decision] += 1
+        return result
+
+    def _classify_text(self, text: str) -> Preclassification:
+        if text and self.text_model is not None:
+            probability = self.text_model.probability(text)
+            if probability is not None and probability >= self.upper:
+                return Preclassification("russian", probability, ["текст схожий на раніше визнані російськими"])
+            if probability is not None and probability <= self.lower:
+                return Preclassification("not_russian", probability)
+            return Preclassification("uncertain", probability)
+        return Preclassification("uncertain", None)
+
+    def _classify_reports(self, reports: list[DomainReport], positive_only: bool) -> Preclassification:
+        ruleset = get_rule_engine().current()
+        scored = [self.score_report(report, ruleset) for report in reports]
+        # Російський, якщо хоч один URL впевнено російський
+        probability, reasons, _ = max(scored, key=lambda s: s[0])
+        if probability >= self.upper:
+            return Preclassification("russian", probability, reasons)
+        # Не російський, лише якщо всі URL впевнено чисті й достатньо повно перевірені
+        if not positive_only and all(p <= self.lower and coverage >= self.min_coverage for p, _, coverage in scored):
+            reasons = list(dict.fromkeys(r for _, rs, _ in scored for r in rs))
+            return Preclassification("not_russian", probability, reasons)
+        return Preclassification("uncertain", probability)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def render(self) -> str:
+        """Рішення попередньої класифікації та частка пропущених викликів AI у форматі Prometheus"""
+        stats = self.stats()
+        total = sum(stats.values())
+        skipped = stats["russian"] + stats["not_russian"]
+        lines = [
+            "# HELP rf_preclassifier_total Local pre-classification decisions (uncertain goes to the LLM)",
+            "# TYPE rf_preclassifier_total counter",
+        ]
+        for decision in DECISIONS:
+            lines.append(f'rf_preclassifier_total{{decision="{decision}"}} {stats[decision]}')
+        lines += [
+            "# HELP rf_preclassifier_skip_ratio Share of checks answered without an LLM call",
+            "# TYPE rf_preclassifier_skip_ratio gauge",
+            f"rf_preclassifier_skip_ratio {skipped / total if total else 0.0:.4f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+_default_preclassifier: PreClassifier | None = None
+_default_preclassifier_lock = threading.Lock()
+
+
+def get_preclassifier() -> PreClassifier:
+    """Спільний для процесу класифікатор з порогами з Config.preclassifier"""
+    global _default_preclassifier
+    with _default_preclassifier_lock:
+        if _default_preclassifier is None:
+            _default_preclassifier = PreClassifier(**Config.preclassifier)
+        return _default_preclassifier
+
+
+def _read_samples(lines: Iterable[str]) -> Iterable[tuple[str, bool]]:
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        obj = json.loads(line)
+        label = obj.get("is_russian_content")
+        if isinstance(obj.get("text"), str) and isinstance(label, bool):
+            yield obj["text"], label
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m ai_core.ai_machines.preclassifier",
+                                     description="Локальна попередня класифікація без AI")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="натренувати текстову модель з JSONL (text, is_russian_content)")
+    train.add_argument("input", help="JSONL з текстами та вердиктами, '-' — stdin")
+    train.add_argument("-o", "--output", required=True, help="файл моделі (TEXT_MODEL_PATH)")
+    train.add_argument("-n", type=int, default=3, help="довжина символьних n-грам (3)")
+    train.add_argument("--min-count", type=int, default=2, help="відкидати рідші n-грами (2)")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    try:
+        model = TextModel.train(_read_samples(source), n=args.n, min_count=args.min_count)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(model, f, ensure_ascii=False)
+    print(f"✅ Модель збережено: {args.output} ({model['docs']['russian']} російських, "
+          f"{model['docs']['other']} інших текстів, {len(model['llr'])} n-грам)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
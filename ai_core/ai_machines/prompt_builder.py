@@ -0,0 +1,158 @@
+import json
+import math
+import threading
+from dataclasses import dataclass
+
+from ..requests_methods.report import DomainReport
+from ..state_machine.config import Config
+
+# Порядок важливості полів звіту: спершу сліди РФ, далі реєстрація та країни, далі решта
+URL_FIELDS = (
+    (0, "russian_traces", "Russian traces"),
+    (1, "registrar", "Registrar"),
+    (1, "registrant_country", "Registrant country"),
+    (1, "admin_country", "Admin country"),
+    (1, "tech_country", "Tech country"),
+    (1, "country", "IP country"),
+    (1, "nameserver_countries", "NS countries"),
+    (1, "whois_server", "WHOIS server"),
+    (2, "org", "Org"),
+    (2, "asn", "ASN"),
+    (2, "hosting_provider", "Hosting"),
+    (2, "rir", "RIR"),
+    (2, "ssl_issuer", "SSL issuer"),
+    (2, "creation_date", "Created"),
+    (2, "name_servers", "Name servers"),
+    (3, "expiration_date", "Expires"),
+    (3, "abuse_contact", "Abuse contact"),
+    (3, "status", "Status"),
+    (3, "dnssec", "DNSSEC"),
+    (3, "http_headers", "HTTP headers"),
+    (3, "dns_records", "DNS records"),
+    (3, "errors", "Errors"),
+)
+STEAM_FIELDS = (
+    (0, "error", "Error"),
+    (1, "developers", "Developers"),
+    (1, "publishers", "Publishers"),
+    (2, "name", "Name"),
+    (2, "website", "Website"),
+    (2, "supported_languages", "Languages"),
+    (3, "release_date", "Released"),
+    (3, "genres", "Genres"),
+    (3, "short_description", "Description"),
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Оцінка кількості токенів без токенізатора: латиниця й цифри ~4 символи на токен,
+    кирилиця та інші символи ~2.5 (з запасом для українського тексту).
+    """
+    ascii_chars = sum(1 for ch in text if ch.isascii())
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 2.5)
+
+
+def _value(value) -> str:
+    if isinstance(value, (list, tuple, set)):
+        return ", ".join(str(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False, default=str, separators=(",", ":"))
+    return str(value)
+
+
+@dataclass(slots=True)
+class _Line:
+    priority: int
+    section: int  # номер блоку (текст, гра, URL n) — для виводу в початковому порядку
+    order: int
+    text: str
+
+
+class PromptBuilder:
+    """
+    Збирає докази з метаданих перевірки в межах бюджету токенів.
+    Рядки впорядковуються за важливістю (сліди РФ → реєстратор/країни → решта) і додаються,
+    поки вистачає бюджету; довгі значення обрізаються до max_field_chars.
+    Статична інструкція завжди йде першою і не змінюється між запитами,
+    тож провайдери можуть кешувати спільний префікс промпту.
+    """
+
+    def __init__(self, budget: int = 1200, max_field_chars: int = 300):
+        self.budget = budget
+        self.max_field_chars = max_field_chars
+
+    def _clip(self, text: str, limit: int | None = None) -> str:
+        limit = limit or self.max_field_chars
+        return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+    def _lines(self, metadata: dict) -> list[_Line]:
+        lines: list[_Line] = []
+        section = 0
+
+        def add(priority: int, text: str, clip: bool = True):
+            lines.append(_Line(priority, section, len(lines), self._clip(text) if clip else text))
+
+        if metadata.get("text"):
+            add(0, f"Text: {metadata['text']}", clip=False)  # сам текст обрізається лише за бюджетом
+        if metadata.get("game_name"):
+            section += 1
+            add(0, f"Game: {metadata['game_name']}")
+        game_info = metadata.get("steam_game_info")
+        if isinstance(game_info, dict) and game_info:
+            section += 1
+            add(1, "Steam Info:")
+            for priority, key, label in STEAM_FIELDS:
+                if game_info.get(key):
+                    add(priority, f"  {label}: {_value(game_info[key])}")
+        for idx, report in enumerate(metadata.get("urls_metadata") or [], 1):
+            if isinstance(report, DomainReport):
+                report = report.to_dict()
+            section += 1
+            add(0, f"URL {idx}: {report.get('input_url')} (domain: {report.get('domain')})")
+            for priority, key, label in URL_FIELDS:
+                if report.get(key):
+                    add(priority, f"  {label}: {_value(report[key])}")
+        return lines
+
+    def render(self, metadata: dict, budget: int | None = None) -> str:
+        """Докази з metadata у межах budget токенів (None — self.budget)"""
+        budget = self.budget if budget is None else budget
+        lines = self._lines(metadata)
+        selected: list[_Line] = []
+        used = 0
+        dropped = 0
+        for line in sorted(lines, key=lambda l: (l.priority, l.section, l.order)):
+            cost = estimate_tokens(line.text) + 1
+            if used + cost > budget:
+                # Найважливіші рядки (сам текст, URL, сліди) обрізаємо під залишок, решту пропускаємо
+                room = budget - used - 1
+                if line.priority > 0 or room < 16:
+                    dropped += 1
+                    continue
+                line.text = self._clip(line.text, max(int(len(line.text) * room / cost), 16))
+                cost = estimate_tokens(line.text) + 1
+            selected.append(line)
+            used += cost
+        selected.sort(key=lambda l: (l.section, l.order))
+        result = [line.text for line in selected]
+        if dropped:
+            result.append(f"(+{dropped} less relevant fields omitted)")
+        return "\n".join(result)
+
+    def build(self, instruction: str, metadata: dict, budget: int | None = None) -> str:
+        """Статичний префікс (інструкція) + докази; змінна частина завжди в кінці"""
+        return f"{instruction}\n\n{self.render(metadata, budget)}"
+
+
+_default_builder: PromptBuilder | None = None
+_default_builder_lock = threading.Lock()
+
+
+def get_prompt_builder() -> PromptBuilder:
+    """Спільний для процесу збирач промптів з бюджетом з Config.prompt"""
+    global _default_builder
+    with _default_builder_lock:
+        if _default_builder is None:
+            _default_builder = PromptBuilder(**Config.prompt)
+        return _default_builder
@@ -0,0 +1,77 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+# Статуси, після яких є сенс повторити запит (перевантаження, ліміти, збої шлюзу; 529 — overloaded у Anthropic)
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504, 529}
+_RETRY_MARKERS = ("503", "429", "UNAVAILABLE", "RESOURCE_EXHAUSTED", "overloaded")
+
+
+class EmptyResponseError(Exception):
+    """Модель повернула порожню відповідь — повторюємо, як і тимчасову помилку"""
+
+
+class RetryBudgetExceeded(Exception):
+    """Спроби або загальний бюджет часу вичерпано; last_error — остання помилка"""
+
+    def __init__(self, attempts: int, elapsed: float, last_error: BaseException | None):
+        super().__init__(f"{attempts} attempts in {elapsed:.1f}s: {type(last_error).__name__}: {last_error}")
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.last_error = last_error
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Тимчасова помилка провайдера (openai/anthropic мають status_code, google-genai — code)"""
+    if isinstance(error, (EmptyResponseError, asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if type(error).__name__ in ("APIConnectionError", "APITimeoutError"):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int):
+        return status in RETRY_STATUSES
+    message = str(error)
+    return any(marker in message for marker in _RETRY_MARKERS)
+
+
+async def retry_async(
+    call: Callable[[], Awaitable[T]],
+    attempts: int = 5,
+    budget: float | None = 30.0,
+    base_delay: float = 1.0,
+    max_delay: float = 8.0,
+    name: str = "LLM",
+    retryable: Callable[[BaseException], bool] = is_retryable,
+) -> T:
+    """
+    Викликає call з повторами за експоненційною затримкою з повним джитером (asyncio.sleep).
+    budget — загальний час на всі спроби разом із паузами: остання спроба обмежується залишком,
+    а пауза, що вийшла б за бюджет, не починається. Скасування (CancelledError) не перехоплюється.
+    """
+    started = time.monotonic()
+    deadline = started + budget if budget else None
+    last_error: BaseException | None = None
+    for attempt in range(attempts):
+        try:
+            if deadline is None:
+                return await call()
+            return await asyncio.wait_for(call(), timeout=max(deadline - time.monotonic(), 0.001))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not retryable(e):
+                raise
+            last_error = e
+        if attempt == attempts - 1:
+            break
+        delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            break
+        print(f"[{name}] {type(last_error).__name__}: {last_error} → retry in {delay:.1f}s")
+        await asyncio.sleep(delay)
+    raise RetryBudgetExceeded(attempt + 1, time.monotonic() - started, last_error)
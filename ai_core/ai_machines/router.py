@@ -0,0 +1,289 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable
+
+from ..state_machine.config import Config
+
+# Змінні середовища з ключами провайдерів
+PROVIDER_KEYS = {
+    "anthropic": "ANTHROPIC_API_KEY",
+    "gemini": "GEMINI_API_KEY",
+    "openrouter": "OPENROUTER_API_KEY",
+}
+COOLDOWN_STATUSES = {429, 503, 529}  # провайдер перевантажений або вичерпано ліміт
+
+_cache_hit: ContextVar[bool] = ContextVar("llm_cache_hit", default=False)
+
+
+def note_cache_hit():
+    """Провайдер відповів з кешу: таку тривалість не враховуємо в статистиці затримок"""
+    _cache_hit.set(True)
+
+
+class NoProviderAvailable(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class RoutedResponse:
+    text: str
+    provider: str  # провайдер, чия відповідь повернута
+    hedged: bool = False  # паралельно надсилався дублюючий запит іншому провайдеру
+    failovers: int = 0  # скільки провайдерів відмовили перед цим
+
+
+class ProviderStats:
+    """Ковзне вікно затримок і помилок одного провайдера"""
+
+    def __init__(self, window: int = 100):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)  # True — успіх
+        self.cooldown_until = 0.0
+        self.counts = {"success": 0, "error": 0, "throttled": 0, "cancelled": 0}
+
+    def percentile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+
+def _status(error: BaseException) -> int | None:
+    # retry_async загортає останню помилку в RetryBudgetExceeded
+    error = getattr(error, "last_error", None) or error
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int):
+        return status
+    message = str(error)
+    for code in COOLDOWN_STATUSES:
+        if str(code) in message:
+            return code
+    return None
+
+
+class ProviderRouter:
+    """
+    Вибір LLM провайдера за ковзною затримкою та часткою помилок.
+
+    Запит іде до найшвидшого здорового провайдера; якщо той не відповів за свій p95,
+    паралельно надсилається дублюючий (hedged) запит наступному — повертається перша відповідь.
+    Помилка провайдера одразу передає запит наступному, а 429/503 ще й ставлять провайдера
+    на паузу (cooldown). Провайдери без статистики вважаються повільними (default_latency),
+    тож спершу отримують трафік як запасні; порядок у priority розв'язує нічиї.
+    """
+
+    def __init__(
+        self,
+        priority: list[str],
+        hedge: bool = True,
+        hedge_min_delay: float = 1.0,
+        default_latency: float = 10.0,
+        min_samples: int = 10,
+        max_error_rate: float = 0.5,
+        cooldown: float = 30.0,
+        window: int = 100,
+    ):
+        self.priority = priority
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.default_latency = default_latency
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.stats = {name: ProviderStats(window) for name in priority}
+        self.hedged = 0
+
+    def _stats(self, name: str) -> ProviderStats:
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = ProviderStats()
+        return stats
+
+    def healthy(self, name: str) -> bool:
+        stats = self._stats(name)
+        if stats.cooldown_until > time.monotonic():
+            return False
+        return len(stats.outcomes) < self.min_samples or stats.error_rate <= self.max_error_rate
+
+    def expected_latency(self, name: str) -> float:
+        stats = self._stats(name)
+        if len(stats.latencies) < self.min_samples:
+            return self.default_latency
+        return stats.percentile(0.5)
+
+    def hedge_delay(self, name: str) -> float:
+        stats = self._stats(name)
+        p95 = stats.percentile(0.95) if len(stats.latencies) >= self.min_samples else None
+        return max(p95 or self.default_latency, self.hedge_min_delay)
+
+    def rank(self, names) -> list[str]:
+        """Здорові провайдери за очікуваною затримкою, далі — решта (як останній шанс)"""
+        order = {name: i for i, name in enumerate(self.priority)}
+        return sorted(names, key=lambda name: (
+            not self.healthy(name), self.expected_latency(name), order.get(name, len(order))))
+
+    def record(self, name: str, seconds: float | None, error: BaseException | None = None):
+        stats = self._stats(name)
+        if error is None:
+            stats.counts["success"] += 1
+            stats.outcomes.append(True)
+            if seconds is not None:
+                stats.latencies.append(seconds)
+            return
+        stats.outcomes.append(False)
+        if _status(error) in COOLDOWN_STATUSES:
+            stats.counts["throttled"] += 1
+            stats.cooldown_until = time.monotonic() + self.cooldown
+        else:
+            stats.counts["error"] += 1
+
+    async def _timed(self, name: str, call: Callable[[dict | None], Awaitable[str]], retry: dict | None) -> str:
+        _cache_hit.set(False)
+        started = time.monotonic()
+        try:
+            text = await call(retry)
+        except asyncio.CancelledError:
+            self._stats(name).counts["cancelled"] += 1
+            raise
+        except Exception as e:
+            self.record(name, None, e)
+            raise
+        self.record(name, None if _cache_hit.get() else time.monotonic() - started)
+        return text
+
+    async def generate(self, calls: dict[str, Callable[[dict | None], Awaitable[str]]]) -> RoutedResponse:
+        """
+        calls — провайдер -> фабрика запиту, що приймає політику повторів retry_async
+        (None — типова з Config.llm_retry). Поки є запасні провайдери, кожному дається одна спроба:
+        замість повторів на тому самому провайдері запит переходить до наступного.
+        """
+        queue = self.rank(calls)
+        if not queue:
+            raise NoProviderAvailable("No AI providers configured")
+        single_try = {**Config.llm_retry, "attempts": 1}
+        pending: dict[asyncio.Task, str] = {}
+
+        def start(name: str):
+            retry = single_try if queue else None
+            pending[asyncio.create_task(self._timed(name, calls[name], retry))] = name
+
+        start(queue.pop(0))
+        hedged = False
+        failovers = 0
+        last_error: BaseException | None = None
+        try:
+            while pending:
+                timeout = None
+                if self.hedge and not hedged and queue and len(pending) == 1:
+                    running = next(iter(pending.values()))
+                    timeout = self.hedge_delay(running)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    self.hedged += 1
+                    print(f"[LLM router] {running} slower than {timeout:.1f}s, hedging to {queue[0]}")
+                    start(queue.pop(0))
+                    continue
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is None:
+                        return RoutedResponse(task.result(), name, hedged, failovers)
+                    last_error = task.exception()
+                    failovers += 1
+                    print(f"[LLM router] {name} failed: {last_error}")
+                if not pending and queue:
+                    start(queue.pop(0))
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream(self, streams: dict[str, Callable[[], AsyncIterator[str]]],
+                     on_token: Callable[[str], Awaitable[None]]) -> RoutedResponse:
+        """
+        Потокова генерація без hedging: провайдери по черзі, доки один не відповість.
+        Перехід до наступного можливий лише до першого токена — далі помилка піднімається.
+        """
+        queue = self.rank(streams)
+        if not queue:
+            raise NoProviderAvailable("No AI providers configured")
+        failovers = 0
+        last_error: BaseException | None = None
+        for name in queue:
+            _cache_hit.set(False)
+            started = time.monotonic()
+            parts = []
+            try:
+                async for chunk in streams[name]():
+                    parts.append(chunk)
+                    await on_token(chunk)
+            except asyncio.CancelledError:
+                self._stats(name).counts["cancelled"] += 1
+                raise
+            except Exception as e:
+                self.record(name, None, e)
+                if parts:
+                    raise
+                last_error = e
+                failovers += 1
+                print(f"[LLM router] {name} stream failed: {e}")
+                continue
+            self.record(name, None if _cache_hit.get() else time.monotonic() - started)
+            return RoutedResponse("".join(parts), name, False, failovers)
+        raise last_error
+
+    def render(self) -> str:
+        """Стан провайдерів у форматі Prometheus"""
+        lines = [
+            "# HELP rf_llm_provider_requests_total LLM provider calls by outcome",
+            "# TYPE rf_llm_provider_requests_total counter",
+        ]
+        for name, stats in sorted(self.stats.items()):
+            for outcome, n in stats.counts.items():
+                lines.append(f'rf_llm_provider_requests_total{{provider="{name}",outcome="{outcome}"}} {n}')
+        lines += [
+            "# HELP rf_llm_provider_latency_seconds Rolling LLM provider latency",
+            "# TYPE rf_llm_provider_latency_seconds gauge",
+        ]
+        for name, stats in sorted(self.stats.items()):
+            for q in (0.5, 0.95):
+                value = stats.percentile(q)
+                if value is not None:
+                    lines.append(f'rf_llm_provider_latency_seconds{{provider="{name}",quantile="{q}"}} {value:.3f}')
+        lines += [
+            "# HELP rf_llm_provider_healthy Whether the provider is currently eligible as primary",
+            "# TYPE rf_llm_provider_healthy gauge",
+        ]
+        for name in sorted(self.stats):
+            lines.append(f'rf_llm_provider_healthy{{provider="{name}"}} {int(self.healthy(name))}')
+        lines += [
+            "# HELP rf_llm_hedged_requests_total Requests that were hedged to a second provider",
+            "# TYPE rf_llm_hedged_requests_total counter",
+            f"rf_llm_hedged_requests_total {self.hedged}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def configured_providers() -> list[str]:
+    """Провайдери з Config.llm_router["priority"], для яких задано ключ"""
+    return [name for name in Config.llm_router["priority"]
+            if os.getenv(PROVIDER_KEYS.get(name, ""), "").strip()]
+
+
+_default_router: ProviderRouter | None = None
+
+
+def get_llm_router() -> ProviderRouter:
+    """Спільний для процесу роутер (використовується лише з event loop)"""
+    global _default_router
+    if _default_router is None:
+        _default_router = ProviderRouter(**Config.llm_router)
+    return _default_router
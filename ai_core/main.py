@@ -2,6 +2,7 @@ from .text_formatter.main import TextFormatterMain
 from .requests_methods.main import RequestHandler
 from .state_machine.main import StateMachine
 from .requests_methods.steam.main import SteamMain
+from .requests_methods.report import DomainReport
 from .ai_machines.main import AIMachinesMain
 from dotenv import load_dotenv
 import pathlib
@@ -15,18 +16,33 @@ class AICoreMain:
         self.state_machine = StateMachine()
         self.state = self.state_machine.state
         self.config = self.state_machine.config
-        self.text_formatter = TextFormatterMain()
-        self.request_handler = RequestHandler()
+        # Спільний стан лише в межах цього екземпляра (одного запиту)
+        self.text_formatter = TextFormatterMain(self.state_machine)
+        self.request_handler = RequestHandler(self.state_machine)
     def text_format(self):
         self.text_formatter.run()
-    def request_handle(self, urls: list[str] = []):
+    def request_handle(self, urls: list[str] = [], deadline: float | None = None):
         self.state.insert_metadata("urls", urls)
-        meta = self.request_handler.handle_urls()
+        meta = self.request_handler.handle_urls(deadline)
         self.state.insert_metadata("urls_metadata", meta)
+    async def arequest_handle(self, urls: list[str] = [], deadline: float | None = None, on_probe=None):
+        self.state.insert_metadata("urls", urls)
+        meta = await self.request_handler.ahandle_urls(deadline, on_probe)
+        self.state.insert_metadata("urls_metadata", meta)
+    def metadata_dict(self) -> dict:
+        """Метадані стану з DomainReport, перетвореними на словники (для API)"""
+        metadata = dict(self.state.metadata)
+        if "urls_metadata" in metadata:
+            metadata["urls_metadata"] = [r.to_dict() if isinstance(r, DomainReport) else r for r in metadata["urls_metadata"]]
+        return metadata
     def steam_process(self, game_name: str = "Half-Life 2"):
         steam = SteamMain()
         self.state.insert_metadata("game_name", game_name)
         self.state.insert_metadata("steam_game_info", steam.get_steam_game_info_by_name(game_name))
+    async def asteam_process(self, game_name: str):
+        steam = SteamMain()
+        self.state.insert_metadata("game_name", game_name)
+        self.state.insert_metadata("steam_game_info", await steam.aget_steam_game_info_by_name(game_name))
     def run(self):
         # valid steam processing
         self.steam_process("Hades")
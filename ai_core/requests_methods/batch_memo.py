@@ -0,0 +1,45 @@
+import threading
+from typing import Any, Callable
+
+
+class _Entry:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Exception | None = None
+
+
+class BatchMemo:
+    """Спільні результати проб у межах однієї партії URL (наприклад, geo та RDAP за IP)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str], _Entry] = {}
+
+    def get_or_compute(self, kind: str, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Повертає збережений результат або обчислює його.
+        Паралельні виклики з тим самим ключем чекають на одне обчислення;
+        помилка теж запам'ятовується і повторно піднімається для кожного виклику.
+        """
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            owner = entry is None
+            if owner:
+                entry = self._entries[(kind, key)] = _Entry()
+
+        if owner:
+            try:
+                entry.value = fn()
+            except Exception as e:
+                entry.error = e
+            finally:
+                entry.done.set()
+        else:
+            entry.done.wait()
+
+        if entry.error is not None:
+            raise entry.error
+        return entry.value
@@ -0,0 +1,3 @@
+from .normalizer import DomainNormalizer, get_domain_normalizer, to_ascii, to_unicode
+
+__all__ = ["DomainNormalizer", "get_domain_normalizer", "to_ascii", "to_unicode"]
@@ -0,0 +1,151 @@
+import ipaddress
+import os
+import pathlib
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+# Зафіксований знімок Public Suffix List (https://publicsuffix.org), версія — у заголовку файлу.
+# Оновлюється заміною файлу; мережевих запитів під час роботи немає.
+DEFAULT_PSL_PATH = os.getenv("PSL_PATH") or str(pathlib.Path(__file__).resolve().parent / "public_suffix_list.dat")
+
+
+def to_ascii(host: str) -> str:
+    """IDN -> punycode по мітках (пример.рф -> xn--e1afmkfd.xn--p1ai); невалідні мітки лишаються як є"""
+    labels = []
+    for label in host.split("."):
+        try:
+            labels.append(label.encode("idna").decode("ascii") if label else label)
+        except UnicodeError:
+            labels.append(label)
+    return ".".join(labels)
+
+
+def to_unicode(host: str) -> str:
+    """punycode -> Unicode по мітках (xn--p1ai -> рф)"""
+    labels = []
+    for label in host.split("."):
+        try:
+            labels.append(label.encode("ascii").decode("idna") if label.startswith("xn--") else label)
+        except UnicodeError:
+            labels.append(label)
+    return ".".join(labels)
+
+
+class _Node:
+    __slots__ = ("children", "rule", "exception")
+
+    def __init__(self):
+        self.children: dict[str, "_Node"] = {}
+        self.rule = False
+        self.exception = False
+
+
+class DomainNormalizer:
+    """
+    Визначає зареєстрований домен (eTLD+1) за знімком Public Suffix List.
+    Правила зберігаються в trie по мітках справа наліво в punycode, тому
+    рф та xn--p1ai — одне й те саме. Результат повертається в Unicode,
+    як ключі ccTLD у правилах (напр. "пример.рф").
+    """
+
+    def __init__(self, path: str = DEFAULT_PSL_PATH, include_private: bool = False, cache_size: int = 65536):
+        self.path = path
+        self.include_private = include_private
+        self.root = _Node()
+        self.version = None
+        self._load()
+        # Ті самі хости повторюються постійно — запам'ятовуємо результат
+        self.registrable_domain = lru_cache(maxsize=cache_size)(self._registrable_domain)
+
+    def _load(self):
+        private = False
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("// VERSION:"):
+                    self.version = line.split(":", 1)[1].strip()
+                if line.startswith("// ===BEGIN PRIVATE DOMAINS==="):
+                    private = True
+                if not line or line.startswith("//") or (private and not self.include_private):
+                    continue
+                self._add_rule(line.split()[0])
+
+    def _add_rule(self, rule: str):
+        exception = rule.startswith("!")
+        node = self.root
+        for label in reversed(to_ascii(rule.lstrip("!").lower()).split(".")):
+            node = node.children.setdefault(label, _Node())
+        if exception:
+            node.exception = True
+        else:
+            node.rule = True
+
+    def suffix_length(self, labels: list[str]) -> int:
+        """Кількість міток публічного суфікса (labels — ASCII, зліва направо)"""
+        node = self.root
+        match = 1  # правило за замовчуванням "*": невідомий TLD сам є суфіксом
+        for depth, label in enumerate(reversed(labels), 1):
+            child = node.children.get(label)
+            if child is not None and child.exception:
+                return depth - 1
+            if (child is not None and child.rule) or "*" in node.children:
+                match = depth
+            if child is None:
+                child = node.children.get("*")
+                if child is None:
+                    break
+            node = child
+        return match
+
+    @staticmethod
+    def host(url: str) -> str | None:
+        """Хост з URL або голого домену, без порту, облікових даних і кінцевої крапки"""
+        url = url.strip()
+        if "://" not in url:
+            url = "//" + url
+        try:
+            host = urlsplit(url).hostname
+        except ValueError:
+            return None
+        return host.rstrip(".") or None if host else None
+
+    def _registrable_domain(self, url: str) -> str | None:
+        host = self.host(url)
+        if not host:
+            return None
+        try:
+            ipaddress.ip_address(host)
+            return host  # для IP адреси домену немає — перевіряємо саму адресу
+        except ValueError:
+            pass
+
+        labels = to_ascii(host.lower()).split(".")
+        suffix_length = self.suffix_length(labels)
+        registrable = labels[-(suffix_length + 1):] if len(labels) > suffix_length else labels
+        return to_unicode(".".join(registrable))
+
+    def public_suffix(self, url: str) -> str | None:
+        domain = self.registrable_domain(url)
+        if not domain:
+            return None
+        try:
+            ipaddress.ip_address(domain)
+            return None
+        except ValueError:
+            pass
+        labels = to_ascii(domain).split(".")
+        return to_unicode(".".join(labels[-self.suffix_length(labels):]))
+
+
+_default_normalizer: DomainNormalizer | None = None
+_default_normalizer_lock = threading.Lock()
+
+
+def get_domain_normalizer() -> DomainNormalizer:
+    """Спільний для процесу нормалізатор (знімок PSL завантажується один раз)"""
+    global _default_normalizer
+    with _default_normalizer_lock:
+        if _default_normalizer is None:
+            _default_normalizer = DomainNormalizer()
+        return _default_normalizer
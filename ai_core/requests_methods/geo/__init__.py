@@ -0,0 +1,3 @@
+from .ip_ranges import IpRangeIndex, compile_database, get_ip_index
+
+__all__ = ["IpRangeIndex", "compile_database", "get_ip_index"]
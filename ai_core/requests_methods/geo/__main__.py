@@ -0,0 +1,43 @@
+import pathlib
+import sys
+import time
+
+from ..http_client import get_http_client
+from .ip_ranges import DEFAULT_DB_PATH, DEFAULT_SOURCE_URL, IpRangeIndex, compile_database
+
+
+def reload_database(source: str = DEFAULT_SOURCE_URL, path: str = DEFAULT_DB_PATH):
+    """Завантажує свіжий дамп (URL або локальний файл) і перекомпілює базу"""
+    print(f"⬇️  Завантаження дампу: {source}")
+    if source.startswith(("http://", "https://")):
+        resp = get_http_client().get(source, timeout=120)
+        resp.raise_for_status()
+        data = resp.content
+    else:
+        data = pathlib.Path(source).read_bytes()
+    started = time.perf_counter()
+    count = compile_database(data, path)
+    print(f"✅ {count} діапазонів записано у {path} за {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1].lower() if len(sys.argv) > 1 else "info"
+
+    if command == "reload":
+        reload_database(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_SOURCE_URL)
+    elif command == "lookup" and len(sys.argv) > 2:
+        index = IpRangeIndex()
+        for ip in sys.argv[2:]:
+            print(f"{ip}: {index.lookup(ip)}")
+    elif command == "info":
+        index = IpRangeIndex()
+        if index.loaded:
+            print(f"📦 {DEFAULT_DB_PATH}: {len(index)} діапазонів")
+        else:
+            print(f"❌ База не знайдена: {DEFAULT_DB_PATH}. Запустіть: python -m ai_core.requests_methods.geo reload")
+    else:
+        print(f"❌ Невідома команда: {command}")
+        print("\nДоступні команди:")
+        print("  reload [url|file] - завантажити дамп і перекомпілювати базу")
+        print("  lookup <ip> ...   - знайти країну/ASN/організацію для IP")
+        print("  info              - інформація про базу")
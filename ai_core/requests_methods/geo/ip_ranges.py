@@ -0,0 +1,197 @@
+import csv
+import gzip
+import io
+import ipaddress
+import json
+import mmap
+import os
+import pathlib
+import struct
+import threading
+import time
+from typing import Iterable
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parents[3]
+DEFAULT_DB_PATH = os.getenv("IP_RANGES_DB") or str(ROOT_DIR / "storage" / "ip_ranges.bin")
+# Дамп iptoasn.com: range_start, range_end, AS_number, country_code, AS_description
+DEFAULT_SOURCE_URL = "https://iptoasn.com/data/ip2asn-combined.tsv.gz"
+
+MAGIC = b"RFIPDB01"
+HEADER = struct.Struct("<8sII")          # magic, кількість діапазонів, зсув таблиці рядків
+RECORD = struct.Struct("<16s16sI2sI")    # start, end, asn, country, зсув org у таблиці рядків
+STRING_LEN = struct.Struct("<H")
+
+with open(pathlib.Path(__file__).resolve().parent / "countries.json", "r", encoding="utf-8") as f:
+    # ISO код -> назва країни в тому ж вигляді, що повертає ipapi.co (напр. "RU" -> "Russia")
+    COUNTRY_NAMES: dict[str, str] = json.load(f)
+
+
+def ip_key(ip: str) -> bytes:
+    """16-байтовий ключ IP для порівняння; IPv4 зберігається як ::ffff:a.b.c.d"""
+    addr = ipaddress.ip_address(ip.strip())
+    if addr.version == 4:
+        return b"\x00" * 10 + b"\xff\xff" + addr.packed
+    return addr.packed
+
+
+def _read_rows(data: bytes) -> Iterable[tuple[str, str, int, str, str]]:
+    """Читає TSV (iptoasn) або CSV з тими ж п'ятьма колонками, за потреби розпаковує gzip"""
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    text = data.decode("utf-8", errors="replace")
+    first_line = text.split("\n", 1)[0]
+    reader = csv.reader(io.StringIO(text), delimiter="\t" if "\t" in first_line else ",")
+    for row in reader:
+        if len(row) < 5 or row[0].startswith("#"):
+            continue
+        try:
+            asn = int(row[2].upper().removeprefix("AS"))
+        except ValueError:
+            continue  # рядок заголовка
+        yield row[0], row[1], asn, row[3], row[4]
+
+
+def compile_database(data: bytes, path: str = DEFAULT_DB_PATH) -> int:
+    """
+    Компілює дамп діапазонів у бінарний файл, відсортований за початком діапазону.
+    Файл замінюється атомарно, тож воркери, що його читають, не бачать напівзаписаних даних.
+    """
+    records = []
+    strings = bytearray()
+    string_offsets: dict[str, int] = {}
+    for start, end, asn, country, org in _read_rows(data):
+        # AS 0 у дампі iptoasn — "Not routed", корисної інформації немає
+        if asn == 0:
+            continue
+        try:
+            start_key, end_key = ip_key(start), ip_key(end)
+        except ValueError:
+            continue
+        org = org.strip()
+        if org not in string_offsets:
+            string_offsets[org] = len(strings)
+            encoded = org.encode("utf-8")[:65535]
+            strings += STRING_LEN.pack(len(encoded)) + encoded
+        # iptoasn пише "None" для діапазонів без країни
+        country = country.strip().upper()
+        country_code = (country if len(country) == 2 else "  ").encode("ascii", errors="replace")
+        records.append((start_key, end_key, asn, country_code, string_offsets[org]))
+    records.sort(key=lambda r: r[0])
+
+    path_obj = pathlib.Path(path)
+    path_obj.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path_obj.with_suffix(path_obj.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(records), HEADER.size + len(records) * RECORD.size))
+        for record in records:
+            f.write(RECORD.pack(*record))
+        f.write(strings)
+    os.replace(tmp_path, path_obj)
+    return len(records)
+
+
+class IpRangeIndex:
+    """
+    Локальний індекс IP-діапазонів: країна, ASN та організація без мережевих запитів.
+    Файл відображається в пам'ять (mmap), тому всі воркери на хості ділять одні сторінки,
+    а пошук — це двійковий пошук по записах фіксованого розміру.
+    """
+
+    RELOAD_CHECK_INTERVAL = 60  # секунд між перевірками, чи не оновився файл
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # (mmap, кількість діапазонів, зсув таблиці рядків) — замінюється одним присвоєнням
+        self._db: tuple[mmap.mmap, int, int] | None = None
+        self._file_id = None
+        self._last_check = 0.0
+        self._open()
+
+    def _open(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._db, self._file_id = None, None
+            return
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_id == self._file_id:
+            return
+        try:
+            with open(self.path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, count, strings_offset = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f"Unknown IP ranges database format: {self.path}")
+        except (OSError, ValueError, struct.error) as e:
+            print(f"⚠️  Не вдалося відкрити базу IP-діапазонів: {e}")
+            return
+        # Старий mmap не закриваємо явно: паралельний lookup може ще читати з нього,
+        # він закриється сам, коли зникне останнє посилання
+        self._db, self._file_id = (mm, count, strings_offset), file_id
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < self.RELOAD_CHECK_INTERVAL:
+            return
+        with self._lock:
+            self._last_check = now
+            self._open()
+
+    @property
+    def loaded(self) -> bool:
+        return self._db is not None
+
+    def __len__(self) -> int:
+        return self._db[1] if self._db else 0
+
+    def lookup(self, ip: str) -> dict | None:
+        """Повертає дані у форматі ipapi.co (country_name, asn, org) або None, якщо IP не знайдено"""
+        self._maybe_reload()
+        db = self._db
+        if db is None:
+            return None
+        mm, count, strings_offset = db
+        try:
+            key = ip_key(ip)
+        except ValueError:
+            return None
+
+        # Останній діапазон, що починається не пізніше за key
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = HEADER.size + mid * RECORD.size
+            if mm[offset:offset + 16] <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            return None
+        start, end, asn, country, org_offset = RECORD.unpack_from(mm, HEADER.size + (lo - 1) * RECORD.size)
+        if key > end:
+            return None
+
+        string_pos = strings_offset + org_offset
+        (length,) = STRING_LEN.unpack_from(mm, string_pos)
+        org = mm[string_pos + STRING_LEN.size:string_pos + STRING_LEN.size + length].decode("utf-8")
+        country_code = country.decode("ascii").strip()
+        return {
+            "country_code": country_code,
+            "country_name": COUNTRY_NAMES.get(country_code, country_code or None),
+            "asn": f"AS{asn}",
+            "org": org,
+        }
+
+
+_default_index: IpRangeIndex | None = None
+_default_index_lock = threading.Lock()
+
+
+def get_ip_index() -> IpRangeIndex:
+    """Спільний для процесу індекс (відкривається при першому використанні)"""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = IpRangeIndex()
+        return _default_index
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) секунд
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class HttpClient:
+    """
+    Спільний для процесу пул HTTP з'єднань (keep-alive) для всіх вихідних запитів.
+    pool_maxsize — максимум одночасних з'єднань на один хост.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 32,
+        pool_maxsize: int = 8,
+        retries: int = 2,
+        backoff_factor: float = 0.3,
+        timeout: float | tuple[float, float] = DEFAULT_TIMEOUT,
+    ):
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        # pool_block: при вичерпанні пулу чекаємо вільного з'єднання, а не відкриваємо нове
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                              max_retries=retry, pool_block=True)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, url: str, timeout=None, **kwargs) -> requests.Response:
+        return self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHttpClient:
+    """Асинхронний варіант HttpClient на httpx з тими ж лімітами та повторами"""
+
+    def __init__(
+        self,
+        max_connections: int = 64,
+        max_connections_per_host: int = 8,
+        retries: int = 2,
+        backoff_factor: float = 0.3,
+        timeout: float | tuple[float, float] = DEFAULT_TIMEOUT,
+    ):
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        try:
+            import h2  # noqa: F401  pip install h2 — вмикає HTTP/2
+            http2 = True
+        except ImportError:
+            http2 = False
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            # Транспорт повторює лише помилки з'єднання; статуси обробляємо в request
+            transport=httpx.AsyncHTTPTransport(http2=http2, retries=retries),
+        )
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_connections_per_host = max_connections_per_host
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = httpx.URL(url).host
+        sem = self._host_semaphores.get(host)
+        if sem is None:
+            sem = self._host_semaphores[host] = asyncio.Semaphore(self.max_connections_per_host)
+        return sem
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        async with self._host_semaphore(url):
+            for attempt in range(self.retries + 1):
+                response = await self.client.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries or method not in ("GET", "HEAD"):
+                    return response
+                await response.aclose()
+                await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+        return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def head(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("HEAD", url, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_default_client: HttpClient | None = None
+_default_async_client: AsyncHttpClient | None = None
+_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Спільний для процесу синхронний клієнт"""
+    global _default_client
+    with _lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+
+def get_async_http_client() -> AsyncHttpClient:
+    """Спільний асинхронний клієнт (використовувати з одного event loop, напр. FastAPI)"""
+    global _default_async_client
+    with _lock:
+        if _default_async_client is None:
+            _default_async_client = AsyncHttpClient()
+        return _default_async_client
+
+
+async def close_http_clients():
+    """Закриває спільні клієнти (викликається при зупинці застосунку)"""
+    global _default_client, _default_async_client
+    with _lock:
+        client, async_client = _default_client, _default_async_client
+        _default_client = _default_async_client = None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.aclose()
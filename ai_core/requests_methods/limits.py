@@ -0,0 +1,55 @@
+import threading
+from contextlib import contextmanager
+
+
+class UpstreamLimits:
+    """Обмежує кількість одночасних запитів до кожного зовнішнього сервісу"""
+
+    # upstream -> макс. одночасних запитів на один ключ (сервер WHOIS, цільовий хост тощо)
+    DEFAULT_LIMITS = {
+        "ipapi": 4,   # ipapi.co — жорсткий rate limit
+        "whois": 2,   # на один WHOIS сервер (ключ — TLD)
+        "rdap": 4,
+        "host": 2,    # на один цільовий хост (TLS/HTTP)
+    }
+
+    def __init__(self, limits: dict[str, int] | None = None):
+        self.limits = {**self.DEFAULT_LIMITS, **(limits or {})}
+        # (upstream, key) -> [семафор, кількість потоків, що його тримають або чекають]
+        self._semaphores: dict[tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def _acquire_entry(self, upstream: str, key: str, limit: int) -> threading.BoundedSemaphore:
+        with self._lock:
+            entry = self._semaphores.get((upstream, key))
+            if entry is None:
+                entry = self._semaphores[(upstream, key)] = [threading.BoundedSemaphore(limit), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def _release_entry(self, upstream: str, key: str):
+        # Ключ (напр. цільовий домен) може більше не зустрітись — простоюючий семафор видаляємо,
+        # щоб масове сканування не накопичувало запис на кожен домен
+        with self._lock:
+            entry = self._semaphores[(upstream, key)]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._semaphores[(upstream, key)]
+
+    @contextmanager
+    def slot(self, upstream: str, key: str = ""):
+        """Чекає вільного слоту для upstream (і ключа всередині нього)"""
+        limit = self.limits.get(upstream)
+        if not limit:
+            yield
+            return
+        sem = self._acquire_entry(upstream, key, limit)
+        try:
+            with sem:
+                yield
+        finally:
+            self._release_entry(upstream, key)
+
+
+# Спільні для всього процесу ліміти, щоб паралельні запити до API не перевищували їх разом
+default_limits = UpstreamLimits()
@@ -1,13 +1,26 @@
 from .urls_checker import UrlsChecker
+from .prefetch import get_hot_domains
 from ..state_machine.main import StateMachine
 class RequestHandler:
-    def __init__(self):
-        self.state_machine =StateMachine()
+    def __init__(self, state_machine: StateMachine | None = None):
+        self.state_machine = state_machine or StateMachine()
         self.state = self.state_machine.state
         self.config = self.state_machine.config
-    def handle_urls(self):
+    def handle_urls(self, deadline: float | None = None):
         urls = self.state.metadata.get("urls", [])
         print(f"Handling URLs: {urls}")
+        hot = get_hot_domains()
+        hot.record_urls(urls)
         checker = UrlsChecker(urls)
-        results = checker.run()
+        with hot.interactive():
+            results = checker.run(deadline=deadline)
         return results
+    async def ahandle_urls(self, deadline: float | None = None, on_probe=None):
+        """on_probe(report, probe, record) — колбек для кожного результату проби (з потоку проби)"""
+        urls = self.state.metadata.get("urls", [])
+        print(f"Handling URLs (async): {urls}")
+        hot = get_hot_domains()
+        hot.record_urls(urls)
+        checker = UrlsChecker(urls, on_probe=on_probe)
+        with hot.interactive():
+            return await checker.arun(deadline=deadline)
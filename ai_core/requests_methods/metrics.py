@@ -0,0 +1,173 @@
+import threading
+import time
+from typing import Any, Callable
+
+# Межі кошиків гістограми тривалості проб, секунди
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+OUTCOMES = ("success", "error", "timeout", "reused")  # reused — дані з попереднього звіту ще свіжі
+
+_probe_local = threading.local()
+
+
+def note_cache(outcome: str):
+    """
+    Кеші повідомляють, чим завершився пошук (hit/negative_hit/miss), щоб тривалість
+    проби, яка зараз виконується в цьому потоці, потрапила з відповідною міткою cache.
+    """
+    outcomes = getattr(_probe_local, "cache", None)
+    if outcomes is not None:
+        outcomes.add(outcome)
+
+
+def note_fetched_at(fetched_at: float | None):
+    """
+    Кеші повідомляють, коли (time.time()) було отримано віддані дані: проба, що використала
+    дані з кешу, не свіжіша за найстаріші з них. None — час невідомий (вважаємо свіжими).
+    """
+    oldest = getattr(_probe_local, "fetched_at", None)
+    if oldest is not None and fetched_at is not None and fetched_at < oldest:
+        _probe_local.fetched_at = fetched_at
+
+
+def track_fetched_at(probe: str, fn: Callable[[], Any], sink: dict[str, float]) -> Callable[[], Any]:
+    """Обгортка проби: sink[probe] — час отримання найстаріших використаних даних (старт проби, якщо всі свіжі)"""
+    def run():
+        _probe_local.fetched_at = time.time()
+        try:
+            return fn()
+        finally:
+            sink[probe] = _probe_local.fetched_at
+            _probe_local.fetched_at = None
+    return run
+
+
+def _cache_label(outcomes: set[str]) -> str:
+    if not outcomes:
+        return "none"  # проба не зверталась до кешів (або відповідь узято з пам'яті партії)
+    if "miss" in outcomes:
+        return "miss"
+    return "hit"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{str(v)}"' for k, v in labels.items())
+
+
+class ProbeMetrics:
+    """Тривалість і результати проб UrlsChecker у форматі Prometheus (у межах процесу)"""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bucket_bounds = buckets
+        self._lock = threading.Lock()
+        self._histograms: dict[tuple[str, str], _Histogram] = {}
+        self._outcomes: dict[tuple[str, str], int] = {}
+
+    def observe(self, probe: str, seconds: float, cache: str = "none"):
+        with self._lock:
+            histogram = self._histograms.get((probe, cache))
+            if histogram is None:
+                histogram = self._histograms[(probe, cache)] = _Histogram(len(self.bucket_bounds))
+            for i, bound in enumerate(self.bucket_bounds):
+                if seconds <= bound:
+                    histogram.buckets[i] += 1
+                    break
+            histogram.sum += seconds
+            histogram.count += 1
+
+    def count(self, probe: str, outcome: str):
+        with self._lock:
+            self._outcomes[(probe, outcome)] = self._outcomes.get((probe, outcome), 0) + 1
+
+    def timed(self, probe: str, fn: Callable[[], Any]) -> Callable[[], Any]:
+        """
+        Обгортка проби для ProbeGraph. Тривалість пишеться, навіть якщо проба завершилась
+        після дедлайну і її результат відкинуто — так видно реальний розподіл для вибору таймаутів.
+        """
+        def run():
+            _probe_local.cache = set()
+            started = time.perf_counter()
+            try:
+                return fn()
+            finally:
+                cache = _cache_label(_probe_local.cache)
+                _probe_local.cache = None
+                self.observe(probe, time.perf_counter() - started, cache)
+        return run
+
+    def render(self) -> list[str]:
+        with self._lock:
+            histograms = {key: (list(h.buckets), h.sum, h.count) for key, h in self._histograms.items()}
+            outcomes = dict(self._outcomes)
+
+        lines = [
+            "# HELP rf_probe_duration_seconds UrlsChecker probe duration",
+            "# TYPE rf_probe_duration_seconds histogram",
+        ]
+        for (probe, cache), (buckets, total, count) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, n in zip(self.bucket_bounds, buckets):
+                cumulative += n
+                lines.append(f'rf_probe_duration_seconds_bucket{{{_labels(probe=probe, cache=cache, le=bound)}}} {cumulative}')
+            lines.append(f'rf_probe_duration_seconds_bucket{{{_labels(probe=probe, cache=cache, le="+Inf")}}} {count}')
+            lines.append(f'rf_probe_duration_seconds_sum{{{_labels(probe=probe, cache=cache)}}} {total:.6f}')
+            lines.append(f'rf_probe_duration_seconds_count{{{_labels(probe=probe, cache=cache)}}} {count}')
+
+        lines += [
+            "# HELP rf_probe_total UrlsChecker probe outcomes",
+            "# TYPE rf_probe_total counter",
+        ]
+        for (probe, outcome), n in sorted(outcomes.items()):
+            lines.append(f'rf_probe_total{{{_labels(probe=probe, outcome=outcome)}}} {n}')
+        return lines
+
+
+def render_prometheus() -> str:
+    """Усі метрики перевірки URL: проби, персистентний кеш проб і індекс RDAP блоків"""
+    from .probe_cache import get_probe_cache
+    from .rdap_cache import get_rdap_cache
+
+    lines = get_probe_metrics().render()
+    lines += [
+        "# HELP rf_probe_cache_requests_total Probe cache lookups by result",
+        "# TYPE rf_probe_cache_requests_total counter",
+    ]
+    for probe, counters in sorted(get_probe_cache().stats().items()):
+        for result, n in counters.items():
+            lines.append(f'rf_probe_cache_requests_total{{{_labels(probe=probe, result=result)}}} {n}')
+
+    rdap = get_rdap_cache().stats()
+    lines += [
+        "# HELP rf_rdap_network_cache_requests_total RDAP network index lookups by result",
+        "# TYPE rf_rdap_network_cache_requests_total counter",
+    ]
+    for result in ("hit", "miss", "expired", "evicted"):
+        lines.append(f'rf_rdap_network_cache_requests_total{{{_labels(result=result)}}} {rdap[result]}')
+    lines += [
+        "# HELP rf_rdap_network_cache_networks Network blocks held in the RDAP index",
+        "# TYPE rf_rdap_network_cache_networks gauge",
+        f"rf_rdap_network_cache_networks {rdap['networks']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+_default_metrics: ProbeMetrics | None = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_probe_metrics() -> ProbeMetrics:
+    """Спільні для процесу метрики проб"""
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = ProbeMetrics()
+        return _default_metrics
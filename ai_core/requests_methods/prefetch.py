@@ -0,0 +1,204 @@
+import heapq
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable
+
+from .batch_memo import BatchMemo
+from .probe_cache import get_probe_cache
+from .report_store import ReportStore, get_report_store
+from .urls_checker import UrlsChecker
+
+
+class HotDomains:
+    """
+    Частота запитів по зареєстрованих доменах з експоненційним згасанням:
+    кожен запит додає 1, а накопичений рахунок зменшується вдвічі кожні half_life секунд.
+    Кількість доменів обмежена — при переповненні відкидаються найхолодніші.
+    """
+
+    def __init__(self, half_life: float = 3600.0, max_domains: int = 20_000):
+        self.half_life = half_life
+        self.max_domains = max_domains
+        self._lock = threading.Lock()
+        self._scores: dict[str, tuple[float, float]] = {}  # домен -> (рахунок, момент оновлення)
+        self._interactive = 0  # перевірок користувачів, що виконуються зараз
+
+    def _decayed(self, score: float, updated: float, now: float) -> float:
+        return score * math.exp2(-(now - updated) / self.half_life)
+
+    def record(self, domains: Iterable[str]):
+        now = time.monotonic()
+        with self._lock:
+            for domain in domains:
+                score, updated = self._scores.get(domain, (0.0, now))
+                self._scores[domain] = (self._decayed(score, updated, now) + 1.0, now)
+            if len(self._scores) > self.max_domains:
+                self._prune(now)
+
+    def record_urls(self, urls: Iterable[str]):
+        domains = []
+        for url in urls:
+            try:
+                domains.append(UrlsChecker.registrable_domain(url))
+            except ValueError:
+                continue
+        self.record(set(domains))
+
+    def _prune(self, now: float):
+        """Лишає найгарячішу половину ліміту (викликається під self._lock)"""
+        keep = heapq.nlargest(self.max_domains // 2, self._scores.items(),
+                              key=lambda item: self._decayed(*item[1], now))
+        self._scores = dict(keep)
+
+    def top(self, n: int, min_score: float = 0.0) -> list[tuple[str, float]]:
+        now = time.monotonic()
+        with self._lock:
+            scored = [(domain, self._decayed(score, updated, now)) for domain, (score, updated) in self._scores.items()]
+        return [item for item in heapq.nlargest(n, scored, key=lambda item: item[1]) if item[1] >= min_score]
+
+    @contextmanager
+    def interactive(self):
+        """Позначає перевірку користувача: поки такі є, фонове оновлення чекає"""
+        with self._lock:
+            self._interactive += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._interactive -= 1
+
+    @property
+    def busy(self) -> bool:
+        return self._interactive > 0
+
+
+class Prefetcher:
+    """
+    Фоновий потік, що заздалегідь оновлює звіти найпопулярніших доменів,
+    поки їхні дані (і записи кешу проб) не застаріли.
+
+    Не заважає запитам користувачів: одна перевірка за раз, не частіше per_minute на хвилину,
+    і пауза, поки виконуються інтерактивні перевірки.
+    """
+
+    def __init__(
+        self,
+        hot: HotDomains,
+        top_n: int = 100,
+        per_minute: float = 20,
+        lead: float = 600,
+        interval: float = 60,
+        min_score: float = 2.0,
+        store: ReportStore | None = None,
+        checker: UrlsChecker | None = None,
+    ):
+        self.hot = hot
+        self.top_n = top_n
+        self.min_interval = 60.0 / per_minute
+        self.lead = lead  # за скільки секунд до застарівання оновлювати
+        self.interval = interval
+        self.min_score = min_score
+        self.store = store or get_report_store()
+        # Окремий checker з невеликим пулом; кеш проб віддає промах для записів, що скоро сплинуть
+        self.checker = checker or UrlsChecker([], max_workers=2, store=self.store,
+                                              cache=get_probe_cache().refreshing(lead))
+        self.refreshed = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last_refresh = 0.0
+
+    def due(self, domain: str) -> bool:
+        report = self.store.get(domain)
+        if report is None:
+            return True
+        # Проби, що ще жодного разу не вдались (мертвий домен), не женемо по колу — лише ті, що скоро застаріють
+        return any(name in report.probed_at for name in self.checker.stale_probe_names(report, self.lead))
+
+    def _wait_turn(self) -> bool:
+        """Чекає, поки дозволяє ліміт частоти і немає інтерактивних перевірок; False — зупинка"""
+        while not self._stop.is_set():
+            delay = self._last_refresh + self.min_interval - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+            elif self.hot.busy:
+                self._stop.wait(1.0)
+            else:
+                return True
+        return False
+
+    def run_once(self) -> int:
+        refreshed = 0
+        for domain, _ in self.hot.top(self.top_n, self.min_score):
+            if not self.due(domain):
+                continue
+            if not self._wait_turn():
+                break
+            self._last_refresh = time.monotonic()
+            # Checker живе весь час роботи, а пам'ять партії — лише на один домен:
+            # інакше geo/RDAP за IP віддавались би з першого циклу й ніколи не оновлювались
+            self.checker.memo = BatchMemo()
+            try:
+                self.checker.check(domain, refresh_ahead=self.lead)
+                refreshed += 1
+            except Exception as e:
+                print(f"⚠️  Prefetch {domain}: {e}")
+        self.refreshed += refreshed
+        return refreshed
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                refreshed = self.run_once()
+                if refreshed:
+                    print(f"🔄 Prefetch: оновлено {refreshed} популярних доменів")
+            except Exception as e:
+                print(f"⚠️  Prefetch error: {e}")
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="domain-prefetch", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+_hot_domains: HotDomains | None = None
+_prefetcher: Prefetcher | None = None
+_lock = threading.Lock()
+
+
+def get_hot_domains() -> HotDomains:
+    """Спільний для процесу лічильник популярних доменів"""
+    global _hot_domains
+    with _lock:
+        if _hot_domains is None:
+            _hot_domains = HotDomains()
+        return _hot_domains
+
+
+def start_prefetcher(top_n: int = 100, per_minute: float = 20, lead: float = 600) -> Prefetcher | None:
+    """Запускає фонове оновлення (викликається при старті застосунку); top_n=0 — вимкнено"""
+    global _prefetcher
+    if not top_n or not per_minute:
+        return None
+    hot = get_hot_domains()
+    with _lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher(hot, top_n=top_n, per_minute=per_minute, lead=lead)
+        _prefetcher.start()
+        return _prefetcher
+
+
+def stop_prefetcher():
+    global _prefetcher
+    with _lock:
+        prefetcher, _prefetcher = _prefetcher, None
+    if prefetcher is not None:
+        prefetcher.stop()
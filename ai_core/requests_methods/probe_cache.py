@@ -0,0 +1,115 @@
+import copy
+import threading
+import time
+from typing import Any, Callable
+import diskcache as dc
+
+from .metrics import note_cache, note_fetched_at
+
+
+class CachedProbeError(Exception):
+    """Збережена (негативно закешована) помилка проби"""
+
+
+class ProbeCache:
+    """
+    Персистентний кеш результатів проб на diskcache.
+    Спільний для всіх воркерів на одному хості й переживає перезапуск.
+    """
+
+    # Секунди життя запису для кожної проби
+    DEFAULT_TTLS = {
+        "whois": 3 * 24 * 3600,  # реєстраційні дані змінюються днями
+        "rdap": 24 * 3600,
+        "geo": 6 * 3600,
+        "dns": 3600,
+        "ip": 3600,
+        "tls": 12 * 3600,
+    }
+    # Помилки кешуємо коротко, щоб не довбати сервіс, який щойно впав
+    NEGATIVE_TTL = 300
+
+    def __init__(
+        self,
+        directory: str = ".ai_core_probe_cache_v1",
+        ttls: dict[str, int] | None = None,
+        negative_ttl: int = NEGATIVE_TTL,
+        size_limit: int = 256 * 1024 * 1024,
+    ):
+        self.cache = dc.Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict[str, int]] = {}
+        self.refresh_ahead = 0.0
+
+    def refreshing(self, ahead: float) -> "ProbeCache":
+        """
+        Той самий кеш, але записи, яким лишилось жити менше ahead секунд, вважаються промахом
+        і оновлюються заздалегідь (для фонового оновлення популярних доменів).
+        """
+        view = copy.copy(self)
+        view.refresh_ahead = ahead
+        return view
+
+    def _count(self, probe: str, outcome: str):
+        note_cache(outcome)
+        with self._lock:
+            counters = self._stats.setdefault(probe, {"hit": 0, "negative_hit": 0, "miss": 0})
+            counters[outcome] += 1
+
+    def get_or_fetch(self, probe: str, key: str, fetch: Callable[[], Any]) -> Any:
+        """
+        Повертає закешований результат проби або викликає fetch і кешує його.
+        Закешована помилка піднімається як CachedProbeError з тим самим текстом.
+        """
+        return self.get_or_fetch_timed(probe, key, fetch)[0]
+
+    def get_or_fetch_timed(self, probe: str, key: str, fetch: Callable[[], Any]) -> tuple[Any, float | None]:
+        """Те саме, але разом із часом отримання даних (time.time(); None — невідомо)"""
+        cache_key = f"{probe}:{key}"
+        entry, expire_at = self.cache.get(cache_key, expire_time=True)
+        if entry is not None and self.refresh_ahead:
+            if expire_at is not None and expire_at - time.time() < self.refresh_ahead:
+                entry = None
+        if entry is not None:
+            ok, value = entry
+            if ok:
+                # Записи зберігаються з TTL проби, тож час отримання = кінець життя - TTL
+                ttl = self.ttls.get(probe)
+                fetched_at = expire_at - ttl if expire_at is not None and ttl else None
+                self._count(probe, "hit")
+                note_fetched_at(fetched_at)
+                return value, fetched_at
+            self._count(probe, "negative_hit")
+            raise CachedProbeError(value)
+
+        self._count(probe, "miss")
+        try:
+            value = fetch()
+        except Exception as e:
+            self.cache.set(cache_key, (False, str(e)), expire=self.negative_ttl)
+            raise
+        self.cache.set(cache_key, (True, value), expire=self.ttls.get(probe))
+        return value, time.time()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Лічильники hit/miss по пробах для поточного процесу"""
+        with self._lock:
+            return {probe: dict(counters) for probe, counters in self._stats.items()}
+
+    def clear(self):
+        self.cache.clear()
+
+
+_default_cache: ProbeCache | None = None
+_default_cache_lock = threading.Lock()
+
+
+def get_probe_cache() -> ProbeCache:
+    """Спільний для процесу екземпляр ProbeCache (створюється при першому використанні)"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ProbeCache()
+        return _default_cache
@@ -0,0 +1,124 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Iterable
+
+
+def _noop():
+    return None
+
+
+class ProbeGraph:
+    """Виконує проби паралельно з урахуванням залежностей між ними"""
+
+    def __init__(self, max_workers: int = 8):
+        self.max_workers = max_workers
+        self.probes: dict[str, tuple[Callable[[], Any], tuple[str, ...], bool]] = {}
+        self.failures: dict[str, Exception] = {}
+        self.timed_out: list[str] = []
+
+    def add(self, name: str, fn: Callable[[], Any], deps: Iterable[str] = (), local: bool = False) -> "ProbeGraph":
+        """
+        Реєструє пробу та імена проб, результати яких їй потрібні.
+        local=True — проба лише обробляє вже зібрані дані (без мережі): вона виконується
+        одразу в потоці run і відпрацьовує навіть після вичерпання дедлайну.
+        """
+        if name in self.probes:
+            raise ValueError(f"Probe '{name}' already registered")
+        self.probes[name] = (fn, tuple(deps), local)
+        return self
+
+    def skip(self, names: Iterable[str]):
+        """Проби, дані яких уже є: вони не запускаються, але одразу розблоковують залежні"""
+        for name in names:
+            _, deps, _ = self.probes[name]
+            self.probes[name] = (_noop, deps, True)
+
+    def downstream(self, names: Iterable[str]) -> set[str]:
+        """Проби names разом з усіма, що від них (транзитивно) залежать"""
+        result = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for name, (_, deps, _) in self.probes.items():
+                if name not in result and any(d in result for d in deps):
+                    result.add(name)
+                    changed = True
+        return result
+
+    def _check_deps(self):
+        for name, (_, deps, _) in self.probes.items():
+            missing = [d for d in deps if d not in self.probes]
+            if missing:
+                raise ValueError(f"Probe '{name}' depends on unknown probes: {missing}")
+
+    def run(
+        self,
+        on_result: Callable[[str, Any], None] | None = None,
+        deadline_at: float | None = None,
+    ) -> dict[str, Any]:
+        """
+        Запускає всі проби. Проба стартує одразу, як тільки завершились її залежності.
+        on_result викликається в потоці, що викликав run, тож може безпечно змінювати спільний стан.
+
+        deadline_at — момент за time.monotonic(). Мережеві проби, що не встигли до нього,
+        потрапляють у timed_out (їхні результати відкидаються), а локальні проби
+        доробляють на тих даних, що вже є.
+        """
+        self._check_deps()
+        self.failures = {}
+        self.timed_out = []
+        results: dict[str, Any] = {}
+        pending = dict(self.probes)
+        running = {}
+        expired = False
+
+        def finish(name: str, call: Callable[[], Any]):
+            try:
+                results[name] = call()
+            except Exception as e:
+                # Залежні проби все одно запускаються — як і при послідовному виконанні
+                self.failures[name] = e
+                results[name] = None
+            if on_result:
+                on_result(name, results[name])
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while pending or running:
+                progressed = False
+                for name, (fn, deps, local) in list(pending.items()):
+                    if not all(d in results for d in deps):
+                        continue
+                    del pending[name]
+                    progressed = True
+                    if local:
+                        finish(name, fn)
+                    elif expired:
+                        self.timed_out.append(name)
+                        results[name] = None
+                    else:
+                        running[pool.submit(fn)] = name
+                if progressed:
+                    continue  # локальні проби могли розблокувати наступні
+
+                if not running:
+                    if pending:
+                        raise ValueError(f"Circular probe dependencies: {sorted(pending)}")
+                    break
+
+                timeout = None if deadline_at is None else max(0.0, deadline_at - time.monotonic())
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(running.pop(future), future.result)
+
+                if not done and deadline_at is not None and time.monotonic() >= deadline_at:
+                    # Потоки не можна перервати — просто перестаємо чекати і відкидаємо їхні результати
+                    expired = True
+                    for future, name in running.items():
+                        future.cancel()
+                        self.timed_out.append(name)
+                        results[name] = None
+                    running = {}
+        finally:
+            pool.shutdown(wait=not expired, cancel_futures=True)
+        return results
@@ -0,0 +1,152 @@
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Network:
+    __slots__ = ("key", "networks", "value", "expires_at", "fetched_at")
+
+    def __init__(self, key: str, networks: list, value: dict, expires_at: float, fetched_at: float):
+        self.key = key
+        self.networks = networks
+        self.value = value
+        self.expires_at = expires_at
+        self.fetched_at = fetched_at  # time.time() отримання відповіді
+
+
+class RdapNetworkCache:
+    """
+    RDAP відповіді, проіндексовані за блоком мережі (network.cidr), а не за окремим IP.
+    Будь-який IP з уже відомого блоку (Cloudflare, Hetzner, Selectel, ...) отримує відповідь локально.
+
+    Індекс — окрема хеш-таблиця на кожну довжину префікса; пошук іде від найдовшого
+    префікса до найкоротшого, тож вкладений (точніший) блок має пріоритет.
+    Записи мають TTL, загальна кількість блоків обмежена (LRU).
+    """
+
+    # Надто широкі блоки (зазвичай агрегати RIR) не індексуємо: всередині можуть бути чужі підмережі
+    MIN_PREFIXLEN = {4: 12, 6: 24}
+
+    def __init__(self, ttl: int = 24 * 3600, max_networks: int = 50_000, min_prefixlen: dict[int, int] | None = None):
+        self.ttl = ttl
+        self.max_networks = max_networks
+        self.min_prefixlen = {**self.MIN_PREFIXLEN, **(min_prefixlen or {})}
+        self._lock = threading.Lock()
+        self._tables: dict[tuple[int, int], dict[int, _Network]] = {}
+        self._lengths: dict[int, list[int]] = {4: [], 6: []}  # наявні довжини префіксів, за спаданням
+        self._entries: OrderedDict[str, _Network] = OrderedDict()
+        self._stats = {"hit": 0, "miss": 0, "expired": 0, "evicted": 0}
+
+    @staticmethod
+    def _slot(network) -> tuple[tuple[int, int], int]:
+        """Ключ таблиці (версія, довжина префікса) і номер мережі в ній"""
+        shift = network.max_prefixlen - network.prefixlen
+        return (network.version, network.prefixlen), int(network.network_address) >> shift
+
+    def lookup(self, ip: str) -> dict | None:
+        found = self.lookup_timed(ip)
+        return found[0] if found is not None else None
+
+    def lookup_timed(self, ip: str) -> tuple[dict, float] | None:
+        """(відповідь, час її отримання) для IP або None"""
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        value = int(address)
+        max_bits = address.max_prefixlen
+        now = time.monotonic()
+        with self._lock:
+            for prefixlen in list(self._lengths[address.version]):  # _remove може змінити список
+                entry = self._tables[(address.version, prefixlen)].get(value >> (max_bits - prefixlen))
+                if entry is None:
+                    continue
+                if entry.expires_at <= now:
+                    self._remove(entry)
+                    self._stats["expired"] += 1
+                    continue  # ширший блок ще може бути актуальним
+                self._entries.move_to_end(entry.key)
+                self._stats["hit"] += 1
+                return entry.value, entry.fetched_at
+            self._stats["miss"] += 1
+        return None
+
+    def add(self, cidr: str | None, value: dict, fetched_at: float | None = None) -> bool:
+        """
+        Запам'ятовує RDAP відповідь для блоку. cidr — як у ipwhois: "a/b" або "a/b, c/d".
+        fetched_at — коли відповідь отримано (за замовчуванням зараз); запис живе ttl від цього моменту.
+        Повертає False, якщо блок не розібрано або він ширший за MIN_PREFIXLEN.
+        """
+        networks = []
+        for part in (cidr or "").split(","):
+            try:
+                network = ipaddress.ip_network(part.strip(), strict=False)
+            except ValueError:
+                continue
+            if network.prefixlen >= self.min_prefixlen[network.version]:
+                networks.append(network)
+        if not networks:
+            return False
+
+        key = ",".join(sorted(str(n) for n in networks))
+        now = time.time()
+        fetched_at = min(fetched_at or now, now)
+        entry = _Network(key, networks, value, time.monotonic() + self.ttl - (now - fetched_at), fetched_at)
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None:
+                self._remove(old)
+            self._entries[key] = entry
+            for network in networks:
+                table_key, number = self._slot(network)
+                table = self._tables.get(table_key)
+                if table is None:
+                    table = self._tables[table_key] = {}
+                    lengths = self._lengths[network.version]
+                    lengths.append(network.prefixlen)
+                    lengths.sort(reverse=True)
+                table[number] = entry
+            while len(self._entries) > self.max_networks:
+                self._remove(next(iter(self._entries.values())))
+                self._stats["evicted"] += 1
+        return True
+
+    def _remove(self, entry: _Network):
+        """Викликається під self._lock"""
+        self._entries.pop(entry.key, None)
+        for network in entry.networks:
+            table_key, number = self._slot(network)
+            table = self._tables.get(table_key)
+            if table is None or table.get(number) is not entry:
+                continue
+            del table[number]
+            if not table:
+                del self._tables[table_key]
+                self._lengths[network.version].remove(network.prefixlen)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._stats, "networks": len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self._entries.clear()
+            self._lengths = {4: [], 6: []}
+
+
+_default_rdap_cache: RdapNetworkCache | None = None
+_default_rdap_cache_lock = threading.Lock()
+
+
+def get_rdap_cache() -> RdapNetworkCache:
+    """Спільний для процесу індекс RDAP блоків"""
+    global _default_rdap_cache
+    with _default_rdap_cache_lock:
+        if _default_rdap_cache is None:
+            _default_rdap_cache = RdapNetworkCache()
+        return _default_rdap_cache
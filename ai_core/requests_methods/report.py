@@ -0,0 +1,118 @@
+import json
+from dataclasses import dataclass, field, fields
+
+
+@dataclass(slots=True)
+class DomainReport:
+    """
+    Результат перевірки одного URL. Проби не змінюють звіт напряму —
+    вони повертають підзаписи, які застосовуються в потоці get_domain_metadata.
+    """
+    input_url: str = ""
+    domain: str | None = None
+    ip: str | None = None
+    country: str | None = None
+    asn: str | None = None
+    org: str | None = None
+    registrar: str | None = None
+    creation_date: str | None = None
+    expiration_date: str | None = None
+    name_servers: list[str] = field(default_factory=list)
+    nameserver_countries: list[str] = field(default_factory=list)
+    hosting_provider: str | None = None
+    dns_records: dict = field(default_factory=dict)
+    ssl_issuer: str | None = None
+    ssl_info: dict = field(default_factory=dict)  # SAN, термін дії, відбиток сертифіката
+    russian_traces: list[str] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+    whois_server: str | None = None  # WHOIS сервер (вказує на країну реєстрації)
+    registrant_country: str | None = None  # Країна власника з WHOIS
+    admin_country: str | None = None  # Країна адміністратора
+    tech_country: str | None = None  # Країна технічного контакту
+    registry_domain_id: str | None = None  # ID реєстру
+    dnssec: str | None = None  # DNSSEC статус
+    abuse_contact: str | None = None  # Контакт для скарг
+    status: list[str] | str = field(default_factory=list)  # Статуси домену
+    rdap_info: dict = field(default_factory=dict)  # RDAP дані (новіший протокол замість WHOIS)
+    http_headers: dict | None = None  # server, x-powered-by, cf-ray, status
+    rir: str | None = None  # Regional Internet Registry
+    probed_at: dict[str, float] = field(default_factory=dict)  # проба -> час (epoch) останнього успішного запуску
+
+    def to_dict(self) -> dict:
+        """Плаский словник для API, промптів і збереження (вкладені списки/словники не копіюються)"""
+        return {name: getattr(self, name) for name in _REPORT_FIELDS}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, default=str)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DomainReport":
+        """Зворотне перетворення; невідомі ключі ігноруються"""
+        return cls(**{name: data[name] for name in _REPORT_FIELDS if name in data})
+
+
+_REPORT_FIELDS = tuple(f.name for f in fields(DomainReport))
+
+
+class ProbeRecord:
+    """Підзапис проби: apply переносить поля з однаковими іменами у звіт"""
+    __slots__ = ()
+
+    def apply(self, report: DomainReport):
+        for name in self.__slots__:
+            setattr(report, name, getattr(self, name))
+
+
+@dataclass(slots=True)
+class WhoisRecord(ProbeRecord):
+    registrar: str | None = None
+    creation_date: str | None = None
+    expiration_date: str | None = None
+    whois_server: str | None = None
+    registrant_country: str | None = None
+    admin_country: str | None = None
+    tech_country: str | None = None
+    dnssec: str | None = None
+    status: list[str] | str = field(default_factory=list)
+    name_servers: list[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class GeoRecord(ProbeRecord):
+    country: str | None = None
+    asn: str | None = None
+    org: str | None = None
+
+
+@dataclass(slots=True)
+class TlsRecord(ProbeRecord):
+    ssl_issuer: str | None = None
+    ssl_info: dict = field(default_factory=dict)
+    http_headers: dict | None = None
+    http_error: str | None = None  # сертифікат отримано, але HTTP запит не вдався
+
+    def apply(self, report: DomainReport):
+        report.ssl_issuer = self.ssl_issuer
+        report.ssl_info = self.ssl_info
+        if self.http_headers is not None:
+            report.http_headers = self.http_headers
+        if self.http_error:
+            report.errors.append(f"HTTP headers error: {self.http_error}")
+
+
+@dataclass(slots=True)
+class FieldUpdate(ProbeRecord):
+    """Проба, що заповнює одне поле звіту"""
+    name: str
+    value: object
+
+    def apply(self, report: DomainReport):
+        setattr(report, self.name, self.value)
+
+
+@dataclass(slots=True)
+class ProbeError(ProbeRecord):
+    message: str
+
+    def apply(self, report: DomainReport):
+        report.errors.append(self.message)
@@ -0,0 +1,48 @@
+import threading
+
+import diskcache as dc
+
+from .report import DomainReport
+
+
+class ReportStore:
+    """
+    Останні звіти по доменах (diskcache). Повторна перевірка домену бере звідси
+    попередній звіт і оновлює лише ті поля, що застаріли (див. UrlsChecker.REFRESH_AFTER).
+    """
+
+    def __init__(
+        self,
+        directory: str = ".ai_core_report_store_v1",
+        ttl: int = 30 * 24 * 3600,
+        size_limit: int = 512 * 1024 * 1024,
+    ):
+        self.cache = dc.Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+        self.ttl = ttl
+
+    def get(self, domain: str | None) -> DomainReport | None:
+        if not domain:
+            return None
+        data = self.cache.get(f"report:{domain}")
+        # Зберігаємо словник, а не об'єкт — записи переживають зміни класу звіту
+        return DomainReport.from_dict(data) if data is not None else None
+
+    def put(self, report: DomainReport):
+        if report.domain:
+            self.cache.set(f"report:{report.domain}", report.to_dict(), expire=self.ttl)
+
+    def clear(self):
+        self.cache.clear()
+
+
+_default_store: ReportStore | None = None
+_default_store_lock = threading.Lock()
+
+
+def get_report_store() -> ReportStore:
+    """Спільне для процесу сховище звітів"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ReportStore()
+        return _default_store
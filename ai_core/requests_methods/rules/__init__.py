@@ -0,0 +1,3 @@
+from .engine import RuleEngine, RuleSet, get_rule_engine
+
+__all__ = ["RuleEngine", "RuleSet", "get_rule_engine"]
@@ -0,0 +1,244 @@
+import json
+import os
+import pathlib
+import re
+import threading
+import time
+from typing import Any, Callable
+
+DEFAULT_RULES_PATH = os.getenv("RF_RULES_PATH") or str(pathlib.Path(__file__).resolve().parent / "russian_traces.json")
+
+
+def _get(obj: Any, key: str) -> Any:
+    """Поле словника або атрибут об'єкта (DomainReport)"""
+    return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+
+
+def _field_values(report: Any, field: str) -> list[str]:
+    """Значення поля звіту як список рядків; підтримує вкладені поля через крапку (dns_records.mx)"""
+    value: Any = report
+    for part in field.split("."):
+        if value is None or isinstance(value, (str, list, tuple, set)):
+            return []
+        value = _get(value, part)
+    if value is None or value == "":
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return [str(v) for v in value if v is not None]
+    return [str(value)]
+
+
+def _contains_pattern(values: list[str]) -> str:
+    """Альтернація ключових слів; довші першими, щоб збігом було найдовше слово в тій самій позиції"""
+    return "|".join(re.escape(v) for v in sorted(values, key=len, reverse=True))
+
+
+def _compile_matcher(rule: dict, maps: dict[str, dict[str, str]]) -> Callable[[list[str]], tuple[str, str] | None]:
+    """
+    Компілює умову правила в функцію: список значень -> (значення, що спрацювало, збіг) або None.
+    Усі порівняння регістронезалежні.
+    """
+    op = rule["op"]
+    values = [str(v).lower() for v in rule.get("values", [])]
+
+    if op == "contains":
+        # Одна регулярка на правило замість any(k in value for k in keywords)
+        pattern = re.compile(_contains_pattern(values))
+
+        def match(field_values):
+            for value in field_values:
+                found = pattern.search(value.lower())
+                if found:
+                    return value, found.group(0)
+            return None
+    elif op == "equals":
+        allowed = frozenset(values)
+
+        def match(field_values):
+            for value in field_values:
+                if value.lower() in allowed:
+                    return value, value
+            return None
+    elif op == "tld":
+        tlds = frozenset(v.lstrip(".") for v in values)
+
+        def match(field_values):
+            for value in field_values:
+                if value.lower().rsplit(".", 1)[-1] in tlds:
+                    return value, value
+            return None
+    elif op == "in_map":
+        mapping = {str(k).lower(): v for k, v in maps[rule["map"]].items()}
+
+        def match(field_values):
+            for value in field_values:
+                name = mapping.get(value.lower())
+                if name is not None:
+                    return value, name
+            return None
+    else:
+        raise ValueError(f"Unknown rule op '{op}' in rule '{rule.get('id')}'")
+    return match
+
+
+class _CompiledRule:
+    __slots__ = ("id", "fields", "keywords", "match", "when", "message", "weight")
+
+    def __init__(self, rule: dict, maps: dict[str, dict[str, str]]):
+        self.id = rule.get("id", rule["field"])
+        self.fields = rule["field"] if isinstance(rule["field"], list) else [rule["field"]]
+        # Ключові слова contains-правила — для спільної регулярки поля (див. RuleSet)
+        self.keywords = [str(v).lower() for v in rule.get("values", [])] if rule["op"] == "contains" else None
+        self.match = _compile_matcher(rule, maps)
+        self.when = [_CompiledRule(cond, maps) for cond in rule.get("when", [])]
+        self.message = rule.get("message", "")
+        self.weight = float(rule.get("weight", 1.0))  # внесок у локальну оцінку (log-odds), див. preclassifier
+
+
+class RuleSet:
+    """Скомпільований набір правил; незмінний, тому його можна безпечно підміняти під час роботи"""
+
+    def __init__(self, data: dict):
+        self.version = data.get("version")
+        self.no_traces_message = data.get("no_traces_message", "Ознак РФ не виявлено")
+        maps = data.get("maps", {})
+        self.rules = [_CompiledRule(rule, maps) for rule in data.get("traces", [])]
+        self._field_patterns = self._compile_field_patterns()
+        self.hosting_providers = [(p["match"].lower(), p["name"]) for p in data.get("hosting_providers", [])]
+        self._hosting_pattern = re.compile(
+            "|".join(re.escape(key) for key, _ in self.hosting_providers)
+        ) if self.hosting_providers else None
+        self.cctld_whois_servers = {k.lower(): v for k, v in data.get("cctld_whois_servers", {}).items()}
+        self.classifier = data.get("classifier", {})
+        self.weights = {rule.id: rule.weight for rule in self.rules}
+
+    def _compile_field_patterns(self) -> list[tuple[list[str], re.Pattern, list[int]]]:
+        """
+        contains-правила з однаковими полями зливаються в одну регулярку з іменованою групою
+        на правило (r<номер правила>): значення поля переглядаються один раз на всі ці правила.
+        """
+        groups: dict[tuple[str, ...], list[int]] = {}
+        for idx, rule in enumerate(self.rules):
+            if rule.keywords:
+                groups.setdefault(tuple(rule.fields), []).append(idx)
+        return [
+            (list(fields), re.compile("|".join(f"(?P<r{idx}>{_contains_pattern(self.rules[idx].keywords)})"
+                                               for idx in indexes)), indexes)
+            for fields, indexes in groups.items()
+        ]
+
+    def hosting_provider(self, org: str | None) -> str | None:
+        """Хостинг-провайдер за назвою організації; пріоритет — порядок у файлі правил"""
+        if not org or self._hosting_pattern is None:
+            return None
+        org = org.lower()
+        # Більшість організацій не збігається з жодним ключем — відсіюємо їх однією регуляркою
+        if not self._hosting_pattern.search(org):
+            return None
+        return next((name for key, name in self.hosting_providers if key in org), None)
+
+    def cctld_whois_server(self, tld: str) -> str | None:
+        return self.cctld_whois_servers.get(tld.lower())
+
+    def evaluate(self, report) -> list[str]:
+        """Повідомлення про сліди РФ у звіті"""
+        return [message for _, message in self.matches(report)]
+
+    def matches(self, report) -> list[tuple[str, str]]:
+        """Один прохід по звіту: значення кожного поля дістаються один раз і перевіряються всіма правилами"""
+        field_cache: dict[str, list[str]] = {}
+
+        def values(fields: list[str]) -> list[str]:
+            out = []
+            for field in fields:
+                cached = field_cache.get(field)
+                if cached is None:
+                    cached = field_cache[field] = _field_values(report, field)
+                out.extend(cached)
+            return out
+
+        # Спільна регулярка поля: іменована група каже, яке contains-правило спрацювало й на чому.
+        # Без жодного збігу всі правила поля пропускаються. Альтернація дає в кожній позиції лише
+        # одне правило, тож решта правил поля з уже знайденим збігом перевіряються окремо
+        found: dict[int, tuple[str, str]] = {}
+        skip: set[int] = set()
+        for fields, pattern, indexes in self._field_patterns:
+            for value in values(fields):
+                for m in pattern.finditer(value.lower()):
+                    found.setdefault(int(m.lastgroup[1:]), (value, m.group(0)))
+            if not any(idx in found for idx in indexes):
+                skip.update(indexes)
+
+        traces = []
+        for idx, rule in enumerate(self.rules):
+            if idx in skip:
+                continue
+            hit = found.get(idx) or rule.match(values(rule.fields))
+            if hit is None:
+                continue
+            if any(cond.match(values(cond.fields)) is None for cond in rule.when):
+                continue
+            value, match = hit
+            traces.append((rule.id, rule.message.format_map(_MessageFields(report, value=value, match=match))))
+        return traces
+
+
+class _MessageFields(dict):
+    """Поля для форматування повідомлень: {value}, {match} та будь-яке поле звіту"""
+
+    def __init__(self, report, **extra):
+        super().__init__(extra)
+        self.report = report
+
+    def __missing__(self, key):
+        return _get(self.report, key)
+
+
+class RuleEngine:
+    """Завантажує правила з файлу та підхоплює зміни без перезапуску"""
+
+    RELOAD_CHECK_INTERVAL = 10  # секунд між перевірками файлу правил
+
+    def __init__(self, path: str = DEFAULT_RULES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._last_check = 0.0
+        self.ruleset = self._load()
+
+    def _load(self) -> RuleSet:
+        self._mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path, "r", encoding="utf-8") as f:
+            return RuleSet(json.load(f))
+
+    def reload(self, force: bool = False) -> bool:
+        """Перекомпілює правила, якщо файл змінився; при помилці лишає попередній набір"""
+        with self._lock:
+            self._last_check = time.monotonic()
+            try:
+                if not force and os.stat(self.path).st_mtime_ns == self._mtime:
+                    return False
+                self.ruleset = self._load()
+                print(f"🔄 Правила перезавантажено: {self.path} (v{self.ruleset.version})")
+                return True
+            except (OSError, ValueError, KeyError, re.error) as e:
+                print(f"⚠️  Не вдалося перезавантажити правила: {e}")
+                return False
+
+    def current(self) -> RuleSet:
+        if time.monotonic() - self._last_check >= self.RELOAD_CHECK_INTERVAL:
+            self.reload()
+        return self.ruleset
+
+
+_default_engine: RuleEngine | None = None
+_default_engine_lock = threading.Lock()
+
+
+def get_rule_engine() -> RuleEngine:
+    """Спільний для процесу рушій правил (компілюється при першому використанні)"""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = RuleEngine()
+        return _default_engine
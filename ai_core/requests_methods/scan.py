@@ -0,0 +1,215 @@
+"""
+Масова перевірка доменів зі списку.
+
+    python -m ai_core.requests_methods.scan domains.txt -o reports.jsonl
+    cat domains.txt | python -m ai_core.requests_methods.scan - -w 32 --deadline 10 > reports.jsonl
+
+Вхід — по одному URL/домену на рядок (порожні рядки та # коментарі пропускаються).
+Кожен зареєстрований домен перевіряється один раз; звіти пишуться в JSONL у міру готовності.
+Завершені домени дописуються у файл контрольної точки, тож перерваний запуск
+з тими самими аргументами продовжується з місця зупинки.
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Iterable, Iterator, TextIO
+
+from .batch_memo import BatchMemo
+from .report import DomainReport
+from .urls_checker import UrlsChecker
+from ..state_machine.config import Config
+
+
+class ScanStats:
+    """Лічильники прогону: швидкість і частка звітів з помилками"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.done = 0
+        self.with_errors = 0
+        self.timed_out = 0
+        self.failed = 0  # домен не розібрано або перевірка впала
+        self.skipped = 0  # вже є в контрольній точці
+        self.duplicates = 0
+
+    def add(self, report: DomainReport):
+        self.done += 1
+        if report.errors:
+            self.with_errors += 1
+        if not report.domain:
+            self.failed += 1
+        if any(e.endswith(" timed out") for e in report.errors):
+            self.timed_out += 1
+
+    def as_dict(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            "done": self.done,
+            "skipped": self.skipped,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "with_errors": self.with_errors,
+            "timed_out": self.timed_out,
+            "error_rate": round(self.with_errors / self.done, 4) if self.done else 0.0,
+            "elapsed_s": round(elapsed, 1),
+            "domains_per_s": round(self.done / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+    def line(self) -> str:
+        s = self.as_dict()
+        return (f"📊 {s['done']} готово ({s['domains_per_s']}/s), помилки {s['error_rate']:.1%}, "
+                f"timeout {s['timed_out']}, пропущено {s['skipped']}, дублікати {s['duplicates']}")
+
+
+class BulkScanner:
+    """
+    Потокова перевірка великого списку доменів пулом потоків.
+    Одночасно в роботі не більше in_flight доменів, тож пам'ять не залежить від розміру списку.
+    """
+
+    MEMO_RESET_EVERY = 5000  # доменів; спільні geo/RDAP дані партії не ростуть безмежно
+
+    def __init__(
+        self,
+        workers: int = 16,
+        probe_workers: int = 4,
+        deadline: float | None = None,
+        checkpoint_path: str | None = None,
+        progress_every: float = 10.0,
+        checker: UrlsChecker | None = None,
+        incremental: bool = True,
+    ):
+        self.workers = workers
+        self.in_flight = workers * 2
+        self.deadline = deadline
+        self.checkpoint_path = checkpoint_path
+        self.progress_every = progress_every
+        self.checker = checker or UrlsChecker([], max_workers=probe_workers, incremental=incremental)
+        self.stats = ScanStats()
+
+    def load_checkpoint(self) -> set[str]:
+        if not self.checkpoint_path:
+            return set()
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+
+    @staticmethod
+    def read_urls(lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            url = line.strip()
+            if url and not url.startswith("#"):
+                yield url
+
+    def _key(self, url: str) -> str:
+        try:
+            return self.checker.registrable_domain(url)
+        except Exception:
+            return url  # звіт з помилкою розбору все одно потрапить у вихід
+
+    def _check(self, url: str) -> DomainReport:
+        deadline_at = None if self.deadline is None else time.monotonic() + self.deadline
+        try:
+            return self.checker.check(url, deadline_at)
+        except Exception as e:
+            return DomainReport(input_url=url, errors=[f"scan error: {e}"])
+
+    def run(self, urls: Iterable[str], out: TextIO) -> ScanStats:
+        finished = self.load_checkpoint()
+        seen: set[str] = set()
+        checkpoint = open(self.checkpoint_path, "a", encoding="utf-8") if self.checkpoint_path else None
+        running = {}
+        last_progress = time.monotonic()
+
+        def collect(futures):
+            nonlocal last_progress
+            for future in futures:
+                key = running.pop(future)
+                report = future.result()
+                out.write(report.to_json() + "\n")
+                out.flush()
+                # Спершу звіт, потім відмітка: після падіння домен щонайбільше перевіриться ще раз
+                if checkpoint:
+                    checkpoint.write(key + "\n")
+                    checkpoint.flush()
+                self.stats.add(report)
+                if self.stats.done % self.MEMO_RESET_EVERY == 0:
+                    self.checker.memo = BatchMemo()
+            if self.progress_every and time.monotonic() - last_progress >= self.progress_every:
+                last_progress = time.monotonic()
+                print(self.stats.line(), file=sys.stderr)
+
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for url in urls:
+                key = self._key(url)
+                if key in finished:
+                    self.stats.skipped += 1
+                    continue
+                if key in seen:
+                    self.stats.duplicates += 1
+                    continue
+                seen.add(key)
+                if len(running) >= self.in_flight:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    collect(done)
+                running[pool.submit(self._check, url)] = key
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                collect(done)
+        except KeyboardInterrupt:
+            # Незавершені домени не відмічені в контрольній точці — наступний запуск їх перевірить
+            print("\n⏹️  Перервано, незавершені домени буде перевірено при наступному запуску", file=sys.stderr)
+            for future in running:
+                future.cancel()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            if checkpoint:
+                checkpoint.close()
+        return self.stats
+
+
+def main(argv: list[str] | None = None):
+    batch_deadline = Config.probe_deadlines["batch"]
+    parser = argparse.ArgumentParser(prog="python -m ai_core.requests_methods.scan",
+                                     description="Масова перевірка доменів на сліди РФ (JSONL на виході)")
+    parser.add_argument("input", help="файл зі списком URL/доменів або '-' для stdin")
+    parser.add_argument("-o", "--output", help="файл JSONL для звітів (за замовчуванням stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=16, help="доменів одночасно (16)")
+    parser.add_argument("--probe-workers", type=int, default=4, help="потоків проб на один домен (4)")
+    parser.add_argument("--deadline", type=float, default=batch_deadline,
+                        help=f"секунд на один домен ({batch_deadline or 'без обмеження'}; BATCH_PROBE_DEADLINE)")
+    parser.add_argument("--checkpoint", help="файл контрольної точки (за замовчуванням <output>.checkpoint)")
+    parser.add_argument("--progress-every", type=float, default=10.0, help="секунд між рядками прогресу (0 — вимкнути)")
+    parser.add_argument("--full", action="store_true", help="перевіряти з нуля, не використовуючи попередні звіти")
+    parser.add_argument("--stats", help="записати підсумкову статистику в JSON файл")
+    args = parser.parse_args(argv)
+
+    checkpoint = args.checkpoint or (f"{args.output}.checkpoint" if args.output else None)
+    scanner = BulkScanner(workers=args.workers, probe_workers=args.probe_workers, deadline=args.deadline,
+                          checkpoint_path=checkpoint, progress_every=args.progress_every,
+                          incremental=not args.full)
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    # Продовження: дописуємо до вже отриманих звітів
+    out = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        stats = scanner.run(BulkScanner.read_urls(source), out)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+    print(stats.line(), file=sys.stderr)
+    if args.stats:
+        with open(args.stats, "w", encoding="utf-8") as f:
+            json.dump(stats.as_dict(), f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,24 @@
-import requests
+from ..http_client import HttpClient, AsyncHttpClient, get_http_client, get_async_http_client
 
 class SteamMain:
-    def __init__(self):
-        pass
+    def __init__(self, http: HttpClient | None = None, async_http: AsyncHttpClient | None = None):
+        self.http = http or get_http_client()
+        self._async_http = async_http
+    @property
+    def async_http(self) -> AsyncHttpClient:
+        # Асинхронний клієнт створюється лише коли справді потрібен (в межах event loop)
+        if self._async_http is None:
+            self._async_http = get_async_http_client()
+        return self._async_http
+    def _search_url(self, game_name: str) -> str:
+        return f"https://steamcommunity.com/actions/SearchApps/{game_name}"
+    def _details_url(self, app_id: int) -> str:
+        return f"https://store.steampowered.com/api/appdetails?appids={app_id}&cc=us&l=en"
     def search_steam_app_id(self, game_name: str) -> int | None:
         """
         Шукає гру в Steam і повертає її app_id за назвою.
         """
-        url = f"https://steamcommunity.com/actions/SearchApps/{game_name}"
-        resp = requests.get(url)
+        resp = self.http.get(self._search_url(game_name))
         results = resp.json()
 
         if not results:
@@ -22,10 +32,25 @@ class SteamMain:
         if not app_id:
             return {"error": f"Game '{game_name}' not found"}
 
-        url = f"https://store.steampowered.com/api/appdetails?appids={app_id}&cc=us&l=en"
-        resp = requests.get(url)
-        data = resp.json()
+        resp = self.http.get(self._details_url(app_id))
+        return self._parse_game_info(game_name, app_id, resp.json())
+    async def asearch_steam_app_id(self, game_name: str) -> int | None:
+        """Асинхронний варіант search_steam_app_id"""
+        resp = await self.async_http.get(self._search_url(game_name))
+        results = resp.json()
+
+        if not results:
+            return None
+        return results[0]["appid"]
+    async def aget_steam_game_info_by_name(self, game_name: str) -> dict:
+        """Асинхронний варіант get_steam_game_info_by_name"""
+        app_id = await self.asearch_steam_app_id(game_name)
+        if not app_id:
+            return {"error": f"Game '{game_name}' not found"}
 
+        resp = await self.async_http.get(self._details_url(app_id))
+        return self._parse_game_info(game_name, app_id, resp.json())
+    def _parse_game_info(self, game_name: str, app_id: int, data: dict) -> dict:
         if not data[str(app_id)]["success"]:
             return {"error": f"Game data not available for '{game_name}'"}
 
@@ -49,4 +74,4 @@ class SteamMain:
             "supported_languages": game_data.get("supported_languages"),
         }
 
-        return info
\ No newline at end of file
+        return info
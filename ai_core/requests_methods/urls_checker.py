@@ -1,192 +1,305 @@
+import asyncio
+import copy
+import functools
+from typing import Callable
 import socket
-import requests
+import time
 import whois
-import tldextract
 import dns.resolver  # pip install dnspython
+from .probe_graph import ProbeGraph
+from .limits import UpstreamLimits, default_limits
+from .batch_memo import BatchMemo
+from .probe_cache import ProbeCache, CachedProbeError, get_probe_cache
+from .geo import IpRangeIndex, get_ip_index
+from .http_client import HttpClient, get_http_client
+from .rules import RuleEngine, get_rule_engine
+from .domains import get_domain_normalizer, to_ascii
+from .metrics import ProbeMetrics, get_probe_metrics, note_cache, note_fetched_at, track_fetched_at
+from .rdap_cache import RdapNetworkCache, get_rdap_cache
+from .report_store import ReportStore, get_report_store
+from ..single_flight import get_single_flight
+from .report import DomainReport, ProbeRecord, WhoisRecord, GeoRecord, TlsRecord, FieldUpdate, ProbeError
 
 class UrlsChecker:
-    result = {
-        "input_url": "",
-        "domain": None,
-        "ip": None,
-        "country": None,
-        "asn": None,
-        "org": None,
-        "registrar": None,
-        "creation_date": None,
-        "expiration_date": None,
-        "name_servers": [],
-        "nameserver_countries": [],  # NEW
-        "hosting_provider": None,  # NEW
-        "dns_records": {},  # NEW
-        "ssl_issuer": None,  # NEW
-        "russian_traces": [],
-        "errors": [],
-        "whois_server": None,  # NEW: WHOIS сервер (вказує на країну реєстрації)
-        "registrant_country": None,  # NEW: Країна власника з WHOIS
-        "admin_country": None,  # NEW: Країна адміністратора
-        "tech_country": None,  # NEW: Країна технічного контакту
-        "registry_domain_id": None,  # NEW: ID реєстру
-        "dnssec": None,  # NEW: DNSSEC статус
-        "abuse_contact": None,  # NEW: Контакт для скарг
-        "status": [],  # NEW: Статуси домену
-        "rdap_info": {},  # NEW: RDAP дані (новіший протокол замість WHOIS)
+    # Через скільки секунд дані мережевої проби вважаються застарілими при повторній перевірці домену
+    REFRESH_AFTER = {
+        "whois_lookup": 7 * 24 * 3600,  # реєстратор, дати, країна власника майже не змінюються
+        "check_nameserver_location": 24 * 3600,
+        "check_rdap": 24 * 3600,
+        "check_tls_and_headers": 12 * 3600,
+        "get_ip_info": 6 * 3600,
+        "check_dns_records": 3600,
+        "resolve_ip": 3600,  # IP і хостинг змінюються найчастіше
     }
-    def __init__(self, urls: list[str] | str):
+    # Поля звіту, які заповнює кожна проба; при оновленні старі значення скидаються
+    PROBE_FIELDS = {
+        "whois_lookup": WhoisRecord.__slots__,
+        "resolve_ip": ("ip",),
+        "get_ip_info": GeoRecord.__slots__,
+        "check_nameserver_location": ("nameserver_countries",),
+        "check_dns_records": ("dns_records",),
+        "check_tls_and_headers": ("ssl_issuer", "ssl_info", "http_headers"),
+        "check_rdap": ("rdap_info",),
+        "detect_hosting_provider": ("hosting_provider",),
+        "check_rir_allocation": ("rir",),
+    }
+    # Яку частку свого бюджету чекати на однакову перевірку, що вже йде в іншому потоці
+    FOLLOWER_WAIT_SHARE = 0.5
+    def __init__(self, urls: list[str] | str, max_workers: int = 8, limits: UpstreamLimits | None = None,
+                 memo: BatchMemo | None = None, cache: ProbeCache | None = None,
+                 ip_index: IpRangeIndex | None = None, http: HttpClient | None = None,
+                 rules: RuleEngine | None = None, rdap_cache: RdapNetworkCache | None = None,
+                 metrics: ProbeMetrics | None = None, store: ReportStore | None = None,
+                 incremental: bool = True, on_probe: Callable[[DomainReport, str, ProbeRecord | None], None] | None = None):
         self.urls = [urls] if isinstance(urls, str) else urls
-    def normalize_url(self, url: str) -> str:
+        self.max_workers = max_workers
+        self.limits = limits or default_limits
+        self.memo = memo or BatchMemo()
+        self.cache = cache or get_probe_cache()
+        self.ip_index = ip_index if ip_index is not None else get_ip_index()  # порожні індекси — falsy (__len__)
+        self.http = http or get_http_client()
+        self.rules = rules or get_rule_engine()
+        self.rdap_cache = rdap_cache if rdap_cache is not None else get_rdap_cache()
+        self.metrics = metrics or get_probe_metrics()
+        self.store = store or get_report_store()
+        self.incremental = incremental  # False — завжди перевіряти домен з нуля
+        self.on_probe = on_probe  # викликається з потоку проби після застосування кожного результату (для стрімінгу)
+    @staticmethod
+    def registrable_domain(url: str) -> str:
+        domain = get_domain_normalizer().registrable_domain(url)
+        if not domain:
+            raise ValueError(f"Cannot extract domain from '{url}'")
+        return domain
+    def normalize_url(self, report: DomainReport):
         try:
-            ext = tldextract.extract(url)
-            domain = f"{ext.domain}.{ext.suffix}"
-            self.result["domain"] = domain
+            report.domain = self.registrable_domain(report.input_url)
         except Exception as e:
-            self.result["errors"].append(f"Domain parse error: {e}")
-            return self.result
-    def whois_lookup(self):
-        try:
-            w = whois.whois(self.result["domain"])
-            self.result["registrar"] = w.registrar
-            self.result["creation_date"] = str(w.creation_date)
-            self.result["expiration_date"] = str(w.expiration_date)
-            
-            # NEW: Додаткові WHOIS поля
-            self.result["whois_server"] = getattr(w, 'whois_server', None)
-            self.result["registrant_country"] = getattr(w, 'registrant_country', None) or getattr(w, 'country', None)
-            self.result["admin_country"] = getattr(w, 'admin_country', None)
-            self.result["tech_country"] = getattr(w, 'tech_country', None)
-            self.result["dnssec"] = getattr(w, 'dnssec', None)
-            self.result["status"] = getattr(w, 'status', [])
+            report.errors.append(f"Domain parse error: {e}")
+    def _lookup_geo(self, ip: str, timeout: int) -> dict:
+        """Geo дані для IP: спершу локальна база діапазонів, ipapi.co — лише як запасний варіант"""
+        local = self.ip_index.lookup(ip)
+        if local:
+            note_cache("hit")
+            return local
+
+        def fetch():
+            with self.limits.slot("ipapi"):
+                geo = self.http.get(f"https://ipapi.co/{ip}/json/", timeout=timeout).json()
+            # ipapi.co повертає помилки (зокрема rate limit) як JSON — їх не можна кешувати як дані
+            if geo.get("error"):
+                raise ValueError(geo.get("reason") or "ipapi.co error")
+            return geo
+        # У пам'яті партії — разом із часом отримання, щоб інші домени з цим IP не вважали дані свіжими
+        geo, fetched_at = self.memo.get_or_compute("geo", ip, lambda: self.cache.get_or_fetch_timed("geo", ip, fetch))
+        note_fetched_at(fetched_at)
+        return geo
+    def _lookup_rdap(self, ip: str) -> dict:
+        """RDAP дані для IP: спершу індекс відомих блоків, далі кеш за IP і запит"""
+        def fetch():
+            from ipwhois import IPWhois
+
+            obj = IPWhois(ip)
+            with self.limits.slot("rdap"):
+                rdap = obj.lookup_rdap()
+            return {
+                "asn_country_code": rdap.get("asn_country_code"),
+                "asn_description": rdap.get("asn_description"),
+                "network_name": rdap.get("network", {}).get("name"),
+                "network_country": rdap.get("network", {}).get("country"),
+                "network_cidr": rdap.get("network", {}).get("cidr"),
+            }
+
+        def lookup():
+            known = self.rdap_cache.lookup_timed(ip)
+            if known is not None:
+                note_cache("hit")
+                return known
+            rdap, fetched_at = self.cache.get_or_fetch_timed("rdap", ip, fetch)
+            # RDAP відповідає за весь блок — наступні IP з нього не потребують запиту
+            self.rdap_cache.add(rdap.get("network_cidr"), rdap, fetched_at)
+            return rdap, fetched_at
+        rdap, fetched_at = self.memo.get_or_compute("rdap", ip, lookup)
+        note_fetched_at(fetched_at)
+        return rdap
+    # Кожна проба лише читає вже зібрані поля звіту і повертає підзапис (ProbeRecord),
+    # який get_domain_metadata застосовує до звіту. Сам екземпляр стану не тримає,
+    # тож один UrlsChecker можна використовувати з кількох потоків одночасно.
+    def whois_lookup(self, report: DomainReport) -> ProbeRecord:
+        domain = report.domain
+
+        def fetch():
+            # WHOIS сервер визначається TLD, тому ліміт рахуємо на TLD
+            with self.limits.slot("whois", domain.rsplit(".", 1)[-1]):
+                w = whois.whois(domain)
+            updates = {
+                "registrar": w.registrar,
+                "creation_date": str(w.creation_date),
+                "expiration_date": str(w.expiration_date),
+                # NEW: Додаткові WHOIS поля
+                "whois_server": getattr(w, 'whois_server', None),
+                "registrant_country": getattr(w, 'registrant_country', None) or getattr(w, 'country', None),
+                "admin_country": getattr(w, 'admin_country', None),
+                "tech_country": getattr(w, 'tech_country', None),
+                "dnssec": getattr(w, 'dnssec', None),
+                "status": getattr(w, 'status', []),
+            }
             
             if isinstance(w.name_servers, list):
-                self.result["name_servers"] = [ns.lower() for ns in w.name_servers]
+                updates["name_servers"] = [ns.lower() for ns in w.name_servers]
             elif w.name_servers:
-                self.result["name_servers"] = [str(w.name_servers).lower()]
+                updates["name_servers"] = [str(w.name_servers).lower()]
+            return updates
+
+        try:
+            # У кеші лежить словник полів, щоб записи переживали зміни класів
+            return WhoisRecord(**self.cache.get_or_fetch("whois", domain, fetch))
         except Exception as e:
-            self.result["errors"].append(f"WHOIS error: {e}")
-    def get_ip_info(self):
+            return ProbeError(f"WHOIS error: {e}")
+    def resolve_ip(self, report: DomainReport) -> ProbeRecord:
+        """Визначає IP адресу домену"""
+        domain = report.domain
         try:
-            try:
-                ip = socket.gethostbyname(self.result["domain"])
-                self.result["ip"] = ip
-            except socket.gaierror as e:
-                self.result["errors"].append(f"IP resolution error: {e}")
-                return  # Exit early if can't resolve IP
-        
-            # Only try geo lookup if we have valid IP
-            if ip:
-                geo = requests.get(f"https://ipapi.co/{ip}/json/", timeout=8).json()
-                self.result["country"] = geo.get("country_name")
-                self.result["asn"] = geo.get("asn")
-                self.result["org"] = geo.get("org")
+            return FieldUpdate("ip", self.cache.get_or_fetch("ip", domain, lambda: socket.gethostbyname(domain)))
+        except (socket.gaierror, CachedProbeError) as e:
+            return ProbeError(f"IP resolution error: {e}")
+    def get_ip_info(self, report: DomainReport) -> ProbeRecord | None:
+        ip = report.ip
+        # Only try geo lookup if we have valid IP
+        if not ip:
+            return None
+        try:
+            geo = self._lookup_geo(ip, timeout=8)
+            return GeoRecord(country=geo.get("country_name"), asn=geo.get("asn"), org=geo.get("org"))
         except Exception as e:
-            self.result["errors"].append(f"Geo lookup error: {e}")
-    def check_nameserver_location(self):
+            return ProbeError(f"Geo lookup error: {e}")
+    def check_nameserver_location(self, report: DomainReport) -> ProbeRecord:
         """Визначає країни DNS серверів"""
         try:
             ns_countries = []
-            for ns in self.result["name_servers"]:
+            for ns in report.name_servers:
                 try:
                     ns_ip = socket.gethostbyname(ns)
-                    geo = requests.get(f"https://ipapi.co/{ns_ip}/json/", timeout=5).json()
+                    geo = self._lookup_geo(ns_ip, timeout=5)
                     country = geo.get("country_name", "Unknown")
                     ns_countries.append(f"{ns}: {country}")
                 except:
                     pass
-            self.result["nameserver_countries"] = ns_countries
+            return FieldUpdate("nameserver_countries", ns_countries)
         except Exception as e:
-            self.result["errors"].append(f"NS location error: {e}")
-    def check_dns_records(self):
+            return ProbeError(f"NS location error: {e}")
+    def check_dns_records(self, report: DomainReport) -> ProbeRecord:
         """Перевіряє MX, TXT записи для виявлення провайдера"""
-        try:
+        domain = report.domain
+
+        def fetch():
             resolver = dns.resolver.Resolver()
+            dns_records = {}
             
             # MX records (email servers)
             try:
-                mx_records = resolver.resolve(self.result["domain"], 'MX')
-                self.result["dns_records"]["mx"] = [str(r.exchange) for r in mx_records]
+                mx_records = resolver.resolve(domain, 'MX')
+                dns_records["mx"] = [str(r.exchange) for r in mx_records]
             except:
                 pass
             
             # TXT records (може містити інфо про провайдера)
             try:
-                txt_records = resolver.resolve(self.result["domain"], 'TXT')
-                self.result["dns_records"]["txt"] = [str(r) for r in txt_records]
+                txt_records = resolver.resolve(domain, 'TXT')
+                dns_records["txt"] = [str(r) for r in txt_records]
             except:
                 pass
-                
+            return dns_records
+
+        try:
+            return FieldUpdate("dns_records", self.cache.get_or_fetch("dns", domain, fetch))
         except Exception as e:
-            self.result["errors"].append(f"DNS records error: {e}")
-    def check_ssl_certificate(self):
-        """Перевіряє SSL сертифікат"""
+            return ProbeError(f"DNS records error: {e}")
+    def _fetch_tls_and_headers(self, domain: str) -> dict:
+        """
+        Одне TLS з'єднання з хостом: сертифікат знімаємо після рукостискання,
+        потім у тому ж з'єднанні HEAD (або GET на 1 байт) і читаємо лише заголовки.
+        """
+        import ssl
+        import hashlib
+        import http.client
+        from cryptography import x509
+        from cryptography.x509.oid import NameOID
+
+        # Як і ssl.get_server_certificate — сертифікат беремо навіть якщо він невалідний
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+
+        host = to_ascii(domain)  # IDN домени йдуть у з'єднання та Host у punycode
+        conn = http.client.HTTPSConnection(host, 443, timeout=5, context=context)
         try:
-            import ssl
-            import OpenSSL  # pip install pyopenssl
-            
-            cert = ssl.get_server_certificate((self.result["domain"], 443))
-            x509 = OpenSSL.crypto.load_certificate(OpenSSL.crypto.FILETYPE_PEM, cert)
-            issuer = dict(x509.get_issuer().get_components())
-            
-            self.result["ssl_issuer"] = issuer.get(b'O', b'').decode('utf-8')
+            with self.limits.slot("host", domain):
+                conn.connect()
+                der = conn.sock.getpeercert(binary_form=True)
+                cert = x509.load_der_x509_certificate(der)
+                issuer = cert.issuer.get_attributes_for_oid(NameOID.ORGANIZATION_NAME)
+                try:
+                    san = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName)
+                    san_names = san.value.get_values_for_type(x509.DNSName)
+                except x509.ExtensionNotFound:
+                    san_names = []
+                tls = {
+                    "ssl_issuer": issuer[0].value if issuer else "",
+                    "ssl_info": {
+                        "issuer": cert.issuer.rfc4514_string(),
+                        "san": san_names,
+                        "not_before": cert.not_valid_before_utc.isoformat(),
+                        "not_after": cert.not_valid_after_utc.isoformat(),
+                        "fingerprint_sha256": hashlib.sha256(der).hexdigest(),
+                    },
+                }
+
+                # Помилка HTTP не скасовує вже отриманий сертифікат
+                try:
+                    request_headers = {"Host": host, "User-Agent": "Mozilla/5.0 (rf_checker)", "Accept": "*/*"}
+                    conn.request("HEAD", "/", headers=request_headers)
+                    response = conn.getresponse()
+                    response.read()
+                    if response.status in (405, 501):
+                        # Сервер не підтримує HEAD — просимо лише перший байт тіла і не читаємо його
+                        conn.request("GET", "/", headers={**request_headers, "Range": "bytes=0-0"})
+                        response = conn.getresponse()
+                    tls["http_headers"] = {
+                        "server": response.getheader("Server"),
+                        "x-powered-by": response.getheader("X-Powered-By"),
+                        "cf-ray": response.getheader("CF-RAY"),  # Cloudflare
+                        "status": response.status,
+                    }
+                except (OSError, http.client.HTTPException) as e:
+                    tls["http_error"] = str(e)
+            return tls
+        finally:
+            conn.close()
+    def check_tls_and_headers(self, report: DomainReport) -> ProbeRecord:
+        """Перевіряє SSL сертифікат і HTTP заголовки за одне з'єднання"""
+        domain = report.domain
+        try:
+            return TlsRecord(**self.cache.get_or_fetch("tls", domain, lambda: self._fetch_tls_and_headers(domain)))
         except Exception as e:
-            self.result["errors"].append(f"SSL check error: {e}")
-    def detect_hosting_provider(self):
+            return ProbeError(f"SSL check error: {e}")
+    def detect_hosting_provider(self, report: DomainReport) -> ProbeRecord | None:
         """Визначає хостинг-провайдера"""
-        org = (self.result.get("org") or "").lower()
-        
-        hosting_map = {
-            "cloudflare": "Cloudflare",
-            "amazon": "AWS",
-            "google": "Google Cloud",
-            "microsoft": "Azure",
-            "digitalocean": "DigitalOcean",
-            "ovh": "OVH",
-            "hetzner": "Hetzner",
-            "selectel": "Selectel (RU)",
-            "beget": "Beget (RU)",
-            "reg.ru": "Reg.ru (RU)",
-            "timeweb": "Timeweb (RU)"
-        }
-        
-        for key, provider in hosting_map.items():
-            if key in org:
-                self.result["hosting_provider"] = provider
-                break
-    def check_rdap(self):
+        provider = self.rules.current().hosting_provider(report.org)
+        return FieldUpdate("hosting_provider", provider) if provider else None
+    def check_rdap(self, report: DomainReport) -> ProbeRecord | None:
         """RDAP - новіший протокол для інформації про домени"""
         try:
-            from ipwhois import IPWhois
-            
-            if self.result["ip"]:
-                obj = IPWhois(self.result["ip"])
-                rdap = obj.lookup_rdap()
-                
-                self.result["rdap_info"] = {
-                    "asn_country_code": rdap.get("asn_country_code"),
-                    "asn_description": rdap.get("asn_description"),
-                    "network_name": rdap.get("network", {}).get("name"),
-                    "network_country": rdap.get("network", {}).get("country"),
-                }
+            if report.ip:
+                return FieldUpdate("rdap_info", self._lookup_rdap(report.ip))
+            return None
         except Exception as e:
-            self.result["errors"].append(f"RDAP error: {e}")
-    def check_ccTLD_registrar(self):
+            return ProbeError(f"RDAP error: {e}")
+    def check_ccTLD_registrar(self, report: DomainReport) -> ProbeRecord | None:
         """Перевіряє реєстратора для ccTLD (національних доменів)"""
-        tld = self.result["domain"].split('.')[-1]
-        
-        # Мапа національних доменів і їх WHOIS серверів
-        cctld_map = {
-            "ru": "whois.tcinet.ru",
-            "su": "whois.tcinet.ru", 
-            "рф": "whois.tcinet.ru",
-            "by": "whois.cctld.by",
-            "ua": "whois.ua",
-            "kz": "whois.nic.kz",
-        }
-        
-        if tld in cctld_map:
-            self.result["whois_server"] = cctld_map[tld]
-            return True
-        return False
-    def check_rir_allocation(self):
+        tld = report.domain.split('.')[-1]
+        whois_server = self.rules.current().cctld_whois_server(tld)
+        return FieldUpdate("whois_server", whois_server) if whois_server else None
+    def check_rir_allocation(self, report: DomainReport) -> ProbeRecord | None:
         """Перевіряє Regional Internet Registry (хто виділив IP блок)"""
         rir_map = {
             "RIPE NCC": ["Europe", "Middle East", "Russia"],
@@ -196,153 +309,226 @@ class UrlsChecker:
             "AFRINIC": ["Africa"]
         }
         
-        org = (self.result.get("org") or "").lower()
+        org = (report.org or "").lower()
         for rir, regions in rir_map.items():
             if rir.lower() in org:
-                self.result["rir"] = rir
-                break
-    def validate_russian_traces(self):
-        ru_traces = []
-        ru_keywords = [
-            "ru-center", "reg.ru", "beget", "timeweb", "masterhost", "yandex",
-            "rambler", "rostelecom", ".ru", ".su", ".rf", "hostland", "selectel"
-        ]
+                return FieldUpdate("rir", rir)
+        return None
+    def validate_russian_traces(self, report: DomainReport) -> ProbeRecord:
+        """Застосовує правила з rules/russian_traces.json до зібраних даних за один прохід"""
+        ruleset = self.rules.current()
+        return FieldUpdate("russian_traces", ruleset.evaluate(report) or [ruleset.no_traces_message])
+    def build_probe_graph(self, report: DomainReport, fetched_at: dict[str, float] | None = None) -> ProbeGraph:
+        """
+        Граф проб: кожна проба стартує, щойно готові дані, від яких вона залежить.
+        fetched_at — куди записати час отримання найстаріших даних кожної проби (з кешів).
+        """
+        graph = ProbeGraph(max_workers=self.max_workers)
+        sink = {} if fetched_at is None else fetched_at
+
+        def add(probe, deps=(), local=False):
+            name = probe.__name__
+            fn = track_fetched_at(name, functools.partial(probe, report), sink)
+            graph.add(name, self.metrics.timed(name, fn), deps=deps, local=local)
 
-        # TLD check
-        if self.result["domain"].endswith((".ru", ".su", ".rf")):
-            ru_traces.append("TLD російський (.ru/.su/.rf)")
+        add(self.whois_lookup)
+        add(self.resolve_ip)
+        add(self.check_dns_records)
+        add(self.check_tls_and_headers)
+        add(self.get_ip_info, deps=["resolve_ip"])
+        add(self.check_rdap, deps=["resolve_ip"])
+        add(self.check_nameserver_location, deps=["whois_lookup"])
+        # Локальні проби лише аналізують зібрані дані й відпрацьовують навіть після дедлайну
+        add(self.check_ccTLD_registrar, deps=["whois_lookup"], local=True)
+        add(self.check_rir_allocation, deps=["get_ip_info"], local=True)
+        add(self.detect_hosting_provider, deps=["get_ip_info"], local=True)
+        # Валідація слідів потребує результатів усіх інших проб
+        add(self.validate_russian_traces, deps=list(graph.probes), local=True)
+        return graph
+    @staticmethod
+    def apply_probe_result(report: DomainReport, record: ProbeRecord | None):
+        """Застосовує підзапис проби до звіту (викликається лише з потоку get_domain_metadata)"""
+        if record is not None:
+            record.apply(report)
+    def _record_outcomes(self, report: DomainReport, graph: ProbeGraph, results: dict, reused: set[str],
+                         fetched_at: dict[str, float]):
+        """
+        Метрики проб і час отримання даних кожної мережевої проби. Для даних з кешу це час
+        первинного запиту, а не поточний — інакше вони виглядали б свіжими ще цілий REFRESH_AFTER.
+        """
+        now = time.time()
+        for name in graph.probes:
+            if name in reused:
+                outcome = "reused"
+            elif name in graph.timed_out:
+                outcome = "timeout"
+            elif name in graph.failures or isinstance(results.get(name), ProbeError):
+                outcome = "error"
+            else:
+                outcome = "success"
+                if name in self.REFRESH_AFTER:
+                    report.probed_at[name] = min(fetched_at.get(name, now), now)
+            self.metrics.count(name, outcome)
+    def stale_probe_names(self, report: DomainReport, ahead: float = 0) -> set[str]:
+        """Мережеві проби, дані яких застаріли (або застаріють протягом ahead секунд) чи відсутні"""
+        now = time.time()
+        return {
+            name for name, refresh_after in self.REFRESH_AFTER.items()
+            if now - report.probed_at.get(name, 0) >= refresh_after - ahead
+        }
+    def _stale_probes(self, report: DomainReport, graph: ProbeGraph, ahead: float = 0) -> set[str]:
+        """Проби, які треба перезапустити: застарілі, невідомі REFRESH_AFTER, плюс усі залежні від них"""
+        stale = self.stale_probe_names(report, ahead)
+        stale.update(name for name, (_, _, local) in graph.probes.items()
+                     if not local and name not in self.REFRESH_AFTER)
+        return graph.downstream(stale)
+    def _reset_fields(self, report: DomainReport, probe: str):
+        blank = DomainReport()
+        for name in self.PROBE_FIELDS.get(probe, ()):
+            setattr(report, name, getattr(blank, name))
+    def get_domain_metadata(self, url: str, deadline_at: float | None = None,
+                            previous: DomainReport | None = None, refresh_ahead: float = 0) -> DomainReport:
+        """
+        deadline_at — момент за time.monotonic(), після якого незавершені проби відкидаються.
+        previous — попередній звіт для того ж домену: перезапускаються лише проби із застарілими
+        даними (REFRESH_AFTER) та залежні від них, а валідація слідів виконується завжди.
+        refresh_ahead — оновлювати й ті дані, що застаріють протягом стількох секунд.
+        """
+        return self._collect(url, deadline_at, previous, refresh_ahead)[0]
+    def _collect(self, url: str, deadline_at: float | None, previous: DomainReport | None,
+                 refresh_ahead: float) -> tuple[DomainReport, bool]:
+        """(звіт, чи встигла хоч одна з запущених мережевих проб); False — зберігати такий звіт не варто"""
+        report = DomainReport(input_url=url)
+        self.normalize_url(report)
+        if not report.domain:
+            return report, True
 
-        # Registrar check
-        reg = (self.result["registrar"] or "").lower()
-        if any(k in reg for k in ru_keywords):
-            ru_traces.append(f"Російський реєстратор: {self.result['registrar']}")
+        incremental = previous is not None and previous.domain == report.domain
+        if incremental:
+            report = copy.deepcopy(previous)
+            report.input_url = url
+            report.errors = []
 
-        # IP country
-        if self.result["country"] == "Russia":
-            ru_traces.append("Хостинг розташований у РФ")
+        fetched_at: dict[str, float] = {}
+        graph = self.build_probe_graph(report, fetched_at)
+        refresh = self._stale_probes(report, graph, refresh_ahead) if incremental else set(graph.probes)
+        reused = {name for name, (_, _, local) in graph.probes.items() if not local and name not in refresh}
+        graph.skip(reused)
 
-        # DNS servers
-        if any(".ru" in ns for ns in self.result["name_servers"]):
-            ru_traces.append("DNS сервер у РФ")
-        
-        # NEW: Nameserver countries
-        if any("Russia" in ns for ns in self.result.get("nameserver_countries", [])):
-            ru_traces.append("DNS сервер фізично у РФ")
-        
-        # NEW: Hosting provider
-        if self.result.get("hosting_provider") and "(RU)" in self.result["hosting_provider"]:
-            ru_traces.append(f"Російський хостинг: {self.result['hosting_provider']}")
-        
-        # NEW: MX records
-        mx_records = self.result.get("dns_records", {}).get("mx", [])
-        if any(".ru" in mx for mx in mx_records):
-            ru_traces.append("Email сервер у РФ")
+        def on_result(name: str, record: ProbeRecord | None):
+            # Свіжий результат замінює старі поля проби; при помилці лишаємо попередні значення
+            if incremental and name in refresh and not isinstance(record, ProbeError):
+                self._reset_fields(report, name)
+            self.apply_probe_result(report, record)
+            if self.on_probe is not None:
+                self.on_probe(report, name, record)
 
-        # NEW: WHOIS сервер
-        if self.result.get("whois_server") and ".ru" in str(self.result["whois_server"]):
-            ru_traces.append("WHOIS сервер російський")
-        
-        # NEW: Країна реєстранта
-        countries = [
-            self.result.get("registrant_country"),
-            self.result.get("admin_country"), 
-            self.result.get("tech_country")
-        ]
-        if any(c and "RU" in str(c).upper() for c in countries):
-            ru_traces.append("Контактна особа з РФ")
-        
-        # NEW: RDAP дані
-        rdap = self.result.get("rdap_info", {})
-        if rdap.get("asn_country_code") == "RU":
-            ru_traces.append("ASN зареєстрований у РФ")
-    
-        self.result["russian_traces"] = ru_traces or ["Ознак РФ не виявлено"]
-    def check_http_headers(self):
-        """Перевіряє HTTP заголовки для визначення сервера"""
+        results = graph.run(on_result=on_result, deadline_at=deadline_at)
+        self._record_outcomes(report, graph, results, reused, fetched_at)
+        for name, e in graph.failures.items():
+            report.errors.append(f"{name} error: {e}")
+        for name in graph.timed_out:
+            report.errors.append(f"{name} timed out")
+
+        network = {name for name in refresh if not graph.probes[name][2]}
+        return report, not network or not network <= set(graph.timed_out)
+    def check(self, url: str, deadline_at: float | None = None, refresh_ahead: float = 0) -> DomainReport:
+        """
+        Перевірка з урахуванням попереднього звіту зі сховища; новий звіт зберігається туди ж.
+        Одночасні перевірки того самого домену (з різних запитів чи фонового оновлення)
+        чекають одне спільне обчислення, але не довше FOLLOWER_WAIT_SHARE власного бюджету:
+        якщо власник забарився, повертаємо попередній звіт зі сховища, а без нього
+        перевіряємо самі за залишок бюджету.
+        """
         try:
-            response = requests.get(f"https://{self.result['domain']}", timeout=5)
-            headers = response.headers
-            
-            self.result["http_headers"] = {
-                "server": headers.get("Server"),
-                "x-powered-by": headers.get("X-Powered-By"),
-                "cf-ray": headers.get("CF-RAY"),  # Cloudflare
-            }
-            
-            # Detect Russian hosting by headers
-            server = str(headers.get("Server", "")).lower()
-            if any(x in server for x in ["nginx/", "apache/", "yandex"]):
-                if self.result["country"] == "Russia":
-                    self.result["russian_traces"].append(f"HTTP Server у РФ: {server}")
-                    
-        except Exception as e:
-            self.result["errors"].append(f"HTTP headers error: {e}")
-    def check_autonomous_system(self):
-        """Детальна перевірка ASN"""
-        if self.result.get("asn"):
-            # Common Russian ASNs
-            russian_asns = {
-                "AS8359": "MTS",
-                "AS12389": "Rostelecom",
-                "AS47764": "VKontakte",
-                "AS13238": "Yandex",
-                "AS31213": "Megafon",
-            }
-            
-            asn = str(self.result["asn"])
-            if asn in russian_asns:
-                self.result["russian_traces"].append(f"Російський ASN: {russian_asns[asn]}")
-    def get_domain_metadata(self, url: str) -> dict:
-        # Reset result for each URL
-        self.result = {
-            "input_url": url,
-            "domain": None,
-            "ip": None,
-            "country": None,
-            "asn": None,
-            "org": None,
-            "registrar": None,
-            "creation_date": None,
-            "expiration_date": None,
-            "name_servers": [],
-            "nameserver_countries": [],
-            "hosting_provider": None,
-            "dns_records": {},
-            "ssl_issuer": None,
-            "russian_traces": [],
-            "errors": [],
-            "whois_server": None,
-            "registrant_country": None,
-            "admin_country": None,
-            "tech_country": None,
-            "registry_domain_id": None,
-            "dnssec": None,
-            "abuse_contact": None,
-            "status": [],
-            "rdap_info": {},
-        }
-        
-        self.normalize_url(url)
-        if not self.result["domain"]:
-            return self.result
-        
-        self.whois_lookup()
-        self.get_ip_info()
-        self.check_rdap()
-        self.check_ccTLD_registrar()
-        self.check_rir_allocation()
-        self.detect_hosting_provider()
-        self.check_nameserver_location()
-        self.check_dns_records()
-        self.check_ssl_certificate()
-        self.check_http_headers()  # NEW
-        self.check_autonomous_system()  # NEW
-        self.validate_russian_traces()
-        
-        return self.result
-    def run(self) -> list[dict]:
+            domain = self.registrable_domain(url)
+        except ValueError:
+            return self._check(url, deadline_at, refresh_ahead)
+        timeout = None
+        if deadline_at is not None:
+            timeout = max(deadline_at - time.monotonic(), 0) * self.FOLLOWER_WAIT_SHARE
+        report, joined = get_single_flight("probe").do(
+            (domain, self.incremental), lambda: self._check(url, deadline_at, refresh_ahead), timeout,
+            fallback=lambda: self._stored(domain, url) or self._check(url, deadline_at, refresh_ahead))
+        if joined:
+            report = copy.deepcopy(report)
+            report.input_url = url
+        return report
+    def _stored(self, domain: str, url: str) -> DomainReport | None:
+        """Попередній звіт домену зі сховища для input_url (None — немає або не інкрементальний режим)"""
+        if not self.incremental:
+            return None
+        try:
+            report = self.store.get(domain)
+        except Exception:
+            return None
+        if report is not None:
+            report.input_url = url
+        return report
+    def _check(self, url: str, deadline_at: float | None, refresh_ahead: float) -> DomainReport:
+        previous = None
+        if self.incremental:
+            try:
+                previous = self.store.get(self.registrable_domain(url))
+            except Exception:
+                previous = None
+        report, probed = self._collect(url, deadline_at, previous, refresh_ahead)
+        # Звіт, у якому всі мережеві проби вийшли за дедлайн, не замінює попередній у сховищі
+        if report.domain and probed:
+            self.store.put(report)
+        return report
+    def _group_by_domain(self) -> dict[str, list[str]]:
+        """Групує вхідні URL за зареєстрованим доменом (x.com/a, x.com/b, www.x.com -> x.com)"""
+        groups: dict[str, list[str]] = {}
+        for url in self.urls:
+            try:
+                key = self.registrable_domain(url)
+            except Exception:
+                key = url  # не вдалося розібрати — перевіряємо окремо, помилку запише normalize_url
+            groups.setdefault(key, []).append(url)
+        return groups
+    def _expand(self, groups: dict[str, list[str]], reports: dict[str, DomainReport]) -> list[DomainReport]:
+        """Розгортає результат по домену назад на кожен input_url у порядку вхідних URL"""
+        by_url = {}
+        for key, urls in groups.items():
+            report = reports[key]
+            by_url[urls[0]] = report
+            for url in urls[1:]:
+                duplicate = copy.deepcopy(report)
+                duplicate.input_url = url
+                by_url[url] = duplicate
+        return [by_url[url] for url in self.urls]
+    @staticmethod
+    def _deadline_at(deadline: float | None) -> float | None:
+        return None if deadline is None else time.monotonic() + deadline
+    def run(self, deadline: float | None = None) -> list[DomainReport]:
+        """deadline — бюджет у секундах на всю партію; None — чекати всі проби"""
         if not self.urls:
             return []
         if isinstance(self.urls, str):
             self.urls = [self.urls]
-        return [self.get_domain_metadata(url) for url in self.urls]
\ No newline at end of file
+        self.memo = BatchMemo()
+        groups = self._group_by_domain()
+        deadline_at = self._deadline_at(deadline)
+        reports = {key: self.check(urls[0], deadline_at) for key, urls in groups.items()}
+        return self._expand(groups, reports)
+    async def arun(self, concurrency: int = 10, deadline: float | None = None) -> list[DomainReport]:
+        """
+        Асинхронно перевіряє всі URL одночасно (не більше concurrency за раз).
+        Результати повертаються в порядку вхідних URL.
+        deadline — бюджет у секундах на всю партію; проби, що не встигли, позначаються як timed out.
+        """
+        if not self.urls:
+            return []
+        self.memo = BatchMemo()
+        groups = self._group_by_domain()
+        semaphore = asyncio.Semaphore(concurrency)
+        deadline_at = self._deadline_at(deadline)
+
+        async def check(url: str) -> DomainReport:
+            async with semaphore:
+                # Проби блокуючі, тому кожен домен обробляється у своєму потоці
+                return await asyncio.to_thread(self.check, url, deadline_at)
+
+        results = await asyncio.gather(*(check(urls[0]) for urls in groups.values()))
+        return self._expand(groups, dict(zip(groups, results)))
\ No newline at end of file
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable
+
+
+class _Entry:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Exception | None = None
+
+
+class SingleFlight:
+    """
+    Об'єднання однакових обчислень, що виконуються одночасно в різних потоках.
+    На відміну від BatchMemo результат не зберігається: щойно обчислення завершилось,
+    наступний виклик з тим самим ключем запускає нове.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight: dict[Any, _Entry] = {}
+        self._stats = {"owner": 0, "joined": 0, "fallback": 0}
+
+    def do(self, key, fn: Callable[[], Any], timeout: float | None = None,
+           fallback: Callable[[], Any] | None = None) -> tuple[Any, bool]:
+        """
+        Повертає (результат, joined). joined=True — результат обчислив інший потік,
+        тож змінювані значення варто скопіювати. Якщо чужого результату не дочекались за timeout,
+        повертаємо fallback() (за замовчуванням — обчислюємо fn самостійно, без об'єднання).
+        """
+        with self._lock:
+            entry = self._inflight.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._inflight[key] = _Entry()
+                self._stats["owner"] += 1
+
+        if not owner:
+            joined = entry.done.wait(timeout)
+            with self._lock:
+                self._stats["joined" if joined else "fallback"] += 1
+            if not joined:
+                return (fallback or fn)(), False
+            if entry.error is not None:
+                raise entry.error
+            return entry.value, True
+
+        try:
+            entry.value = fn()
+            return entry.value, False
+        except Exception as e:
+            entry.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            entry.done.set()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._stats, "inflight": len(self._inflight)}
+
+
+class AsyncSingleFlight:
+    """
+    Те саме для корутин: однакові одночасні виклики чекають одну спільну задачу.
+    Скасування одного з викликів (клієнт закрив з'єднання) не скасовує задачу для решти,
+    але коли скасовано останній виклик, що її чекав, задача скасовується теж.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[Any, asyncio.Task] = {}
+        self._waiters: dict[asyncio.Task, int] = {}
+        self._stats = {"owner": 0, "joined": 0}
+
+    async def do(self, key, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        joined = task is not None and task.get_loop() is loop
+        if not joined:
+            task = loop.create_task(fn())
+            self._inflight[key] = task
+            self._waiters[task] = 0
+            task.add_done_callback(lambda t: self._forget(key, t))
+        self._stats["joined" if joined else "owner"] += 1
+        self._waiters[task] += 1
+        try:
+            return await asyncio.shield(task), joined
+        except asyncio.CancelledError:
+            if not task.done() and self._waiters[task] == 1:
+                # Більше ніхто не чекає — не витрачаємо запити й бюджет повторів;
+                # нові виклики з цим ключем не приєднуються до задачі, що скасовується
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+                task.cancel()
+            raise
+        finally:
+            if task in self._waiters:
+                self._waiters[task] -= 1
+
+    def _forget(self, key, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        self._waiters.pop(task, None)
+        if not task.cancelled():
+            task.exception()  # позначає помилку як отриману, якщо всі виклики вже скасовані
+
+    def stats(self) -> dict[str, int]:
+        return {**self._stats, "inflight": len(self._inflight)}
+
+
+_flights: dict[str, SingleFlight | AsyncSingleFlight] = {}
+_flights_lock = threading.Lock()
+
+
+def _get(name: str, cls):
+    with _flights_lock:
+        flight = _flights.get(name)
+        if flight is None:
+            flight = _flights[name] = cls(name)
+        return flight
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Спільний для процесу SingleFlight шару name (наприклад, "probe")"""
+    return _get(name, SingleFlight)
+
+
+def get_async_single_flight(name: str) -> AsyncSingleFlight:
+    """Спільний для процесу AsyncSingleFlight шару name (наприклад, "llm", "check")"""
+    return _get(name, AsyncSingleFlight)
+
+
+def render_single_flight() -> str:
+    """Лічильники об'єднаних викликів у форматі Prometheus"""
+    lines = [
+        "# HELP rf_single_flight_total Calls that started (owner) or joined an identical in-flight computation",
+        "# TYPE rf_single_flight_total counter",
+    ]
+    with _flights_lock:
+        flights = sorted(_flights.items())
+    for name, flight in flights:
+        stats = flight.stats()
+        for role in ("owner", "joined"):
+            lines.append(f'rf_single_flight_total{{layer="{name}",role="{role}"}} {stats[role]}')
+    return "\n".join(lines) + "\n"
@@ -1,4 +1,62 @@
+import os
+
+def _seconds(name: str, default: str) -> float | None:
+    value = os.getenv(name, default).strip()
+    return float(value) if value else None
+
 class Config(object):
     debug: bool = False
     version: str = "1.0.0"
-    prompt_validation: str = "validation.txt"
\ No newline at end of file
+    prompt_validation: str = "validation.txt"
+    # Бюджет часу (секунди) на проби URL для кожної точки входу; None — чекати всі проби
+    probe_deadlines: dict = {
+        "check": _seconds("CHECK_PROBE_DEADLINE", "4"),  # розширення браузера чекає швидку відповідь
+        "batch": _seconds("BATCH_PROBE_DEADLINE", ""),   # пакетні перевірки (scan --deadline) можуть чекати довше
+    }
+    # Фонове оновлення популярних доменів (PREFETCH_TOP_N=0 — вимкнено)
+    prefetch: dict = {
+        "top_n": int(os.getenv("PREFETCH_TOP_N", "100") or 0),
+        "per_minute": float(os.getenv("PREFETCH_PER_MINUTE", "20") or 0),  # ліміт фонових перевірок
+        "lead": _seconds("PREFETCH_LEAD", "600") or 600.0,  # за скільки секунд до застарівання оновлювати
+    }
+    # Кеш відповідей LLM (LLM_CACHE_TTL порожній — без терміну дії)
+    llm_cache: dict = {
+        "ttl": _seconds("LLM_CACHE_TTL", "86400"),
+        "size_limit": int(os.getenv("LLM_CACHE_SIZE_MB", "256") or 256) * 1024 * 1024,
+    }
+    # Повторне використання вердиктів для майже однакових текстів
+    text_index: dict = {
+        "threshold": float(os.getenv("TEXT_DUP_THRESHOLD", "0.8") or 0.8),  # мінімальна схожість (0..1)
+        "max_entries": int(os.getenv("TEXT_INDEX_MAX_ENTRIES", "20000") or 20000),
+    }
+    # Повтори асинхронних викликів LLM: кількість спроб і загальний бюджет часу (секунди, порожньо — без обмеження)
+    llm_retry: dict = {
+        "attempts": int(os.getenv("LLM_RETRY_ATTEMPTS", "5") or 5),
+        "budget": _seconds("LLM_RETRY_BUDGET", "30"),
+    }
+    # Вибір LLM провайдера: пріоритет, дублюючі запити (hedging) після p95 затримки, пауза після 429/503
+    llm_router: dict = {
+        "priority": [p.strip() for p in os.getenv("LLM_PROVIDERS", "anthropic,gemini,openrouter").split(",") if p.strip()],
+        "hedge": os.getenv("LLM_HEDGE", "1").strip().lower() not in ("0", "false", "no", ""),
+        "hedge_min_delay": _seconds("LLM_HEDGE_MIN_DELAY", "1") or 0.0,
+        "cooldown": _seconds("LLM_PROVIDER_COOLDOWN", "30") or 0.0,
+    }
+    # Пакетний аналіз (масові перевірки): об'єктів в одному запиті до LLM і токенів відповіді на кожен
+    llm_batch: dict = {
+        "size": int(os.getenv("LLM_BATCH_SIZE", "20") or 20),
+        "tokens_per_item": int(os.getenv("LLM_BATCH_TOKENS_PER_ITEM", "256") or 256),
+        "item_budget": int(os.getenv("LLM_BATCH_ITEM_BUDGET", "300") or 300),  # токенів доказів на один об'єкт
+    }
+    # Бюджет промпту: скільки токенів (оцінка) віддати під докази і максимум символів на одне поле
+    prompt: dict = {
+        "budget": int(os.getenv("PROMPT_TOKEN_BUDGET", "1200") or 1200),
+        "max_field_chars": int(os.getenv("PROMPT_FIELD_CHARS", "300") or 300),
+    }
+    # Локальна попередня класифікація: вердикт без AI, якщо ймовірність поза [lower, upper]
+    preclassifier: dict = {
+        "enabled": os.getenv("PRECLASSIFY_ENABLED", "1").strip().lower() not in ("0", "false", "no", ""),
+        "upper": float(os.getenv("PRECLASSIFY_UPPER", "0.9") or 0.9),
+        "lower": float(os.getenv("PRECLASSIFY_LOWER", "0.1") or 0.1),
+        "min_coverage": float(os.getenv("PRECLASSIFY_MIN_COVERAGE", "0.75") or 0.75),  # частка ключових полів звіту для «чистого» вердикту
+        "text_model": os.getenv("TEXT_MODEL_PATH", "").strip() or None,
+    }
@@ -1,15 +1,29 @@
 import diskcache as dc
 import hashlib
 import json
+import threading
+from .config import Config
 
+_state_cache: dc.Cache | None = None
+_state_cache_lock = threading.Lock()
+
+def get_state_cache() -> dc.Cache:
+     """Спільний для процесу diskcache стану: LRU витіснення з обмеженням розміру"""
+     global _state_cache
+     with _state_cache_lock:
+          if _state_cache is None:
+               _state_cache = dc.Cache(".ai_core_state_cache_v1", size_limit=Config.llm_cache["size_limit"],
+                                       eviction_policy="least-recently-used")
+          return _state_cache
 
 class State(object):
      machine: str = "default"
      game_name: str = ""
-     metadata: dict = {}
-     urls: list[str] = []
      def __init__(self):
-        self.cache = dc.Cache(".ai_core_state_cache_v1")
+        self.cache = get_state_cache()
+        # Метадані належать одному запиту: одночасні перевірки не повинні бачити чужі дані
+        self.metadata: dict = {}
+        self.urls: list[str] = []
      def make_key(self, prompt: str):
           return hashlib.sha256(prompt.encode()).hexdigest()
      def set(self, key: str, value):
@@ -2,8 +2,8 @@ from .Detector import *
 from ..state_machine.main import *
 
 class TextFormatterMain: 
-    def __init__(self):
-        self.state_machine = StateMachine()
+    def __init__(self, state_machine: StateMachine | None = None):
+        self.state_machine = state_machine or StateMachine()
         self.state = self.state_machine.state
     def run(self):
         text = self.state.metadata.get("text", "")
@@ -0,0 +1,188 @@
+import hashlib
+import random
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import diskcache as dc
+
+from ..state_machine.config import Config
+
+_URL_RE = re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE)
+_NON_WORD_RE = re.compile(r"[^\w\s]+")  # пунктуація, емодзі, символи
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 64) - 1
+
+
+def normalize_text(text: str) -> str:
+    """NFKC, нижній регістр, без посилань, емодзі та пунктуації — дрібні правки не змінюють результат"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _URL_RE.sub(" ", text)
+    text = _NON_WORD_RE.sub(" ", text)
+    return " ".join(text.split())
+
+
+def shingles(text: str, size: int = 3) -> set[str]:
+    """Словесні n-грами нормалізованого тексту; короткий текст — один шингл"""
+    words = normalize_text(text).split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+@dataclass(slots=True)
+class TextMatch:
+    key: str
+    similarity: float  # оцінка схожості Жаккара за MinHash
+    verdict: str
+    created_at: float
+
+
+class NearDuplicateIndex:
+    """
+    MinHash + LSH індекс уже перевірених текстів. Майже однаковий текст (змінений емодзі,
+    трекінгове посилання, обрізаний рядок) отримує збережений вердикт без виклику LLM.
+
+    У пам'яті — лише сигнатури й LSH кошики (обмежено max_entries, LRU);
+    вердикти й сигнатури зберігаються в diskcache і переживають перезапуск.
+    """
+
+    NUM_PERM = 64
+    BANDS = 16  # 16 смуг по 4 рядки: кандидатами стають тексти зі схожістю від ~0.5
+    SEED = 1  # незмінний, інакше збережені сигнатури стануть непридатними
+
+    def __init__(
+        self,
+        directory: str = ".ai_core_text_index_v1",
+        threshold: float = 0.8,
+        max_entries: int = 20_000,
+        ttl: float | None = 30 * 24 * 3600,
+    ):
+        self.cache = dc.Cache(directory)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        rng = random.Random(self.SEED)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(self.NUM_PERM)]
+        self._rows = self.NUM_PERM // self.BANDS
+        self._lock = threading.Lock()
+        self._signatures: OrderedDict[str, array] = OrderedDict()
+        self._buckets: dict[tuple[int, int], set[str]] = {}
+        self._loaded = False
+        self._stats = {"hit": 0, "miss": 0, "stored": 0}
+
+    def signature(self, text: str) -> array | None:
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+                  for s in shingles(text)]
+        if not hashes:
+            return None
+        return array("Q", (min((a * h + b) % _PRIME for h in hashes) & _MASK for a, b in self._perms))
+
+    def _bands(self, sig: array) -> list[tuple[int, int]]:
+        rows = self._rows
+        return [(band, hash(tuple(sig[band * rows:(band + 1) * rows]))) for band in range(self.BANDS)]
+
+    def _insert(self, key: str, sig: array):
+        """Викликається під self._lock"""
+        if key in self._signatures:
+            self._signatures.move_to_end(key)
+            return
+        self._signatures[key] = sig
+        for band in self._bands(sig):
+            self._buckets.setdefault(band, set()).add(key)
+        while len(self._signatures) > self.max_entries:
+            old_key, _ = next(iter(self._signatures.items()))
+            self._remove(old_key)
+            self.cache.delete(old_key)
+
+    def _remove(self, key: str):
+        """Викликається під self._lock"""
+        sig = self._signatures.pop(key, None)
+        if sig is None:
+            return
+        for band in self._bands(sig):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+
+    def _ensure_loaded(self):
+        """Відновлює індекс у пам'яті з diskcache при першому зверненні"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            for key in self.cache.iterkeys():
+                entry = self.cache.get(key)
+                if entry is not None:
+                    sig = array("Q")
+                    sig.frombytes(entry["sig"])
+                    self._insert(key, sig)
+            self._loaded = True
+
+    def lookup(self, text: str) -> TextMatch | None:
+        """Найсхожіший збережений текст зі схожістю не нижче threshold"""
+        self._ensure_loaded()
+        sig = self.signature(text)
+        if sig is None:
+            return None
+        with self._lock:
+            candidates = set()
+            for band in self._bands(sig):
+                candidates |= self._buckets.get(band, set())
+            scored = sorted(
+                ((sum(x == y for x, y in zip(sig, self._signatures[key])) / self.NUM_PERM, key) for key in candidates),
+                reverse=True,
+            )
+        for similarity, key in scored:
+            if similarity < self.threshold:
+                break
+            entry = self.cache.get(key)
+            if entry is None:  # запис сплив або витіснений з диска
+                with self._lock:
+                    self._remove(key)
+                continue
+            with self._lock:
+                if key in self._signatures:
+                    self._signatures.move_to_end(key)
+                self._stats["hit"] += 1
+            return TextMatch(key, similarity, entry["verdict"], entry["created_at"])
+        with self._lock:
+            self._stats["miss"] += 1
+        return None
+
+    def add(self, text: str, verdict: str) -> str | None:
+        self._ensure_loaded()
+        sig = self.signature(text)
+        if sig is None:
+            return None
+        key = "text:" + hashlib.sha256(sig.tobytes()).hexdigest()
+        self.cache.set(key, {"sig": sig.tobytes(), "verdict": verdict, "created_at": time.time()}, expire=self.ttl)
+        with self._lock:
+            self._insert(key, sig)
+            self._stats["stored"] += 1
+        return key
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._signatures)}
+
+
+_default_index: NearDuplicateIndex | None = None
+_default_index_lock = threading.Lock()
+
+
+def get_text_index() -> NearDuplicateIndex:
+    """Спільний для процесу індекс майже однакових текстів"""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = NearDuplicateIndex(**Config.text_index)
+        return _default_index
@@ -4,6 +4,7 @@ class CheckRequest(BaseModel):
     game_name: str | None = Field(None, max_length=500)
     text: str | None = Field(None, max_length=2000)
     user_id: str = Field(..., description="Унікальний ID користувача з розширення")
+    bypass_cache: bool = Field(False, description="Не брати відповідь AI з кешу")
     @model_validator(mode='after')
     def check_at_least_one_field(self):
         if not self.urls and not self.game_name and not self.text:
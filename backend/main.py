@@ -20,9 +20,12 @@ from fastapi.responses import JSONResponse
 
 from .checkers.security_config import SecurityConfig
 from .services.dynamodb import DynamoDBService
+from ai_core.requests_methods.http_client import close_http_clients
+from ai_core.requests_methods.prefetch import start_prefetcher, stop_prefetcher
+from ai_core.state_machine.config import Config
 
 # Імпорт роутів
-from .routes import auth_router, check_router, health_router
+from .routes import auth_router, check_router, health_router, metrics_router
 
 class RFCheckerAPI:
     """Головний клас API"""
@@ -33,6 +36,7 @@ class RFCheckerAPI:
         self.db = DynamoDBService()
         self._setup_middleware()
         self._setup_routes()
+        self._setup_lifecycle()
     
     def _create_app(self) -> FastAPI:
         """Створення FastAPI додатку"""
@@ -85,6 +89,13 @@ class RFCheckerAPI:
         self.app.include_router(health_router)
         self.app.include_router(auth_router)
         self.app.include_router(check_router)
+        self.app.include_router(metrics_router)
+    
+    def _setup_lifecycle(self):
+        """Обробники запуску та зупинки"""
+        self.app.add_event_handler("startup", lambda: start_prefetcher(**Config.prefetch))
+        self.app.add_event_handler("shutdown", stop_prefetcher)
+        self.app.add_event_handler("shutdown", close_http_clients)
     
     def run(self, host: str = "0.0.0.0", port: int = 8000):
         """Запуск сервера"""
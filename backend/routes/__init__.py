@@ -1,5 +1,6 @@
 from .auth import router as auth_router
 from .check import router as check_router
 from .health import router as health_router
+from .metrics import router as metrics_router
 
-__all__ = ['auth_router', 'check_router', 'health_router']
\ No newline at end of file
+__all__ = ['auth_router', 'check_router', 'health_router', 'metrics_router']
\ No newline at end of file
@@ -1,11 +1,16 @@
+import asyncio
+import hashlib
 import json
+import threading
+import unicodedata
+from dataclasses import asdict, is_dataclass
 from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 import sys
 from pathlib import Path
 from datetime import datetime
-import os
 import uuid
 
 ROOT = Path(__file__).resolve().parent.parent.parent
@@ -14,54 +19,294 @@ sys.path.insert(0, str(ROOT))
 from backend.checkers.auth_service import AuthService
 from backend.checkers.check_request import CheckRequest
 from ai_core.main import AICoreMain
+from ai_core.ai_machines.preclassifier import get_preclassifier
+from ai_core.ai_machines.prompt_builder import get_prompt_builder
+from ai_core.ai_machines.router import RoutedResponse, configured_providers, get_llm_router
+from ai_core.requests_methods.urls_checker import UrlsChecker
+from ai_core.single_flight import get_async_single_flight
+from ai_core.text_formatter.near_duplicates import get_text_index
 from backend.services.dynamodb import DynamoDBService
 
 router = APIRouter(prefix="/api", tags=["Content Check"])
 limiter = Limiter(key_func=get_remote_address)
 db_service = DynamoDBService()
 
-def get_ai_provider():
-    """Визначити який AI провайдер використовувати"""
-    anthropic_key = os.getenv("ANTHROPIC_API_KEY", "").strip()
-    gemini_key = os.getenv("GEMINI_API_KEY", "").strip()
-    
-    if anthropic_key:
-        return "anthropic"
-    elif gemini_key:
-        return "gemini"
-    else:
+CHECK_INSTRUCTION = """Ти експерт з виявлення російської пропаганди та контенту, пов'язаного з російською федерацією.
+
+Проаналізуй наведений нижче контент та визнач, чи містить він:
+- Російську пропаганду
+- Підтримку російської федерації або її дій
+- Контент від російських розробників/компаній
+- Зв'язки з російськими організаціями
+
+Дай відповідь у форматі JSON:
+{
+    "is_russian_content": true/false,
+    "text": "Детальне пояснення українською мовою"
+}"""
+
+def get_ai_providers() -> list[str]:
+    """Провайдери з ключами, впорядковані роутером (найкращий — перший)"""
+    providers = get_llm_router().rank(configured_providers())
+    if not providers:
         raise HTTPException(status_code=500, detail="No AI API keys configured")
+    return providers
 
-def analyze_with_anthropic(prompt: str) -> str:
-    """Аналіз з Anthropic"""
-    try:
-        import anthropic
-        
-        client = anthropic.Anthropic(
-            api_key=os.getenv("ANTHROPIC_API_KEY")
-        )
-        
-        message = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=2048,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        return message.content[0].text
-    except Exception as e:
-        print(f"Anthropic error: {str(e)}")
-        raise
+def get_ai_provider() -> str:
+    """Визначити який AI провайдер використовувати першим"""
+    return get_ai_providers()[0]
+
+async def analyze_with_anthropic(ai_core: AICoreMain, prompt: str, retry: dict | None = None) -> str:
+    """Аналіз з Anthropic (асинхронний клієнт — повтори не блокують event loop)"""
+    return await ai_core.ai_machines.aanthropic_generate_text(prompt, retry=retry)
 
-def analyze_with_gemini(ai_core: AICoreMain, data) -> str:
+async def analyze_with_gemini(ai_core: AICoreMain, data, retry: dict | None = None) -> str:
     """Аналіз з Gemini"""
-    try:
-        response = ai_core.ai_machines.gemeni_generate_text(ai_core.state.metadata)
-        return str(response)
-    except Exception as e:
-        print(f"Gemini error: {str(e)}")
-        raise
+    response = await ai_core.ai_machines.agemeni_generate_text(
+        ai_core.state.metadata, use_cache=not data.bypass_cache, retry=retry, raise_errors=True)
+    return str(response)
+
+async def analyze_with_openrouter(ai_core: AICoreMain, retry: dict | None = None) -> str:
+    """Аналіз через OpenRouter (ті самі метадані й інструкція, що й для Gemini)"""
+    return await ai_core.ai_machines.aopenai_generate_text(ai_core.state.metadata, retry=retry)
+
+async def analyze(ai_core: AICoreMain, data, prompt: str, providers: list[str]) -> RoutedResponse:
+    """Аналіз через роутер: найкращий провайдер, дублюючий запит після p95, перехід до іншого при збої"""
+    ai_core.state.insert_metadata("analysis_prompt", prompt)
+    calls = {
+        "anthropic": lambda retry: analyze_with_anthropic(ai_core, prompt, retry),
+        "gemini": lambda retry: analyze_with_gemini(ai_core, data, retry),
+        "openrouter": lambda retry: analyze_with_openrouter(ai_core, retry),
+    }
+    return await get_llm_router().generate({name: calls[name] for name in providers if name in calls})
+
+def canonical_request_key(data) -> tuple:
+    """
+    Канонічний вигляд запиту для об'єднання однакових одночасних перевірок:
+    відсортовані зареєстровані домени, нормалізована назва гри і хеш тексту
+    """
+    domains = set()
+    for url in data.urls:
+        try:
+            domains.add(UrlsChecker.registrable_domain(url))
+        except ValueError:
+            domains.add(url.strip().lower())
+    game = " ".join(data.game_name.casefold().split()) if data.game_name else None
+    text = None
+    if data.text:
+        normalized = " ".join(unicodedata.normalize("NFC", data.text).split())
+        text = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return tuple(sorted(domains)), game, text, data.bypass_cache
+
+async def analyze_stream(ai_core: AICoreMain, data, prompt: str, providers: list[str], on_token) -> RoutedResponse:
+    """Потоковий аналіз: токени провайдера передаються в on_token; перехід до іншого лише до першого токена"""
+    ai_core.state.insert_metadata("analysis_prompt", prompt)
+    machines = ai_core.ai_machines
+    streams = {
+        "anthropic": lambda: machines.aanthropic_stream_text(prompt),
+        "gemini": lambda: machines.agemeni_stream_text(ai_core.state.metadata, use_cache=not data.bypass_cache),
+        "openrouter": lambda: machines.aopenai_stream_text(ai_core.state.metadata),
+    }
+    return await get_llm_router().stream({name: streams[name] for name in providers if name in streams}, on_token)
+
+async def run_check(data: CheckRequest, request_id: str, emit=None) -> dict:
+    """
+    Спільна частина перевірки: проби, Steam і аналіз AI. Не залежить від користувача,
+    тому одночасні однакові запити виконують її один раз.
+    emit(event, payload) — для стрімінгу: результати проб (з потоків проб), Steam, токени AI.
+    """
+    # Визначення AI провайдерів (порядок — за поточною затримкою та помилками)
+    ai_providers = get_ai_providers()
+    print(f"[{request_id}] AI providers: {', '.join(ai_providers)}")
+    
+    ai_core = AICoreMain()
+    steam_url = None
+    steam_info = {}
+    skipAll = False
+    urls = list(data.urls)  # спільний запит не змінює data інших учасників
+    
+    # Визначення типу перевірки та підготовка даних
+    check_type = None
+    reports = []  # звіти URL саме цього запиту
+    
+    if data.text:
+        ai_core.state.insert_metadata("text", data.text)
+        skipAll = True
+        check_type = "text"
+    
+    # Обробка Steam гри
+    if skipAll is False and data.game_name:
+        print(f"[{request_id}] Processing game: {data.game_name}")
+        check_type = "game"
+        try:
+            await ai_core.asteam_process(data.game_name)
+            steam_info = ai_core.state.metadata.get("steam_game_info", {})
+            steam_url = steam_info.get("website")
+        except Exception as e:
+            print(f"[{request_id}] Steam processing error: {str(e)}")
+            import traceback
+            traceback.print_exc()
+        if emit:
+            emit("steam", steam_info)
+        
+        # Додаємо URL тільки якщо він не None та не порожній
+        if steam_url and isinstance(steam_url, str) and steam_url.strip():
+            urls.append(steam_url)
+        else:
+            steam_url = None
+    
+    # Обробка URLs тільки якщо список не порожній
+    if skipAll is False and urls and len(urls) > 0:
+        check_type = "url"
+        try:
+            print(f"[{request_id}] Processing URLs: {urls}")
+            on_probe = None
+            if emit:
+                def on_probe(report, probe, record):
+                    emit("probe", {"url": report.input_url, "domain": report.domain, "probe": probe,
+                                   "kind": type(record).__name__ if record is not None else None,
+                                   "result": asdict(record) if is_dataclass(record) else None})
+            await ai_core.arequest_handle(urls, deadline=ai_core.config.probe_deadlines["check"], on_probe=on_probe)
+            reports = ai_core.state.metadata.get("urls_metadata", [])
+            if emit:
+                for report in reports:
+                    emit("report", report.to_dict())
+        except Exception as e:
+            print(f"[{request_id}] Error in request_handle: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            raise
+    else:
+        pass  # Пропускаємо обробку, якщо список URLs порожні
+    
+    # Формування промпту: незмінна інструкція першою (спільний префікс для кешу промптів провайдера),
+    # далі докази в межах бюджету токенів
+    prompt = get_prompt_builder().build(CHECK_INSTRUCTION, ai_core.state.metadata)
+    
+    # Майже однаковий текст уже перевіряли — беремо збережений вердикт без виклику AI
+    text_match = None
+    if check_type == "text" and not data.bypass_cache:
+        text_match = await asyncio.to_thread(get_text_index().lookup, data.text)
+
+    # Очевидні випадки (сліди РФ або чистий звіт на західному хостингу) вирішуємо локально
+    preclassified = None
+    if text_match is None and not data.bypass_cache:
+        preclassified = get_preclassifier().classify(
+            check_type, text=data.text, reports=reports, game=bool(data.game_name))
+
+    # Вибір провайдера для аналізу
+    print(f"[{request_id}] Starting analysis with {ai_providers[0]}...")
+    hedged = False
+    if text_match is not None:
+        print(f"[{request_id}] Near-duplicate text (similarity {text_match.similarity:.2f}), reusing verdict")
+        ai_response = text_match.verdict
+        ai_provider = "text_index"
+    elif preclassified is not None and preclassified.confident:
+        print(f"[{request_id}] Pre-classified as {preclassified.decision} "
+              f"(p={preclassified.probability:.2f}), skipping AI")
+        ai_response = preclassified.verdict()
+        ai_provider = "local"
+    elif emit:
+        async def on_token(chunk: str):
+            emit("token", {"text": chunk})
+        routed = await analyze_stream(ai_core, data, prompt, ai_providers, on_token)
+        ai_response, ai_provider = routed.text, routed.provider
+    else:
+        routed = await analyze(ai_core, data, prompt, ai_providers)
+        ai_response, ai_provider, hedged = routed.text, routed.provider, routed.hedged
+        print(f"[{request_id}] Answered by {ai_provider}" + (" (hedged)" if hedged else ""))
+    
+    print(f"[{request_id}] Analysis completed")
+
+    if check_type == "text" and text_match is None and ai_provider != "local":
+        try:
+            json.loads(ai_response)
+            await asyncio.to_thread(get_text_index().add, data.text, ai_response)
+        except ValueError:
+            pass  # невалідну відповідь не запам'ятовуємо; помилку побачить кожен запит нижче
+
+    return {
+        "ai_core": str(ai_core.metadata_dict()),
+        "ai_response": ai_response,
+        "provider": ai_provider,
+        "hedged": hedged,
+        "check_type": check_type,
+        "steam_url": steam_url,
+        "steam_info": steam_info,
+        "text_match": text_match,
+        "preclassified": preclassified,
+    }
+
+def request_check_data(data: CheckRequest, check_type: str | None, steam_url: str | None) -> tuple[dict, list[str]]:
+    """
+    Дані для історії та відповіді з власного запиту користувача: приєднаний до спільної
+    перевірки запит може мати інші URL того ж домену чи інакше записаний текст
+    """
+    urls = list(data.urls) + ([steam_url] if steam_url else [])
+    if check_type == "text":
+        return {"text": data.text[:100] + "..."}, []
+    if check_type == "url":
+        return {"urls": urls}, urls
+    if check_type == "game":
+        return {"game_name": data.game_name}, urls
+    return {}, []
+
+def finish_check(data: CheckRequest, shared: dict, request_id: str, timestamp: str,
+                 user_limit: int, joined: bool = False) -> dict:
+    """Облік для конкретного користувача та відповідь API за результатом run_check"""
+    user_id = data.user_id
+    ai_response = shared["ai_response"]
+    ai_provider = shared["provider"]
+    check_type = shared["check_type"]
+    check_data, urls_checked = request_check_data(data, check_type, shared["steam_url"])
+    text_match = shared["text_match"]
+    preclassified = shared["preclassified"]
+    
+    # Облік ведеться для кожного користувача окремо, навіть якщо перевірка спільна
+    # Збільшуємо лічильник тільки після успішної перевірки
+    new_count = db_service.increment_user_checks(user_id)
+    
+    # Зберігаємо історію перевірки
+    if check_type:
+        db_service.save_check_history(
+            user_id=user_id,
+            check_type=check_type,
+            data=check_data,
+            result={
+                "message": str(ai_response),
+                "provider": ai_provider,
+                "request_id": request_id,
+                "timestamp": timestamp
+            }
+        )
+    ai_response = json.loads(ai_response)
+    
+    result = {
+        "ai_core": shared["ai_core"],
+        "request_id": request_id,
+        "timestamp": timestamp,
+        "check_type": check_type,   
+        "is_russian_content": ai_response.get("is_russian_content", False),
+        "text": ai_response.get("text", ""),
+        "message": str(ai_response),
+        "checks_used": new_count,
+        "checks_remaining": user_limit - new_count,
+        "provider": ai_provider,
+        "details": {
+            "game_name": data.game_name,
+            "urls_checked": urls_checked,
+            "text_length": len(data.text) if data.text else 0,
+            "steam_info": shared["steam_info"] if check_type == "game" else None,
+            "near_duplicate_similarity": text_match.similarity if text_match else None,
+            "coalesced": joined,
+            "hedged": shared["hedged"],
+            "preclassifier": {
+                "decision": preclassified.decision,
+                "probability": preclassified.probability,
+            } if preclassified else None
+        }
+    }
+    return result
 
 @router.post("/check")
 @limiter.limit("10/minute")
@@ -92,134 +337,12 @@ async def check_content(
     #     )
     
     try:
-        # Визначення AI провайдера
-        ai_provider = get_ai_provider()
-        print(f"[{request_id}] Using AI provider: {ai_provider}")
-        
-        ai_core = AICoreMain()
-        steam_url = None
-        steam_info = {}
-        skipAll = False
-        
-        # Визначення типу перевірки та підготовка даних
-        check_type = None
-        check_data = {}
-        urls_checked = []
-        
-        if data.text:
-            ai_core.state.insert_metadata("text", data.text)
-            skipAll = True
-            check_type = "text"
-            check_data = {"text": data.text[:100] + "..."}
-        
-        # Обробка Steam гри
-        if skipAll is False and data.game_name:
-            print(f"[{request_id}] Processing game: {data.game_name}")
-            check_type = "game"
-            check_data = {"game_name": data.game_name}
-            try:
-                ai_core.steam_process(data.game_name)
-                steam_info = ai_core.state.metadata.get("steam_game_info", {})
-                steam_url = steam_info.get("website")
-            except Exception as e:
-                print(f"[{request_id}] Steam processing error: {str(e)}")
-                import traceback
-                traceback.print_exc()
-            
-            # Додаємо URL тільки якщо він не None та не порожній
-            if steam_url and isinstance(steam_url, str) and steam_url.strip():
-                data.urls.append(steam_url)
-                urls_checked.append(steam_url)
-        
-        # Обробка URLs тільки якщо список не порожній
-        if skipAll is False and data.urls and len(data.urls) > 0:
-            check_type = "url"
-            check_data = {"urls": data.urls}
-            urls_checked = data.urls
-            try:
-                print(f"[{request_id}] Processing URLs: {data.urls}")
-                ai_core.request_handle(data.urls)
-            except Exception as e:
-                print(f"[{request_id}] Error in request_handle: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                raise
-        else:
-            pass  # Пропускаємо обробку, якщо список URLs порожні
-        
-        # Формування промпту
-        prompt = f"""Ти експерт з виявлення російської пропаганди та контенту, пов'язаного з російською федерацією.
-
-Проаналізуй наступний контент та визнач, чи містить він:
-- Російську пропаганду
-- Підтримку російської федерації або її дій
-- Контент від російських розробників/компаній
-- Зв'язки з російськими організаціями
-
-"""
-        
-        if data.game_name:
-            prompt += f"Назва гри: {data.game_name}\n"
-        if data.urls and len(data.urls) > 0:
-            prompt += f"URL: {', '.join(data.urls)}\n"
-        if data.text:
-            prompt += f"Текст: {data.text}\n"
-        
-        prompt += """
-Дай відповідь у форматі JSON:
-{
-    "is_russian_content": true/false,
-    "text": "Детальне пояснення українською мовою"
-}
-"""
-        
-        # Вибір провайдера для аналізу
-        print(f"[{request_id}] Starting analysis with {ai_provider}...")
-        if ai_provider == "anthropic":
-            ai_response = analyze_with_anthropic(prompt)
-        else:  # gemini
-            ai_core.state.insert_metadata("analysis_prompt", prompt)
-            ai_response = analyze_with_gemini(ai_core, data)
-        
-        print(f"[{request_id}] Analysis completed")
-        
-        # Збільшуємо лічильник тільки після успішної перевірки
-        new_count = db_service.increment_user_checks(user_id)
-        
-        # Зберігаємо історію перевірки
-        if check_type:
-            db_service.save_check_history(
-                user_id=user_id,
-                check_type=check_type,
-                data=check_data,
-                result={
-                    "message": str(ai_response),
-                    "provider": ai_provider,
-                    "request_id": request_id,
-                    "timestamp": timestamp
-                }
-            )
-        ai_response = json.loads(ai_response)
-        
-        result = {
-            "ai_core": str(ai_core.state.metadata),
-            "request_id": request_id,
-            "timestamp": timestamp,
-            "check_type": check_type,   
-            "is_russian_content": ai_response.get("is_russian_content", False),
-            "text": ai_response.get("text", ""),
-            "message": str(ai_response),
-            "checks_used": new_count,
-            "checks_remaining": user_limit - new_count,
-            "provider": ai_provider,
-            "details": {
-                "game_name": data.game_name,
-                "urls_checked": urls_checked,
-                "text_length": len(data.text) if data.text else 0,
-                "steam_info": steam_info if check_type == "game" else None
-            }
-        }
-        
+        # Однакова перевірка вже виконується для іншого користувача — чекаємо її результат
+        shared, joined = await get_async_single_flight("check").do(
+            canonical_request_key(data), lambda: run_check(data, request_id))
+        if joined:
+            print(f"[{request_id}] Joined identical in-flight check")
+        result = finish_check(data, shared, request_id, timestamp, user_limit, joined)
         print(f"[{request_id}] Check completed successfully")
         return result
         
@@ -231,6 +354,76 @@ async def check_content(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+def sse(event: str, payload) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+@router.post("/check/stream")
+@limiter.limit("10/minute")
+async def check_content_stream(
+    request: Request,
+    data: CheckRequest,
+    user: str = Depends(AuthService.verify_api_key)
+):
+    """
+    Те саме, що /check, але як Server-Sent Events, щоб розширення показувало докази одразу:
+    start → steam → probe (кожна проба по мірі завершення) → report → token (частини відповіді AI) → verdict.
+    Помилка після початку стріму приходить подією error.
+    """
+    request_id = str(uuid.uuid4())
+    timestamp = datetime.utcnow().isoformat()
+    
+    if not data.user_id:
+        raise HTTPException(status_code=400, detail="user_id обов'язковий")
+    user_limit = db_service.get_user_limit(data.user_id)
+    get_ai_providers()  # без ключів — 500 ще до початку стріму
+    
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    closed = threading.Event()
+    
+    def emit(event: str, payload):
+        # Клієнт відключився: потоки проб, що ще дораховують, більше нічого не ставлять у чергу
+        if closed.is_set():
+            return
+        # Викликається і з потоків проб, тому через call_soon_threadsafe
+        loop.call_soon_threadsafe(queue.put_nowait, (event, payload))
+    
+    async def events():
+        yield sse("start", {"request_id": request_id, "timestamp": timestamp})
+        task = asyncio.create_task(run_check(data, request_id, emit))
+        getter = None
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    yield sse(*getter.result())
+                    continue
+                getter.cancel()
+                break
+            await asyncio.sleep(0)  # події, заплановані потоками проб перед завершенням
+            while not queue.empty():
+                yield sse(*queue.get_nowait())
+            shared = task.result()
+            yield sse("verdict", finish_check(data, shared, request_id, timestamp, user_limit))
+            print(f"[{request_id}] Stream completed successfully")
+        except HTTPException as e:
+            yield sse("error", {"status": e.status_code, "detail": e.detail})
+        except Exception as e:
+            print(f"[{request_id}] Error in check_content_stream: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            yield sse("error", {"status": 500, "detail": f"Internal server error: {str(e)}"})
+        finally:
+            # Клієнт закрив з'єднання — зупиняємо перевірку й більше не приймаємо подій
+            closed.set()
+            task.cancel()
+            if getter is not None:
+                getter.cancel()
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @router.get("/history/{user_id}")
 @limiter.limit("30/minute")
 async def get_history(
@@ -268,10 +461,11 @@ async def get_history(
 async def get_current_provider():
     """Отримати інформацію про поточного AI провайдера"""
     try:
-        provider = get_ai_provider()
+        providers = get_ai_providers()
         return {
-            "provider": provider,
-            "message": f"Використовується {provider.upper()} для аналізу",
+            "provider": providers[0],
+            "fallbacks": providers[1:],
+            "message": f"Використовується {providers[0].upper()} для аналізу",
             "timestamp": datetime.utcnow().isoformat()
         }
     except HTTPException as e:
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+import os
+import secrets
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ai_core.requests_methods.metrics import render_prometheus
+from ai_core.ai_machines.llm_cache import get_llm_cache
+from ai_core.single_flight import render_single_flight
+from ai_core.ai_machines.router import get_llm_router
+from ai_core.ai_machines.preclassifier import get_preclassifier
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """Метрики проб у текстовому форматі Prometheus (у межах цього процесу)"""
+    # Віддаємо лише скрейперу з Bearer токеном; без METRICS_TOKEN ендпоінт вимкнено
+    token = os.getenv("METRICS_TOKEN", "").strip()
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    auth = request.headers.get("Authorization", "")
+    if not secrets.compare_digest(auth, f"Bearer {token}"):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return PlainTextResponse(render_prometheus() + render_llm_cache() + render_single_flight() + get_llm_router().render() + get_preclassifier().render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def render_llm_cache() -> str:
+    lines = [
+        "# HELP rf_llm_cache_requests_total LLM response cache lookups by result",
+        "# TYPE rf_llm_cache_requests_total counter",
+    ]
+    for result, n in get_llm_cache().stats().items():
+        lines.append(f'rf_llm_cache_requests_total{{result="{result}"}} {n}')
+    return "\n".join(lines) + "\n"
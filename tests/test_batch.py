@@ -0,0 +1,71 @@
+import io
+import json
+
+import pytest
+
+from ai_core.ai_machines import batch
+
+
+class _FakeMachines:
+    def __init__(self):
+        self.batch_stats = {"items": 0, "requests": 0, "fallbacks": 0}
+        self.batches = []
+
+    def gemeni_generate_batch(self, items, use_cache=True, size=None):
+        self.batches.append(dict(items))
+        self.batch_stats["items"] += len(items)
+        self.batch_stats["requests"] += 1
+        return {item_id: {"is_russian_content": False, "text": item_id} for item_id in items}
+
+
+@pytest.fixture
+def machines(monkeypatch):
+    main = pytest.importorskip("ai_core.ai_machines.main")
+    fake = _FakeMachines()
+    monkeypatch.setattr(main, "AIMachinesMain", lambda: fake)
+    return fake
+
+
+def test_duplicate_ids_are_skipped_not_overwritten(machines):
+    lines = [json.dumps({"input_url": "https://a.ru", "domain": "a.ru"}),
+             json.dumps({"input_url": "https://www.a.ru", "domain": "a.ru"}),
+             json.dumps({"id": "x", "text": "one"}),
+             json.dumps({"id": "y", "text": "two"})]
+    out = io.StringIO()
+    stats = batch.run(batch.read_items(lines), out, size=3)
+
+    assert stats["duplicates"] == 1
+    assert [list(b) for b in machines.batches] == [["a.ru", "x", "y"]]
+    assert machines.batches[0]["a.ru"]["urls_metadata"][0]["input_url"] == "https://a.ru"
+    assert [json.loads(line)["id"] for line in out.getvalue().splitlines()] == ["a.ru", "x", "y"]
+
+
+def test_parse_batch_response_handles_fences_and_bad_items():
+    text = """```json
+    [
+      {"id": 1, "is_russian_content": true, "text": "a"},
+      {"id": "[2]", "is_russian_content": "false", "text": "b"},
+      {"id": 3, "is_russian_content": "maybe"},
+      {"id": 9, "is_russian_content": true},
+      "junk"
+    ]
+    ```"""
+    assert batch.parse_batch_response(text, 3) == {
+        1: {"is_russian_content": True, "text": "a"},
+        2: {"is_russian_content": False, "text": "b"},
+    }
+    assert batch.parse_batch_response("not json", 3) == {}
+    assert batch.parse_batch_response("", 3) == {}
+
+
+def test_parse_verdict():
+    assert batch.parse_verdict('Ось відповідь: {"is_russian_content": false, "text": "ok"}') == {
+        "is_russian_content": False, "text": "ok"}
+    assert batch.parse_verdict("Error: quota") is None
+
+
+def test_build_batch_prompt_numbers_items():
+    prompt = batch.build_batch_prompt("Оціни контент", ["first", "second"])
+    assert prompt.count("Оціни контент") == 1
+    assert "[1]\nfirst" in prompt and "[2]\nsecond" in prompt
+    assert list(batch.chunks([1, 2, 3, 4, 5], 2)) == [[1, 2], [3, 4], [5]]
@@ -0,0 +1,189 @@
+import json
+
+import pytest
+
+check = pytest.importorskip("backend.routes.check")
+from backend.checkers.check_request import CheckRequest
+
+
+class _FakeDB:
+    def __init__(self):
+        self.history = []
+
+    def increment_user_checks(self, user_id):
+        return 1
+
+    def get_user_limit(self, user_id):
+        return 10
+
+    def save_check_history(self, **entry):
+        self.history.append(entry)
+
+
+def _shared(**overrides):
+    shared = {
+        "ai_core": "{}",
+        "ai_response": json.dumps({"is_russian_content": True, "text": "x"}),
+        "provider": "gemini",
+        "hedged": False,
+        "check_type": "url",
+        "steam_url": None,
+        "steam_info": {},
+        "text_match": None,
+        "preclassified": None,
+    }
+    shared.update(overrides)
+    return shared
+
+
+def test_joined_request_records_its_own_urls(monkeypatch):
+    db = _FakeDB()
+    monkeypatch.setattr(check, "db_service", db)
+    owner = CheckRequest(urls=["https://example.ru/a"], user_id="u1")
+    joiner = CheckRequest(urls=["https://www.example.ru/b"], user_id="u2")
+    shared = _shared()
+
+    check.finish_check(owner, shared, "r1", "t", 10)
+    result = check.finish_check(joiner, shared, "r2", "t", 10, joined=True)
+
+    assert db.history[0]["data"] == {"urls": ["https://example.ru/a"]}
+    assert db.history[1]["data"] == {"urls": ["https://www.example.ru/b"]}
+    assert result["details"]["urls_checked"] == ["https://www.example.ru/b"]
+    assert result["details"]["coalesced"] is True
+
+
+def test_game_check_includes_steam_website():
+    data = CheckRequest(game_name="Hades", user_id="u")
+    assert check.request_check_data(data, "url", "https://supergiant.example") == (
+        {"urls": ["https://supergiant.example"]}, ["https://supergiant.example"])
+    assert check.request_check_data(data, "game", None) == ({"game_name": "Hades"}, [])
+
+
+def test_text_check_records_own_excerpt():
+    data = CheckRequest(text="Привіт  світ", user_id="u")
+    assert check.request_check_data(data, "text", None) == ({"text": "Привіт  світ..."}, [])
+
+
+def test_text_check_after_url_check_is_not_decided_by_old_reports(monkeypatch):
+    import asyncio
+
+    from ai_core.ai_machines.router import RoutedResponse
+    from ai_core.main import AICoreMain
+    from ai_core.requests_methods.report import DomainReport
+
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(check, "get_ai_providers", lambda: ["gemini"])
+    prompts = []
+
+    async def analyze(ai_core, data, prompt, providers):
+        prompts.append(prompt)
+        return RoutedResponse(json.dumps({"is_russian_content": False, "text": "ok"}), "gemini")
+
+    async def request_handle(self, urls, deadline=None, on_probe=None):
+        report = DomainReport(input_url=urls[0], domain="ya.ru", registrar="RU-CENTER-RU", country="Russia",
+                              asn="AS13238", org="Yandex", name_servers=["ns1.yandex.ru"])
+        self.state.insert_metadata("urls", urls)
+        self.state.insert_metadata("urls_metadata", [report])
+
+    monkeypatch.setattr(check, "analyze", analyze)
+    monkeypatch.setattr(AICoreMain, "arequest_handle", request_handle)
+
+    url_check = asyncio.run(check.run_check(CheckRequest(urls=["https://ya.ru"], user_id="u"), "r1"))
+    text_check = asyncio.run(check.run_check(
+        CheckRequest(text="Унікальний текст для перевірки після URL", user_id="u"), "r2"))
+
+    assert url_check["provider"] == "local"
+    assert text_check["provider"] == "gemini"
+    assert text_check["preclassified"].decision == "uncertain"
+    assert len(prompts) == 1 and "ya.ru" not in prompts[0]
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+async def _stream(data, limit=None) -> list[str]:
+    response = await check.check_content_stream.__wrapped__(request=None, data=data, user="u")
+    chunks = []
+    body = response.body_iterator
+    try:
+        async for chunk in body:
+            chunks.append(chunk)
+            if limit is not None and len(chunks) >= limit:
+                break
+    finally:
+        await body.aclose()
+    return chunks
+
+
+def test_stream_events_arrive_in_order_and_end_with_verdict(monkeypatch):
+    import asyncio
+    import threading
+
+    from ai_core.ai_machines.router import RoutedResponse
+    from ai_core.main import AICoreMain
+    from ai_core.requests_methods.report import DomainReport, FieldUpdate
+
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(check, "db_service", _FakeDB())
+    monkeypatch.setattr(check, "get_ai_providers", lambda: ["gemini"])
+
+    async def request_handle(self, urls, deadline=None, on_probe=None):
+        report = DomainReport(input_url=urls[0], domain="example.ru")
+        # Проби звітують зі своїх потоків
+        for probe in ("whois_lookup", "resolve_ip"):
+            thread = threading.Thread(target=on_probe, args=(report, probe, FieldUpdate("ip", "203.0.113.7")))
+            thread.start()
+            thread.join()
+        self.state.insert_metadata("urls", urls)
+        self.state.insert_metadata("urls_metadata", [report])
+
+    async def analyze_stream(ai_core, data, prompt, providers, on_token):
+        for chunk in ('{"is_russian_content": true, ', '"text": "x"}'):
+            await on_token(chunk)
+        return RoutedResponse('{"is_russian_content": true, "text": "x"}', "gemini")
+
+    monkeypatch.setattr(AICoreMain, "arequest_handle", request_handle)
+    monkeypatch.setattr(check, "analyze_stream", analyze_stream)
+
+    events = _events("".join(asyncio.run(_stream(
+        CheckRequest(urls=["https://example.ru"], user_id="u", bypass_cache=True)))))
+
+    assert [name for name, _ in events] == ["start", "probe", "probe", "report", "token", "token", "verdict"]
+    assert [payload["probe"] for name, payload in events if name == "probe"] == ["whois_lookup", "resolve_ip"]
+    verdict = events[-1][1]
+    assert verdict["is_russian_content"] is True
+    assert verdict["provider"] == "gemini"
+    assert verdict["details"]["urls_checked"] == ["https://example.ru"]
+
+
+def test_stream_disconnect_cancels_check_and_stops_emitter(monkeypatch):
+    import asyncio
+
+    monkeypatch.setattr(check, "db_service", _FakeDB())
+    monkeypatch.setattr(check, "get_ai_providers", lambda: ["gemini"])
+    state = {}
+
+    async def run_check(data, request_id, emit=None):
+        state["emit"] = emit
+        emit("steam", {})
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    monkeypatch.setattr(check, "run_check", run_check)
+
+    chunks = asyncio.run(_stream(CheckRequest(text="текст", user_id="u"), limit=2))
+
+    assert [name for name, _ in _events("".join(chunks))] == ["start", "steam"]
+    assert state.get("cancelled") is True
+    # Потік проби, що дораховує після відключення, не пише в чергу (і в уже закритий event loop)
+    state["emit"]("probe", {})
@@ -0,0 +1,36 @@
+import pytest
+
+from ai_core.requests_methods.domains.normalizer import DomainNormalizer, get_domain_normalizer
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://www.bbc.co.uk/news", "bbc.co.uk"),
+    ("HTTPS://Sub.Example.COM:8080/path", "example.com"),
+    ("user:pass@shop.example.com.", "example.com"),
+    ("http://пример.рф/x", "пример.рф"),
+    ("https://xn--e1afmkfd.xn--p1ai", "пример.рф"),
+    ("192.168.1.1", "192.168.1.1"),
+    ("localhost", "localhost"),
+])
+def test_registrable_domain(url, expected):
+    assert get_domain_normalizer().registrable_domain(url) == expected
+
+
+def test_private_suffixes_are_optional():
+    assert get_domain_normalizer().registrable_domain("user.github.io") == "github.io"
+    assert DomainNormalizer(include_private=True).registrable_domain("a.user.github.io") == "user.github.io"
+
+
+def test_wildcard_and_exception_rules(tmp_path):
+    psl = tmp_path / "psl.dat"
+    psl.write_text("// VERSION: test\nck\n*.ck\n!www.ck\n", encoding="utf-8")
+    normalizer = DomainNormalizer(str(psl))
+    assert normalizer.version == "test"
+    assert normalizer.registrable_domain("a.b.c.ck") == "b.c.ck"
+    assert normalizer.registrable_domain("www.ck") == "www.ck"
+    assert normalizer.public_suffix("a.b.c.ck") == "c.ck"
+
+
+def test_unparseable_input():
+    assert get_domain_normalizer().registrable_domain("http://[bad") is None
+    assert get_domain_normalizer().public_suffix("10.0.0.1") is None
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from ai_core.requests_methods.http_client import AsyncHttpClient, HttpClient
+
+
+def _serve(statuses: list[int]):
+    """Локальний сервер, що віддає статуси по черзі (останній — далі для всіх запитів)"""
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            hits.append(self.path)
+            status = statuses[min(len(hits), len(statuses)) - 1]
+            self.send_response(status)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, hits
+
+
+def test_sync_client_retries_server_errors():
+    server, hits = _serve([503, 502, 200])
+    client = HttpClient(backoff_factor=0)
+    try:
+        response = client.get(f"http://127.0.0.1:{server.server_port}/x")
+    finally:
+        client.close()
+        server.shutdown()
+    assert response.status_code == 200
+    assert len(hits) == 3
+
+
+def test_sync_client_returns_last_error_after_retries():
+    server, hits = _serve([500])
+    client = HttpClient(retries=1, backoff_factor=0)
+    try:
+        response = client.get(f"http://127.0.0.1:{server.server_port}/x")
+    finally:
+        client.close()
+        server.shutdown()
+    assert response.status_code == 500  # raise_on_status=False: відповідь, а не виняток
+    assert len(hits) == 2
+
+
+def _async_client(handler, **kwargs) -> AsyncHttpClient:
+    client = AsyncHttpClient(backoff_factor=0, **kwargs)
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_async_client_retries_only_idempotent_methods():
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        return httpx.Response(503 if len(calls) < 2 else 200)
+
+    async def main():
+        client = _async_client(handler)
+        try:
+            get = await client.get("https://example.com/")
+            calls.clear()
+            post = await client.request("POST", "https://example.com/")
+        finally:
+            await client.aclose()
+        return get, post
+
+    get, post = asyncio.run(main())
+    assert get.status_code == 200
+    assert post.status_code == 503 and calls == ["POST"]
+
+
+def test_async_client_limits_connections_per_host():
+    active = peak = 0
+
+    async def handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return httpx.Response(200)
+
+    async def main():
+        client = _async_client(handler, max_connections_per_host=2)
+        try:
+            await asyncio.gather(*(client.get("https://example.com/") for _ in range(6)),
+                                 client.get("https://other.example/"))
+        finally:
+            await client.aclose()
+
+    asyncio.run(main())
+    assert peak == 3  # 2 на example.com + 1 на other.example
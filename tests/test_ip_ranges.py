@@ -0,0 +1,44 @@
+import gzip
+
+from ai_core.requests_methods.geo.ip_ranges import IpRangeIndex, compile_database
+
+DUMP = "\n".join([
+    "range_start\trange_end\tAS_number\tcountry_code\tAS_description",
+    "5.8.0.0\t5.8.255.255\t12345\tRU\tExample RU",
+    "5.9.0.0\t5.9.0.255\t0\tNone\tNot routed",
+    "5.9.1.0\t5.9.1.255\t24940\tDE\tHetzner",
+    "2a00:1450::\t2a00:1450:ffff:ffff:ffff:ffff:ffff:ffff\t15169\tUS\tGoogle",
+]).encode()
+
+
+def _index(tmp_path, data=DUMP) -> IpRangeIndex:
+    path = str(tmp_path / "ip_ranges.bin")
+    compile_database(data, path)
+    return IpRangeIndex(path)
+
+
+def test_ipv4_block_boundaries(tmp_path):
+    index = _index(tmp_path)
+    assert len(index) == 3  # AS 0 («Not routed») не індексується
+    assert index.lookup("5.8.0.0")["org"] == "Example RU"
+    assert index.lookup("5.8.255.255")["country_code"] == "RU"
+    assert index.lookup("5.7.255.255") is None
+    assert index.lookup("5.9.0.0") is None
+    assert index.lookup("5.9.1.0")["asn"] == "AS24940"
+    assert index.lookup("5.9.1.255")["org"] == "Hetzner"
+    assert index.lookup("5.9.2.0") is None
+
+
+def test_ipv6_block_boundaries_and_gzip(tmp_path):
+    index = _index(tmp_path, gzip.compress(DUMP))
+    assert index.lookup("2a00:1450::")["org"] == "Google"
+    assert index.lookup("2a00:1450:ffff:ffff:ffff:ffff:ffff:ffff")["country_code"] == "US"
+    assert index.lookup("2a00:144f:ffff:ffff:ffff:ffff:ffff:ffff") is None
+    assert index.lookup("2a00:1451::") is None
+    # IPv4 ключі (::ffff:a.b.c.d) не перетинаються з IPv6 діапазонами
+    assert index.lookup("255.255.255.255") is None
+
+
+def test_missing_database_and_bad_input(tmp_path):
+    assert IpRangeIndex(str(tmp_path / "absent.bin")).lookup("5.8.0.1") is None
+    assert _index(tmp_path).lookup("not an ip") is None
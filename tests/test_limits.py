@@ -0,0 +1,43 @@
+import threading
+import time
+
+from ai_core.requests_methods.limits import UpstreamLimits
+
+
+def test_idle_semaphores_are_removed():
+    limits = UpstreamLimits()
+    for i in range(100):
+        with limits.slot("host", f"domain{i}.example"):
+            pass
+    assert limits._semaphores == {}
+
+
+def test_slot_limits_concurrency_per_key():
+    limits = UpstreamLimits({"host": 2})
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal active, peak
+        with limits.slot("host", "example.com"):
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak == 2
+    assert limits._semaphores == {}
+
+
+def test_unlimited_upstream_has_no_semaphore():
+    limits = UpstreamLimits()
+    with limits.slot("unknown", "x"):
+        assert limits._semaphores == {}
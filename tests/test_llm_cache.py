@@ -0,0 +1,30 @@
+import time
+
+import diskcache as dc
+
+from ai_core.ai_machines.llm_cache import LLMCache
+
+
+def test_key_ignores_formatting_but_not_content():
+    cache = LLMCache(cache=None)
+    key = cache.make_key("gemini", "Система", "Перевір  сайт\nexample.ru", temperature=0)
+    assert key == cache.make_key("gemini", "Система", " Перевір сайт example.ru ", temperature=0)
+    assert key == cache.make_key("gemini", "Система", "Перевір сайт example.ru", temperature=0)
+    assert key != cache.make_key("gemini", "Система", "Перевір сайт example.ua", temperature=0)
+    assert key != cache.make_key("gpt-4o", "Система", "Перевір сайт example.ru", temperature=0)
+    assert key != cache.make_key("gemini", "Інша система", "Перевір сайт example.ru", temperature=0)
+    assert key != cache.make_key("gemini", "Система", "Перевір сайт example.ru", temperature=1)
+
+
+def test_hit_miss_and_ttl(tmp_path):
+    with dc.Cache(str(tmp_path)) as store:
+        cache = LLMCache(store, ttl=0.2)
+        key = cache.make_key("gemini", None, "prompt")
+        assert cache.get(key) is None
+        cache.set(key, '{"is_russian_content": false}')
+        assert cache.get(key) == '{"is_russian_content": false}'
+        assert cache.get(key, bypass=True) is None
+        assert cache.get(cache.make_key("gemini", None, "other prompt")) is None
+        time.sleep(0.3)
+        assert cache.get(key) is None
+        assert cache.stats() == {"hit": 1, "miss": 3, "bypass": 1, "store": 1}
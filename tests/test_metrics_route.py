@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+metrics = pytest.importorskip("backend.routes.metrics")
+from fastapi import HTTPException
+from starlette.requests import Request
+
+
+def _request(authorization: str | None = None) -> Request:
+    headers = [(b"authorization", authorization.encode())] if authorization else []
+    return Request({"type": "http", "method": "GET", "path": "/metrics", "headers": headers})
+
+
+def test_metrics_disabled_without_token(monkeypatch):
+    monkeypatch.delenv("METRICS_TOKEN", raising=False)
+    with pytest.raises(HTTPException) as info:
+        asyncio.run(metrics.metrics(_request()))
+    assert info.value.status_code == 404
+
+
+def test_metrics_require_bearer_token(monkeypatch):
+    monkeypatch.setenv("METRICS_TOKEN", "secret")
+    for auth in (None, "Bearer wrong", "secret"):
+        with pytest.raises(HTTPException) as info:
+            asyncio.run(metrics.metrics(_request(auth)))
+        assert info.value.status_code == 401
+    response = asyncio.run(metrics.metrics(_request("Bearer secret")))
+    assert response.status_code == 200
+    assert b"rf_llm_cache_requests_total" in response.body
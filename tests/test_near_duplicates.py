@@ -0,0 +1,40 @@
+from ai_core.text_formatter.near_duplicates import NearDuplicateIndex, normalize_text
+
+WORDS = ("гра розроблена студією з москви видавець зареєстрований у росії сервери розміщені "
+         "на хостингу selectel оплата через юмані підтримка відповідає лише російською мовою "
+         "реліз запланований на осінь а бета тест доступний усім охочим після реєстрації на сайті").split()
+TEXT = " ".join(f"{w}{i % 7}" if i >= len(WORDS) else w for i, w in enumerate(WORDS * 3))
+
+
+def _index(tmp_path, **kwargs) -> NearDuplicateIndex:
+    return NearDuplicateIndex(directory=str(tmp_path / "text_index"), **kwargs)
+
+
+def test_normalize_drops_links_emoji_and_punctuation():
+    assert normalize_text("Гра 🔥 ВІД студії!!! https://t.me/x?utm=1 www.example.ru") == "гра від студії"
+
+
+def test_modified_text_finds_stored_verdict(tmp_path):
+    index = _index(tmp_path)
+    index.add(TEXT, '{"is_russian_content": true}')
+    modified = "🔥🔥 " + TEXT.upper().replace("осінь", "зиму", 1) + " https://example.ru/?utm_source=tg"
+    match = index.lookup(modified)
+    assert match is not None
+    assert match.verdict == '{"is_russian_content": true}'
+    assert match.similarity >= index.threshold
+    assert index.lookup("зовсім інший текст про погоду в києві та рецепт борщу з пампушками") is None
+    assert index.stats() == {"hit": 1, "miss": 1, "stored": 1, "entries": 1}
+
+
+def test_index_is_restored_from_disk(tmp_path):
+    _index(tmp_path).add(TEXT, "verdict")
+    index = _index(tmp_path)
+    assert index.lookup(TEXT + " !!!").verdict == "verdict"
+
+
+def test_lru_limit_evicts_oldest(tmp_path):
+    index = _index(tmp_path, max_entries=1)
+    index.add(TEXT, "old")
+    index.add("інший текст що не має нічого спільного з першим зовсім", "new")
+    assert index.lookup(TEXT) is None
+    assert index.stats()["entries"] == 1
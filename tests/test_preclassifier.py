@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from ai_core.ai_machines.preclassifier import PreClassifier, TextModel
+from ai_core.requests_methods.report import DomainReport
+
+
+def _russian_report():
+    return DomainReport(input_url="https://ya.ru", domain="ya.ru", registrar="RU-CENTER-RU", country="Russia",
+                        asn="AS13238", org="Yandex", name_servers=["ns1.yandex.ru"], whois_server="whois.tcinet.ru")
+
+
+def _western_report(**overrides):
+    fields = dict(input_url="https://example.com", domain="example.com", registrar="MarkMonitor",
+                  country="United States", org="Cloudflare, Inc.", hosting_provider="Cloudflare",
+                  name_servers=["a.ns.cloudflare.com"])
+    fields.update(overrides)
+    return DomainReport(**fields)
+
+
+@pytest.fixture
+def classifier():
+    return PreClassifier(upper=0.9, lower=0.1, min_coverage=0.75)
+
+
+def test_clear_russian_report_skips_llm(classifier):
+    result = classifier.classify("url", reports=[_russian_report()])
+    assert result.decision == "russian" and result.probability >= 0.9
+    verdict = json.loads(result.verdict())
+    assert verdict["is_russian_content"] is True
+    assert "RU-CENTER-RU" in verdict["text"]
+
+
+def test_clean_report_on_western_hosting_is_not_russian(classifier):
+    result = classifier.classify("url", reports=[_western_report()])
+    assert result.decision == "not_russian"
+    assert json.loads(result.verdict())["is_russian_content"] is False
+
+
+def test_incomplete_report_is_left_to_llm(classifier):
+    partial = _western_report(registrar=None, country=None, name_servers=[])
+    assert classifier.classify("url", reports=[partial]).decision == "uncertain"
+
+
+def test_any_russian_url_decides_the_check(classifier):
+    assert classifier.classify("url", reports=[_western_report(), _russian_report()]).decision == "russian"
+
+
+def test_game_website_has_only_positive_fast_path(classifier):
+    assert classifier.classify("url", reports=[_western_report()], game=True).decision == "uncertain"
+    assert classifier.classify("url", reports=[_russian_report()], game=True).decision == "russian"
+
+
+def test_text_check_ignores_reports_from_other_checks(classifier):
+    assert classifier.classify("url", reports=[_russian_report()]).decision == "russian"
+    result = classifier.classify("text", text="Звичайний текст без жодних ознак", reports=[_russian_report()])
+    assert result.decision == "uncertain" and result.probability is None
+    assert classifier.stats() == {"russian": 1, "not_russian": 0, "uncertain": 1}
+
+
+def test_disabled_classifier_is_always_uncertain():
+    classifier = PreClassifier(enabled=False)
+    assert classifier.classify("url", reports=[_russian_report()]).decision == "uncertain"
+
+
+def test_thresholds_are_validated():
+    with pytest.raises(ValueError):
+        PreClassifier(upper=0.2, lower=0.5)
+
+
+def test_text_model(tmp_path):
+    samples = [("Слава росії, путін наш президент, бєлгород", True)] * 5 + \
+              [("Слава Україні, героям слава, Київ", False)] * 5
+    path = tmp_path / "model.json"
+    path.write_text(json.dumps(TextModel.train(samples, min_count=1)), encoding="utf-8")
+    classifier = PreClassifier(text_model=str(path))
+    assert classifier.classify("text", text="путін наш президент, слава росії і бєлгород").decision == "russian"
+    assert classifier.classify("text", text="Слава Україні, героям слава, місто Київ ок").decision == "not_russian"
+    assert classifier.classify("text", text="коротко").probability is None
+
+
+def test_render_reports_skip_ratio(classifier):
+    classifier.classify("url", reports=[_russian_report()])
+    classifier.classify("game")
+    text = classifier.render()
+    assert 'rf_preclassifier_total{decision="russian"} 1' in text
+    assert "rf_preclassifier_skip_ratio 0.5000" in text
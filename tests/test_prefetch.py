@@ -0,0 +1,70 @@
+import sys
+import time
+import types
+
+from ai_core.requests_methods.prefetch import Prefetcher
+from ai_core.requests_methods.probe_cache import ProbeCache
+from ai_core.requests_methods.rdap_cache import RdapNetworkCache
+from ai_core.requests_methods.urls_checker import UrlsChecker
+
+IP = "203.0.113.7"
+
+
+class _Hot:
+    busy = False
+
+    def top(self, n, min_score=0.0):
+        return [("example.com", 10.0)]
+
+
+class _Store:
+    def get(self, domain):
+        return None  # домен завжди «пора оновити»
+
+
+class _Http:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        return types.SimpleNamespace(json=lambda: {"country_name": "Germany", "org": f"Org {self.calls}"})
+
+
+class _NoLocalIndex:
+    def lookup(self, ip):
+        return None
+
+
+def test_prefetch_refetches_geo_and_rdap_after_ttl(tmp_path, monkeypatch):
+    rdap_calls = []
+
+    class IPWhois:
+        def __init__(self, ip):
+            self.ip = ip
+
+        def lookup_rdap(self):
+            rdap_calls.append(self.ip)
+            return {"asn_country_code": "DE", "network": {"cidr": "203.0.113.0/24"}}
+
+    monkeypatch.setitem(sys.modules, "ipwhois", types.SimpleNamespace(IPWhois=IPWhois))
+    http = _Http()
+    cache = ProbeCache(directory=str(tmp_path / "probe_cache"), ttls={"geo": 0.2, "rdap": 0.2})
+    checker = UrlsChecker([], cache=cache, http=http, ip_index=_NoLocalIndex(), rdap_cache=RdapNetworkCache(ttl=0.2))
+    geo_results = []
+    # Замість повного графа проб — лише ті, що проходять через пам'ять партії
+    monkeypatch.setattr(checker, "check", lambda domain, refresh_ahead=0: geo_results.append(
+        (checker._lookup_geo(IP, 5)["org"], checker._lookup_rdap(IP)["asn_country_code"])))
+    prefetcher = Prefetcher(_Hot(), per_minute=60_000, min_score=0, store=_Store(), checker=checker)
+
+    try:
+        assert prefetcher.run_once() == 1
+        assert prefetcher.run_once() == 1  # дані ще свіжі — з кешу, без нових запитів
+        assert (http.calls, len(rdap_calls)) == (1, 1)
+        time.sleep(0.3)
+        assert prefetcher.run_once() == 1
+    finally:
+        cache.cache.close()
+
+    assert (http.calls, len(rdap_calls)) == (2, 2)
+    assert geo_results[-1] == ("Org 2", "DE")
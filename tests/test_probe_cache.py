@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from ai_core.requests_methods.metrics import note_fetched_at, track_fetched_at
+from ai_core.requests_methods.probe_cache import CachedProbeError, ProbeCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ProbeCache(directory=str(tmp_path / "probe_cache"), ttls={"tls": 3600})
+    yield cache
+    cache.cache.close()
+
+
+def test_hit_reports_original_fetch_time(cache):
+    before = time.time()
+    value, fetched_at = cache.get_or_fetch_timed("tls", "example.com", lambda: {"issuer": "x"})
+    assert value == {"issuer": "x"} and fetched_at >= before
+    time.sleep(0.05)
+    value, hit_fetched_at = cache.get_or_fetch_timed("tls", "example.com", lambda: pytest.fail("fetched twice"))
+    assert value == {"issuer": "x"}
+    assert hit_fetched_at == pytest.approx(fetched_at, abs=0.02)
+    assert cache.stats()["tls"] == {"hit": 1, "negative_hit": 0, "miss": 1}
+
+
+def test_errors_are_negatively_cached(cache):
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        cache.get_or_fetch("tls", "down.example", fail)
+    with pytest.raises(CachedProbeError, match="boom"):
+        cache.get_or_fetch("tls", "down.example", fail)
+
+
+def test_probe_is_as_old_as_its_oldest_cached_data():
+    sink = {}
+    old = time.time() - 5000
+
+    def probe():
+        note_fetched_at(old + 100)
+        note_fetched_at(old)
+        note_fetched_at(None)
+        return "ok"
+
+    started = time.time()
+    assert track_fetched_at("whois_lookup", probe, sink)() == "ok"
+    assert track_fetched_at("resolve_ip", lambda: None, sink)() is None
+    assert sink["whois_lookup"] == old
+    assert sink["resolve_ip"] >= started
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+from ai_core.requests_methods.probe_graph import ProbeGraph
+
+
+def test_probe_starts_after_its_dependencies():
+    order = []
+    lock = threading.Lock()
+
+    def probe(name, delay=0.0):
+        def run():
+            time.sleep(delay)
+            with lock:
+                order.append(name)
+            return name
+        return run
+
+    graph = ProbeGraph(max_workers=4)
+    graph.add("whois", probe("whois", 0.02))
+    graph.add("ip", probe("ip"))
+    graph.add("geo", probe("geo"), deps=["ip"])
+    graph.add("traces", probe("traces"), deps=["whois", "geo"], local=True)
+    results = graph.run()
+
+    assert results == {"whois": "whois", "ip": "ip", "geo": "geo", "traces": "traces"}
+    assert order.index("geo") > order.index("ip")
+    assert order[-1] == "traces"
+
+
+def test_failed_probe_still_unblocks_dependents():
+    def fail():
+        raise RuntimeError("boom")
+
+    seen = []
+    graph = ProbeGraph().add("whois", fail).add("registrar", lambda: "ok", deps=["whois"], local=True)
+    results = graph.run(on_result=lambda name, value: seen.append((name, value)))
+
+    assert results == {"whois": None, "registrar": "ok"}
+    assert str(graph.failures["whois"]) == "boom"
+    assert seen == [("whois", None), ("registrar", "ok")]
+
+
+def test_deadline_drops_slow_probes_but_runs_local_ones():
+    release = threading.Event()
+    graph = ProbeGraph()
+    graph.add("fast", lambda: "fast")
+    graph.add("slow", lambda: release.wait(5) and "slow")
+    graph.add("after_slow", lambda: "network", deps=["slow"])
+    graph.add("traces", lambda: "local", deps=["fast", "slow", "after_slow"], local=True)
+
+    started = time.monotonic()
+    results = graph.run(deadline_at=started + 0.1)
+    release.set()
+
+    assert time.monotonic() - started < 1
+    assert results["fast"] == "fast" and results["traces"] == "local"
+    assert results["slow"] is None and results["after_slow"] is None
+    assert sorted(graph.timed_out) == ["after_slow", "slow"]
+
+
+def test_skipped_probes_unblock_dependents_without_running():
+    graph = ProbeGraph()
+    graph.add("whois", lambda: pytest.fail("skipped probe ran"))
+    graph.add("registrar", lambda: "ok", deps=["whois"], local=True)
+    graph.skip(["whois"])
+    assert graph.run() == {"whois": None, "registrar": "ok"}
+    assert graph.downstream(["whois"]) == {"whois", "registrar"}
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="unknown"):
+        ProbeGraph().add("a", lambda: 1, deps=["missing"]).run()
+    with pytest.raises(ValueError, match="Circular"):
+        ProbeGraph().add("a", lambda: 1, deps=["b"]).add("b", lambda: 2, deps=["a"]).run()
+    with pytest.raises(ValueError, match="already registered"):
+        ProbeGraph().add("a", lambda: 1).add("a", lambda: 2)
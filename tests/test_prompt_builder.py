@@ -0,0 +1,52 @@
+from ai_core.ai_machines.prompt_builder import PromptBuilder, estimate_tokens
+from ai_core.requests_methods.report import DomainReport
+
+
+def _report(idx: int) -> DomainReport:
+    return DomainReport(
+        input_url=f"https://site{idx}.ru", domain=f"site{idx}.ru", registrar="RU-CENTER-RU",
+        country="Russia", org="Selectel", asn="AS49505", russian_traces=["реєстратор RU-CENTER"],
+        http_headers={f"X-Header-{n}": "v" * 40 for n in range(20)},
+        dns_records={"txt": ["v=spf1 include:_spf.yandex.net ~all"] * 10},
+    )
+
+
+def _cost(text: str) -> int:
+    return sum(estimate_tokens(line) + 1 for line in text.split("\n"))
+
+
+def test_evidence_fits_budget_and_keeps_important_fields():
+    builder = PromptBuilder(budget=120)
+    rendered = builder.render({"urls_metadata": [_report(1), _report(2)]})
+    lines = rendered.split("\n")
+    assert lines[-1].startswith("(+") and lines[-1].endswith("less relevant fields omitted)")
+    assert _cost("\n".join(lines[:-1])) <= 120
+    for idx in (1, 2):
+        assert f"URL {idx}: https://site{idx}.ru (domain: site{idx}.ru)" in lines
+    assert rendered.count("Russian traces: реєстратор RU-CENTER") == 2
+    assert "HTTP headers" not in rendered and "DNS records" not in rendered  # найменш важливе відкидається першим
+    assert rendered.count("Registrar: RU-CENTER-RU") == 2
+    # Рядки кожного звіту лишаються у вихідному порядку
+    assert lines.index("URL 1: https://site1.ru (domain: site1.ru)") < lines.index("URL 2: https://site2.ru (domain: site2.ru)")
+
+
+def test_long_text_is_truncated_to_budget():
+    builder = PromptBuilder(budget=100)
+    rendered = builder.render({"text": "Дуже довгий текст поста " * 200})
+    assert rendered.startswith("Text: Дуже довгий текст")
+    assert rendered.endswith("…")
+    assert _cost(rendered) <= 100
+
+
+def test_long_field_values_are_clipped():
+    builder = PromptBuilder(budget=10_000, max_field_chars=50)
+    rendered = builder.render({"urls_metadata": [_report(1)]})
+    assert all(len(line) <= 50 for line in rendered.split("\n"))
+    assert "omitted" not in rendered
+
+
+def test_instruction_is_a_stable_prefix():
+    builder = PromptBuilder(budget=50)
+    first = builder.build("Інструкція", {"text": "a"})
+    second = builder.build("Інструкція", {"urls_metadata": [_report(3)]})
+    assert first.startswith("Інструкція\n\n") and second.startswith("Інструкція\n\n")
@@ -0,0 +1,51 @@
+import time
+
+from ai_core.requests_methods.rdap_cache import RdapNetworkCache
+
+
+def test_longest_prefix_wins():
+    cache = RdapNetworkCache()
+    assert cache.add("104.16.0.0/12", {"network_name": "CLOUDFLARE"})
+    assert cache.add("104.16.1.0/24", {"network_name": "CUSTOMER"})
+    assert cache.lookup("104.16.1.7") == {"network_name": "CUSTOMER"}
+    assert cache.lookup("104.17.0.1") == {"network_name": "CLOUDFLARE"}
+    assert cache.lookup("8.8.8.8") is None
+    assert cache.lookup("not an ip") is None
+
+
+def test_multiple_blocks_and_ipv6():
+    cache = RdapNetworkCache()
+    assert cache.add("5.255.252.0/22, 5.255.255.0/24", {"asn": "AS13238"})
+    assert cache.add("2a02:6b8::/32", {"asn": "AS13238"})
+    assert cache.lookup("5.255.253.1") == {"asn": "AS13238"}
+    assert cache.lookup("2a02:6b8::feed") == {"asn": "AS13238"}
+    assert len(cache) == 2
+
+
+def test_too_wide_or_invalid_blocks_are_not_indexed():
+    cache = RdapNetworkCache()
+    assert not cache.add("8.0.0.0/8", {})
+    assert not cache.add("garbage", {})
+    assert not cache.add(None, {})
+    assert len(cache) == 0
+
+
+def test_entries_expire_from_their_fetch_time():
+    cache = RdapNetworkCache(ttl=3600)
+    cache.add("10.1.0.0/16", {"n": "old"}, fetched_at=time.time() - 4000)
+    assert cache.lookup("10.1.2.3") is None
+    fetched_at = time.time() - 60
+    cache.add("10.2.0.0/16", {"n": "recent"}, fetched_at=fetched_at)
+    assert cache.lookup_timed("10.2.0.1") == ({"n": "recent"}, fetched_at)
+    assert cache.stats()["expired"] == 1
+
+
+def test_lru_eviction():
+    cache = RdapNetworkCache(max_networks=2)
+    cache.add("10.1.0.0/16", {"n": 1})
+    cache.add("10.2.0.0/16", {"n": 2})
+    cache.lookup("10.1.0.1")  # 10.1/16 стає найсвіжішим
+    cache.add("10.3.0.0/16", {"n": 3})
+    assert cache.lookup("10.2.0.1") is None
+    assert cache.lookup("10.1.0.1") == {"n": 1}
+    assert cache.stats()["evicted"] == 1
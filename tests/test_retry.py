@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from ai_core.ai_machines import retry
+from ai_core.ai_machines.retry import EmptyResponseError, RetryBudgetExceeded, is_retryable, retry_async
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _flaky(errors, result="ok"):
+    calls = []
+
+    async def call():
+        calls.append(len(calls))
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return call, calls
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Паузи між спробами записуються замість реального очікування; джитер — максимальний"""
+    recorded = []
+
+    async def fake_sleep(delay):
+        recorded.append(delay)
+
+    monkeypatch.setattr(retry.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: high)
+    return recorded
+
+
+def test_exponential_backoff_until_success(sleeps):
+    call, calls = _flaky([_StatusError(503), _StatusError(429), EmptyResponseError(), _StatusError(500)])
+    assert asyncio.run(retry_async(call, attempts=6, base_delay=1.0, max_delay=4.0, budget=None)) == "ok"
+    assert len(calls) == 5
+    assert sleeps == [1.0, 2.0, 4.0, 4.0]  # подвоєння, обмежене max_delay
+
+
+def test_non_retryable_error_is_raised_immediately(sleeps):
+    call, calls = _flaky([_StatusError(400)])
+    with pytest.raises(_StatusError):
+        asyncio.run(retry_async(call, budget=None))
+    assert len(calls) == 1 and sleeps == []
+
+
+def test_gives_up_after_attempts(sleeps):
+    call, calls = _flaky([_StatusError(503)] * 10)
+    with pytest.raises(RetryBudgetExceeded) as info:
+        asyncio.run(retry_async(call, attempts=3, budget=None))
+    assert info.value.attempts == 3 and len(calls) == 3
+    assert isinstance(info.value.last_error, _StatusError)
+
+
+def test_budget_limits_waiting():
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(RetryBudgetExceeded) as info:
+        asyncio.run(retry_async(slow, attempts=5, budget=0.1, base_delay=1.0))
+    assert info.value.elapsed < 0.5
+    assert isinstance(info.value.last_error, asyncio.TimeoutError)
+
+
+def test_is_retryable():
+    assert is_retryable(_StatusError(529))
+    assert not is_retryable(_StatusError(401))
+    assert is_retryable(Exception("503 UNAVAILABLE: model is overloaded"))
+    assert not is_retryable(ValueError("invalid prompt"))
@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+from ai_core.ai_machines.router import NoProviderAvailable, ProviderRouter, note_cache_hit
+
+
+class _Status(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _router(**kwargs):
+    options = dict(priority=["a", "b", "c"], hedge=False, hedge_min_delay=0.0, default_latency=10.0,
+                   min_samples=1, cooldown=30.0)
+    options.update(kwargs)
+    return ProviderRouter(**options)
+
+
+def test_fails_over_and_cools_down_throttled_provider():
+    router = _router()
+    tried = []
+
+    def call(name, error=None):
+        async def run(retry):
+            tried.append((name, retry["attempts"] if retry else None))
+            if error:
+                raise error
+            return name
+        return run
+
+    response = asyncio.run(router.generate({"a": call("a", _Status(503)), "b": call("b", ValueError("bad")),
+                                            "c": call("c")}))
+    assert (response.provider, response.failovers) == ("c", 2)
+    # Запасні провайдери є — кожен отримує одну спробу; останній — типову політику повторів
+    assert tried == [("a", 1), ("b", 1), ("c", None)]
+    assert not router.healthy("a")  # 503 → cooldown
+    assert router.stats["b"].counts["error"] == 1
+    assert router.rank(["a", "b", "c"])[0] == "c"
+
+
+def test_raises_last_error_when_all_fail():
+    async def fail(retry):
+        raise ValueError("down")
+
+    with pytest.raises(ValueError, match="down"):
+        asyncio.run(_router().generate({"a": fail, "b": fail}))
+    with pytest.raises(NoProviderAvailable):
+        asyncio.run(_router().generate({}))
+
+
+def test_hedges_slow_provider_and_cancels_loser():
+    router = _router(priority=["slow", "fast"], hedge=True, default_latency=0.05)
+    cancelled = asyncio.Event()
+
+    async def main():
+        async def slow(retry):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return "slow"
+
+        async def fast(retry):
+            return "fast"
+
+        response = await router.generate({"slow": slow, "fast": fast})
+        await asyncio.sleep(0)
+        return response
+
+    response = asyncio.run(main())
+    assert (response.provider, response.hedged) == ("fast", True)
+    assert cancelled.is_set()
+    assert router.stats["slow"].counts["cancelled"] == 1
+    assert router.hedged == 1
+
+
+def test_ranks_by_observed_latency_and_ignores_cache_hits():
+    router = _router(priority=["a", "b"])
+    router.record("a", 3.0)
+    router.record("b", 0.5)
+    assert router.rank(["a", "b"]) == ["b", "a"]
+
+    async def cached(retry):
+        note_cache_hit()
+        return "cached"
+
+    asyncio.run(router.generate({"a": cached}))
+    assert list(router.stats["a"].latencies) == [3.0]
+
+
+def test_stream_fails_over_only_before_first_token():
+    router = _router(priority=["a", "b"])
+    tokens = []
+
+    async def on_token(chunk):
+        tokens.append(chunk)
+
+    async def broken():
+        raise _Status(529)
+        yield  # pragma: no cover
+
+    async def working():
+        for chunk in ("Так", ", ні"):
+            yield chunk
+
+    response = asyncio.run(router.stream({"a": broken, "b": working}, on_token))
+    assert (response.text, response.provider, response.failovers) == ("Так, ні", "b", 1)
+    assert tokens == ["Так", ", ні"]
+
+    async def half():
+        yield "part"
+        raise ValueError("cut")
+
+    with pytest.raises(ValueError, match="cut"):
+        asyncio.run(_router(priority=["x", "y"]).stream({"x": half, "y": working}, on_token))
+
+
+def test_llm_coalescing_respects_retry_policy():
+    from types import SimpleNamespace
+
+    from ai_core.ai_machines.anthropic import AnthropicMachine
+
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0.02)
+        return SimpleNamespace(content=[SimpleNamespace(text="ok")])
+
+    machine = AnthropicMachine()
+    machine._async_client = SimpleNamespace(messages=SimpleNamespace(create=create))
+    single_try = {"attempts": 1, "budget": 5}
+    full = {"attempts": 5, "budget": 30}
+
+    async def main():
+        # Однакова політика — один запит; інша політика (спроба хеджування) — окремий
+        return await asyncio.gather(machine.agenerate_text("prompt", retry=full),
+                                    machine.agenerate_text("prompt", retry=full),
+                                    machine.agenerate_text("prompt", retry=single_try))
+
+    assert asyncio.run(main()) == ["ok"] * 3
+    assert len(calls) == 2
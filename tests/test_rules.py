@@ -0,0 +1,104 @@
+import json
+import os
+import pathlib
+
+import pytest
+
+from ai_core.requests_methods.report import DomainReport
+from ai_core.requests_methods.rules.engine import DEFAULT_RULES_PATH, RuleEngine, RuleSet
+
+RULES = {
+    "version": 7,
+    "no_traces_message": "none",
+    "hosting_providers": [{"match": "cloudflare", "name": "Cloudflare"}, {"match": "beget", "name": "Beget (RU)"}],
+    "maps": {"asns": {"AS13238": "Yandex"}},
+    "traces": [
+        {"id": "tld", "field": "domain", "op": "tld", "values": ["ru", "рф"], "message": "tld {value}", "weight": 3},
+        {"id": "registrar", "field": "registrar", "op": "contains", "values": ["reg.ru", "ru-center"],
+         "message": "registrar {registrar} ({match})"},
+        {"id": "country", "field": "country", "op": "equals", "values": ["Russia"], "message": "country"},
+        {"id": "asn", "field": "asn", "op": "in_map", "map": "asns", "message": "asn {match}"},
+        {"id": "mx", "field": "dns_records.mx", "op": "contains", "values": ["yandex"], "message": "mx {value}"},
+        {"id": "contacts", "field": ["registrant_country", "admin_country"], "op": "equals", "values": ["RU"],
+         "message": "contacts"},
+        {"id": "server", "field": "http_headers.server", "op": "contains", "values": ["nginx"],
+         "when": [{"field": "country", "op": "equals", "values": ["Russia"]}], "message": "server"},
+    ],
+}
+
+
+def test_evaluate_reports_all_matching_rules():
+    ruleset = RuleSet(RULES)
+    report = DomainReport(domain="example.ru", registrar="RU-CENTER-RU", country="russia", asn="as13238",
+                          dns_records={"mx": ["10 mx.yandex.net"]}, admin_country="RU",
+                          http_headers={"server": "nginx/1.25"})
+    assert ruleset.evaluate(report) == [
+        "tld example.ru", "registrar RU-CENTER-RU (ru-center)", "country", "asn Yandex",
+        "mx 10 mx.yandex.net", "contacts", "server",
+    ]
+    assert [rule_id for rule_id, _ in ruleset.matches(report)][:2] == ["tld", "registrar"]
+    assert ruleset.weights["tld"] == 3 and ruleset.weights["registrar"] == 1.0
+
+
+def test_when_condition_and_missing_fields():
+    ruleset = RuleSet(RULES)
+    report = DomainReport(domain="example.com", country="Germany", http_headers={"server": "nginx"})
+    assert ruleset.evaluate(report) == []
+    assert ruleset.evaluate({"domain": "пример.рф"}) == ["tld пример.рф"]
+
+
+def test_hosting_provider_lookup():
+    ruleset = RuleSet(RULES)
+    assert ruleset.hosting_provider("Cloudflare, Inc.") == "Cloudflare"
+    assert ruleset.hosting_provider("LLC Beget") == "Beget (RU)"
+    assert ruleset.hosting_provider("Some ISP") is None
+    assert ruleset.hosting_provider(None) is None
+
+
+def test_unknown_op_is_rejected():
+    with pytest.raises(ValueError, match="Unknown rule op"):
+        RuleSet({"traces": [{"id": "x", "field": "domain", "op": "regex", "values": ["x"]}]})
+
+
+def test_contains_rules_on_one_field_share_a_pattern_without_shadowing():
+    ruleset = RuleSet({"traces": [
+        {"id": "centre", "field": "registrar", "op": "contains", "values": ["ru-center"], "message": "c {match}"},
+        {"id": "ru", "field": "registrar", "op": "contains", "values": ["ru"], "message": "ru {match}"},
+        {"id": "reg", "field": "registrar", "op": "contains", "values": ["reg.ru", "center"], "message": "r {match}"},
+        {"id": "ns", "field": "name_servers", "op": "contains", "values": [".ru"], "message": "ns"},
+    ]})
+    assert len(ruleset._field_patterns) == 2
+    # "ru" і "center" лежать усередині збігу "ru-center", але все одно спрацьовують
+    assert ruleset.evaluate(DomainReport(registrar="RU-CENTER-RU")) == ["c ru-center", "ru ru", "r center"]
+    assert ruleset.evaluate(DomainReport(registrar="GoDaddy", name_servers=["ns1.example.com"])) == []
+
+def test_shipped_rules_compile():
+    with open(DEFAULT_RULES_PATH, "r", encoding="utf-8") as f:
+        ruleset = RuleSet(json.load(f))
+    assert ruleset.rules and all(rule.id for rule in ruleset.rules)
+    assert ruleset.evaluate(DomainReport(domain="ya.ru"))
+
+
+@pytest.mark.parametrize("country, matched", [
+    ("RU", True), ("Russia", True), ("Russian Federation", True),
+    ("Peru", False), ("Belarus", False), ("Prussia", False), ("PE", False),
+])
+def test_shipped_contacts_rule_matches_whole_country(country, matched):
+    with open(DEFAULT_RULES_PATH, "r", encoding="utf-8") as f:
+        ruleset = RuleSet(json.load(f))
+    report = DomainReport(domain="example.com", registrant_country=country)
+    assert ("contacts" in [rule_id for rule_id, _ in ruleset.matches(report)]) is matched
+
+def test_engine_reloads_changed_file_and_keeps_last_good(tmp_path: pathlib.Path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(RULES), encoding="utf-8")
+    engine = RuleEngine(str(path))
+    assert engine.current().version == 7
+
+    path.write_text(json.dumps({**RULES, "version": 8}), encoding="utf-8")
+    os.utime(path, ns=(0, 1))  # інший mtime навіть на файлових системах з грубою роздільністю
+    assert engine.reload() is True and engine.current().version == 8
+
+    path.write_text("{broken", encoding="utf-8")
+    assert engine.reload(force=True) is False
+    assert engine.current().version == 8
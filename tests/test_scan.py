@@ -0,0 +1,98 @@
+import io
+import json
+import threading
+
+from ai_core.requests_methods import scan
+from ai_core.requests_methods.batch_memo import BatchMemo
+from ai_core.requests_methods.report import DomainReport
+from ai_core.requests_methods.urls_checker import UrlsChecker
+
+
+class _FakeChecker:
+    """Замість мережевих проб: звіт з доменом і, за бажанням, помилками"""
+
+    def __init__(self, errors=None):
+        self.memo = BatchMemo()
+        self.checked = []
+        self.errors = errors or {}
+        self._lock = threading.Lock()
+
+    registrable_domain = staticmethod(UrlsChecker.registrable_domain)
+
+    def check(self, url, deadline_at=None):
+        domain = self.registrable_domain(url)
+        with self._lock:
+            self.checked.append(domain)
+        return DomainReport(input_url=url, domain=domain, errors=list(self.errors.get(domain, [])))
+
+
+def _scan(urls, checker=None, **kwargs):
+    checker = checker or _FakeChecker()
+    scanner = scan.BulkScanner(workers=2, progress_every=0, checker=checker, **kwargs)
+    out = io.StringIO()
+    stats = scanner.run(scan.BulkScanner.read_urls(urls), out)
+    return scanner, checker, stats, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_duplicate_registrable_domains_are_checked_once():
+    _, checker, stats, reports = _scan(["https://example.ru/a", "www.example.ru", "# comment", "",
+                                        "https://other.com"])
+    assert sorted(checker.checked) == ["example.ru", "other.com"]
+    assert sorted(r["domain"] for r in reports) == ["example.ru", "other.com"]
+    assert (stats.done, stats.duplicates, stats.skipped) == (2, 1, 0)
+
+
+def test_checkpoint_resumes_where_the_previous_run_stopped(tmp_path):
+    checkpoint = tmp_path / "reports.jsonl.checkpoint"
+    checkpoint.write_text("a.ru\n", encoding="utf-8")
+
+    _, checker, stats, _ = _scan(["a.ru", "b.ru", "c.ru"], checkpoint_path=str(checkpoint))
+    assert sorted(checker.checked) == ["b.ru", "c.ru"]
+    assert stats.skipped == 1
+    assert sorted(checkpoint.read_text(encoding="utf-8").split()) == ["a.ru", "b.ru", "c.ru"]
+
+    _, checker, stats, reports = _scan(["a.ru", "b.ru", "c.ru"], checkpoint_path=str(checkpoint))
+    assert checker.checked == [] and reports == []
+    assert stats.skipped == 3
+
+
+def test_batch_memo_is_reset_periodically():
+    scanner = scan.BulkScanner(workers=1, progress_every=0, checker=_FakeChecker())
+    scanner.MEMO_RESET_EVERY = 2
+    memos = []
+    original_check = scanner.checker.check
+
+    def check(url, deadline_at=None):
+        memos.append(scanner.checker.memo)
+        return original_check(url, deadline_at)
+
+    scanner.checker.check = check
+    scanner.in_flight = 1  # по одному домену, щоб порядок скидання був детермінований
+    scanner.run(["a.ru", "b.ru", "c.ru", "d.ru", "e.ru"], io.StringIO())
+
+    assert memos[0] is memos[1]
+    assert memos[2] is not memos[1] and memos[2] is memos[3]
+    assert memos[4] is not memos[3]
+
+
+def test_stats_count_errors_timeouts_and_failures():
+    checker = _FakeChecker(errors={"slow.ru": ["check_rdap timed out"], "bad.ru": ["WHOIS error: x"]})
+    scanner, _, stats, _ = _scan(["slow.ru", "bad.ru", "ok.ru"], checker=checker)
+    data = stats.as_dict()
+    assert (data["done"], data["with_errors"], data["timed_out"], data["failed"]) == (3, 2, 1, 0)
+    assert data["error_rate"] == round(2 / 3, 4)
+    assert "3 готово" in stats.line()
+
+
+def test_main_writes_reports_checkpoint_and_stats(tmp_path, monkeypatch):
+    monkeypatch.setattr(scan, "UrlsChecker", lambda *args, **kwargs: _FakeChecker())
+    source = tmp_path / "domains.txt"
+    source.write_text("a.ru\nwww.a.ru\nb.com\n", encoding="utf-8")
+    output, stats_path = tmp_path / "reports.jsonl", tmp_path / "stats.json"
+
+    scan.main([str(source), "-o", str(output), "--stats", str(stats_path), "--progress-every", "0"])
+
+    assert len(output.read_text(encoding="utf-8").splitlines()) == 2
+    assert sorted((tmp_path / "reports.jsonl.checkpoint").read_text(encoding="utf-8").split()) == ["a.ru", "b.com"]
+    stats = json.loads(stats_path.read_text(encoding="utf-8"))
+    assert (stats["done"], stats["duplicates"]) == (2, 1)
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+
+from ai_core.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_threads_share_one_computation():
+    flight = SingleFlight("test")
+    calls = 0
+    results = []
+
+    def compute():
+        nonlocal calls
+        calls += 1
+        time.sleep(0.05)
+        return 42
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", compute))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == 1
+    assert sorted(joined for _, joined in results) == [False, True, True, True, True]
+    assert flight.stats()["inflight"] == 0
+
+
+def test_async_waiters_share_one_task():
+    async def main():
+        flight = AsyncSingleFlight("test")
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*(flight.do("k", compute) for _ in range(3)))
+        return calls, results
+
+    calls, results = asyncio.run(main())
+    assert calls == 1
+    assert [value for value, _ in results] == ["done"] * 3
+
+
+def test_cancelling_one_waiter_keeps_task_for_others():
+    async def main():
+        flight = AsyncSingleFlight("test")
+        finished = asyncio.Event()
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            finished.set()
+            return "done"
+
+        first = asyncio.create_task(flight.do("k", compute))
+        second = asyncio.create_task(flight.do("k", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        value, joined = await second
+        return value, joined, finished.is_set(), first.cancelled()
+
+    assert asyncio.run(main()) == ("done", True, True, True)
+
+
+def test_cancelling_only_waiter_cancels_task():
+    async def main():
+        flight = AsyncSingleFlight("test")
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def compute():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        caller = asyncio.create_task(flight.do("k", compute))
+        await started.wait()
+        caller.cancel()
+        await asyncio.sleep(0.01)
+        # Новий виклик з тим самим ключем запускає нову задачу, а не приєднується до скасованої
+        value, joined = await flight.do("k", _constant)
+        return cancelled.is_set(), value, joined, flight.stats()["inflight"]
+
+    assert asyncio.run(main()) == (True, "fresh", False, 0)
+
+
+async def _constant():
+    return "fresh"
+
+
+def test_follower_timeout_uses_fallback():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    owner = threading.Thread(target=lambda: flight.do("k", lambda: release.wait(1) and "owner"))
+    owner.start()
+    time.sleep(0.02)
+    try:
+        value, joined = flight.do("k", lambda: "own", timeout=0.05, fallback=lambda: "stored")
+    finally:
+        release.set()
+        owner.join()
+    assert (value, joined) == ("stored", False)
+    assert flight.stats()["fallback"] == 1
@@ -0,0 +1,17 @@
+from ai_core.requests_methods.main import RequestHandler
+from ai_core.state_machine.main import StateMachine
+from ai_core.state_machine.state import State
+
+
+def test_metadata_is_per_instance():
+    first, second = State(), State()
+    first.insert_metadata("urls", ["https://example.ru"])
+    assert second.metadata == {}
+
+
+def test_request_handler_shares_callers_state():
+    machine = StateMachine()
+    handler = RequestHandler(machine)
+    machine.state.insert_metadata("urls", ["https://example.com"])
+    assert handler.state.metadata["urls"] == ["https://example.com"]
+    assert RequestHandler().state.metadata == {}
@@ -0,0 +1,61 @@
+import threading
+import time
+
+from ai_core.requests_methods.probe_graph import ProbeGraph
+from ai_core.requests_methods.report import DomainReport, FieldUpdate
+from ai_core.requests_methods.urls_checker import UrlsChecker
+
+
+class _Store:
+    def __init__(self, *reports):
+        self.reports = {r.domain: r for r in reports}
+        self.puts = []
+
+    def get(self, domain):
+        report = self.reports.get(domain)
+        return DomainReport.from_dict(report.to_dict()) if report is not None else None
+
+    def put(self, report):
+        self.puts.append(report)
+        self.reports[report.domain] = report
+
+
+def _checker(store, probe_delay):
+    checker = UrlsChecker([], store=store)
+
+    def graph(report, fetched_at=None):
+        def resolve():
+            time.sleep(probe_delay)
+            return FieldUpdate("ip", "203.0.113.7")
+        return ProbeGraph().add("resolve_ip", resolve).add(
+            "validate_russian_traces", lambda: FieldUpdate("russian_traces", []), deps=["resolve_ip"], local=True)
+
+    checker.build_probe_graph = graph
+    checker.REFRESH_AFTER = {"resolve_ip": 0}  # попередній звіт завжди застарілий
+    return checker
+
+
+def test_slow_owner_follower_returns_stored_report():
+    previous = DomainReport(input_url="https://example.com", domain="example.com", ip="198.51.100.1")
+    store = _Store(previous)
+    checker = _checker(store, probe_delay=0.5)
+    owner = threading.Thread(target=lambda: checker.check("https://example.com"))
+    owner.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    report = checker.check("https://www.example.com/page", deadline_at=time.monotonic() + 0.2)
+    waited = time.monotonic() - started
+    owner.join()
+
+    assert waited < 0.3
+    assert report.ip == "198.51.100.1"  # попередній звіт, а не звіт з самих таймаутів
+    assert report.input_url == "https://www.example.com/page"
+    assert [r.ip for r in store.puts] == ["203.0.113.7"]  # зберіг лише власник
+
+
+def test_report_with_only_timed_out_probes_is_not_stored():
+    store = _Store()
+    checker = _checker(store, probe_delay=0.3)
+    report = checker.check("https://example.com", deadline_at=time.monotonic() + 0.05)
+    assert "resolve_ip timed out" in report.errors
+    assert store.puts == []